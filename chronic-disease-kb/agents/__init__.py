@@ -10,6 +10,7 @@ from .orchestrator import (
     AgentOrchestrator,
     agent_orchestrator
 )
+from .answer_cache import AnswerCache
 
 __all__ = [
     'BaseAgent',
@@ -17,5 +18,6 @@ __all__ = [
     'RetrievalAgent',
     'RecommendationAgent',
     'AgentOrchestrator',
-    'agent_orchestrator'
+    'agent_orchestrator',
+    'AnswerCache'
 ]
\ No newline at end of file
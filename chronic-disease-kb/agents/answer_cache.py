@@ -0,0 +1,169 @@
+"""
+Semantic answer cache for the query pipeline
+Serves a previous QueryResponse for a new query whose embedding is close
+enough to an earlier one asked under the same options and KB generation
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+from models.query import QueryRequest, QueryResponse, new_query_id
+
+
+class AnswerCache:
+    """
+    Bounded LRU of query responses looked up by cosine similarity
+
+    An entry only matches requests with the same scope (disease filter,
+    query type, language, result count) asked at the same knowledge base
+    write generation, so answers are never served across a KB change.
+    Lookups scan the entries in scope, which stays cheap at the cache's
+    bounded size.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[str], Sequence[float]],
+        threshold: float = 0.95,
+        max_entries: int = 1000,
+        ttl_seconds: float = 3600.0
+    ):
+        self.embed = embed
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._similarity_total = 0.0
+
+    @staticmethod
+    def scope(request: QueryRequest) -> Hashable:
+        """Request options that must match for a cached answer to apply"""
+        return (
+            tuple(sorted(request.disease_filter)) if request.disease_filter else None,
+            request.query_type,
+            request.language,
+            request.max_results,
+            request.include_sources,
+        )
+
+    def vector(self, query: str) -> np.ndarray:
+        """Unit-length embedding of query"""
+        vector = np.asarray(self.embed(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(
+        self,
+        request: QueryRequest,
+        generation: int,
+        vector: Optional[np.ndarray] = None
+    ) -> Optional[QueryResponse]:
+        """
+        Return the cached response closest to request, if within the threshold
+
+        Args:
+            request: Incoming query request
+            generation: Current knowledge base write generation
+            vector: Precomputed vector(request.query), if available
+
+        Returns:
+            Copy of the cached response marked as cached, with its own
+            query_id, or None on a miss
+        """
+        vector = self.vector(request.query) if vector is None else vector
+        scope = self.scope(request)
+        now = time.monotonic()
+
+        with self._lock:
+            self._evict(lambda entry: (
+                entry['generation'] != generation
+                or now - entry['stored_at'] > self.ttl_seconds
+            ))
+            keys: List[int] = []
+            vectors: List[np.ndarray] = []
+            for key, entry in self._entries.items():
+                if entry['scope'] == scope and entry['vector'].shape == vector.shape:
+                    keys.append(key)
+                    vectors.append(entry['vector'])
+
+            if not keys:
+                self._misses += 1
+                return None
+
+            similarities = np.stack(vectors) @ vector
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(keys[best])
+            entry = self._entries[keys[best]]
+            self._hits += 1
+            self._similarity_total += similarity
+
+        return entry['response'].model_copy(deep=True, update={
+            "query_id": new_query_id(),
+            "query": request.query,
+            "processing_time_ms": 0,
+            "timestamp": datetime.now(),
+            "cached": True,
+            "cache_similarity": min(max(similarity, 0.0), 1.0),
+            "cached_query": entry['query'],
+        })
+
+    def store(
+        self,
+        request: QueryRequest,
+        generation: int,
+        response: QueryResponse,
+        vector: Optional[np.ndarray] = None
+    ) -> None:
+        """Cache response as the answer to request at generation"""
+        vector = self.vector(request.query) if vector is None else vector
+        with self._lock:
+            self._entries[self._next_key] = {
+                'scope': self.scope(request),
+                'generation': generation,
+                'vector': vector,
+                'query': request.query,
+                'response': response.model_copy(deep=True),
+                'stored_at': time.monotonic(),
+            }
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit ratio, mean hit similarity and occupancy"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+                "avg_hit_similarity": (
+                    self._similarity_total / self._hits if self._hits else None
+                ),
+                "entries": len(self._entries),
+                "capacity": self.max_entries,
+                "threshold": self.threshold,
+            }
+
+    def clear(self) -> None:
+        """Drop all cached answers"""
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self, expired: Callable[[Dict[str, Any]], bool]) -> None:
+        for key in [key for key, entry in self._entries.items() if expired(entry)]:
+            del self._entries[key]
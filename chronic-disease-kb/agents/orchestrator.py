@@ -5,16 +5,21 @@ Implements QueryAgent, RetrievalAgent, and RecommendationAgent
 
 import os
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import httpx
 
 from config import settings
+from agents.answer_cache import AnswerCache
 from kb.knowledge_base import knowledge_base
-from models.query import QueryRequest, QueryResponse, KnowledgeResult, RecommendationRequest, RecommendationResponse
+from models.query import QueryRequest, QueryResponse, KnowledgeResult, RecommendationRequest, RecommendationResponse, new_query_id
 from models.patient import Patient
 
 
+class LLMError(Exception):
+    """An LLM provider call failed; the message is shown in place of the answer"""
+
+
 class BaseAgent(ABC):
     """Base class for all agents"""
     
@@ -31,16 +36,35 @@ class BaseAgent(ABC):
     ) -> str:
         """
         Call LLM API based on configured provider
+        
+        A failed call returns its error message in brackets as the text.
+        """
+        return self._complete(prompt, temperature, max_tokens)[0]
+
+    def _complete(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 1000
+    ) -> Tuple[str, bool]:
         """
-        if self.llm_provider == "openai":
-            return self._call_openai(prompt, temperature, max_tokens)
-        elif self.llm_provider == "anthropic":
-            return self._call_anthropic(prompt, temperature, max_tokens)
-        elif self.llm_provider == "google":
-            return self._call_google(prompt, temperature, max_tokens)
-        else:
-            # Fallback to simple response for demo
-            return f"[Demo Mode] LLM response for: {prompt[:100]}..."
+        Call LLM API based on configured provider, reporting failure explicitly
+        
+        Returns:
+            (text, ok); on failure text is the bracketed error message
+        """
+        try:
+            if self.llm_provider == "openai":
+                return self._call_openai(prompt, temperature, max_tokens), True
+            elif self.llm_provider == "anthropic":
+                return self._call_anthropic(prompt, temperature, max_tokens), True
+            elif self.llm_provider == "google":
+                return self._call_google(prompt, temperature, max_tokens), True
+            else:
+                # Fallback to simple response for demo
+                return f"[Demo Mode] LLM response for: {prompt[:100]}...", True
+        except LLMError as e:
+            return f"[{e}]", False
     
     def _call_openai(
         self,
@@ -51,7 +75,7 @@ class BaseAgent(ABC):
         """Call OpenAI API"""
         api_key = settings.OPENAI_API_KEY or os.getenv("OPENAI_API_KEY")
         if not api_key:
-            return "[Error: OpenAI API key not configured]"
+            raise LLMError("Error: OpenAI API key not configured")
         
         try:
             response = httpx.post(
@@ -72,9 +96,11 @@ class BaseAgent(ABC):
             if response.status_code == 200:
                 return response.json()["choices"][0]["message"]["content"]
             else:
-                return f"[Error: {response.status_code}]"
+                raise LLMError(f"Error: {response.status_code}")
+        except LLMError:
+            raise
         except Exception as e:
-            return f"[Error calling OpenAI: {str(e)}]"
+            raise LLMError(f"Error calling OpenAI: {str(e)}")
     
     def _call_anthropic(
         self,
@@ -85,7 +111,7 @@ class BaseAgent(ABC):
         """Call Anthropic Claude API"""
         api_key = settings.ANTHROPIC_API_KEY or os.getenv("ANTHROPIC_API_KEY")
         if not api_key:
-            return "[Error: Anthropic API key not configured]"
+            raise LLMError("Error: Anthropic API key not configured")
         
         try:
             response = httpx.post(
@@ -107,9 +133,11 @@ class BaseAgent(ABC):
             if response.status_code == 200:
                 return response.json()["content"][0]["text"]
             else:
-                return f"[Error: {response.status_code}]"
+                raise LLMError(f"Error: {response.status_code}")
+        except LLMError:
+            raise
         except Exception as e:
-            return f"[Error calling Anthropic: {str(e)}]"
+            raise LLMError(f"Error calling Anthropic: {str(e)}")
     
     def _call_google(
         self,
@@ -120,7 +148,7 @@ class BaseAgent(ABC):
         """Call Google Gemini API"""
         api_key = settings.GOOGLE_API_KEY or os.getenv("GOOGLE_API_KEY")
         if not api_key:
-            return "[Error: Google API key not configured]"
+            raise LLMError("Error: Google API key not configured")
         
         try:
             response = httpx.post(
@@ -139,9 +167,11 @@ class BaseAgent(ABC):
             if response.status_code == 200:
                 return response.json()["candidates"][0]["content"]["parts"][0]["text"]
             else:
-                return f"[Error: {response.status_code}]"
+                raise LLMError(f"Error: {response.status_code}")
+        except LLMError:
+            raise
         except Exception as e:
-            return f"[Error calling Google: {str(e)}]"
+            raise LLMError(f"Error calling Google: {str(e)}")
     
     @abstractmethod
     def process(self, *args, **kwargs) -> Any:
@@ -243,7 +273,8 @@ class RetrievalAgent(BaseAgent):
         query: str,
         query_analysis: Optional[Dict[str, Any]] = None,
         patient_context: Optional[Dict[str, Any]] = None,
-        n_results: int = 5
+        n_results: int = 5,
+        disease_filter: Optional[List[str]] = None
     ) -> QueryResponse:
         """
         Retrieve and synthesize knowledge
@@ -253,10 +284,28 @@ class RetrievalAgent(BaseAgent):
             query_analysis: Query classification from QueryAgent
             patient_context: Patient profile information
             n_results: Number of knowledge documents to retrieve
+            disease_filter: Only retrieve knowledge for these diseases
             
         Returns:
             QueryResponse with synthesized answer
         """
+        return self.retrieve(query, query_analysis, patient_context, n_results, disease_filter)[0]
+
+    def retrieve(
+        self,
+        query: str,
+        query_analysis: Optional[Dict[str, Any]] = None,
+        patient_context: Optional[Dict[str, Any]] = None,
+        n_results: int = 5,
+        disease_filter: Optional[List[str]] = None
+    ) -> Tuple[QueryResponse, bool]:
+        """
+        Retrieve and synthesize knowledge, reporting whether the answer was generated
+        
+        Returns:
+            (response, answered); answered is False when the LLM call for
+            the answer failed and response.answer holds the error message
+        """
         start_time = datetime.now()
         
         # Build enhanced query
@@ -269,6 +318,7 @@ class RetrievalAgent(BaseAgent):
         # Search knowledge base
         search_results = self.kb.search(
             query=enhanced_query,
+            disease_filter=disease_filter,
             n_results=n_results * 2  # Get more for re-ranking
         )
         
@@ -304,7 +354,7 @@ Guidelines:
 
 Answer:"""
         
-        answer = self._call_llm(answer_prompt, temperature=0.5)
+        answer, answered = self._complete(answer_prompt, temperature=0.5)
         
         # Calculate confidence based on relevance scores
         confidence = sum(r.relevance_score for r in knowledge_results) / len(knowledge_results) if knowledge_results else 0.0
@@ -323,8 +373,8 @@ Answer:"""
         
         processing_time = (datetime.now() - start_time).total_seconds() * 1000
         
-        return QueryResponse(
-            query_id=f"query_{datetime.now().strftime('%Y%m%d%H%M%S')}",
+        response = QueryResponse(
+            query_id=new_query_id(),
             query=query,
             answer=answer,
             confidence=confidence,
@@ -337,6 +387,7 @@ Answer:"""
             timestamp=datetime.now(),
             patient_context_applied=patient_context is not None
         )
+        return response, answered
     
     def _build_context(
         self,
@@ -629,6 +680,14 @@ class AgentOrchestrator:
         self.query_agent = QueryAgent()
         self.retrieval_agent = RetrievalAgent()
         self.recommendation_agent = RecommendationAgent()
+        self.answer_cache = None
+        if settings.ANSWER_CACHE_ENABLED:
+            self.answer_cache = AnswerCache(
+                embed=knowledge_base.vector_store.embed_query,
+                threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+                max_entries=settings.ANSWER_CACHE_SIZE,
+                ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS
+            )
     
     def process_query(
         self,
@@ -645,6 +704,16 @@ class AgentOrchestrator:
         Returns:
             QueryResponse with answer and metadata
         """
+        # Near-duplicates of an earlier question reuse its answer; answers
+        # tailored to a patient are never shared
+        use_cache = self.answer_cache is not None and patient is None and not request.patient_id
+        if use_cache:
+            generation = knowledge_base.write_generation
+            query_vector = self.answer_cache.vector(request.query)
+            cached = self.answer_cache.lookup(request, generation, query_vector)
+            if cached is not None:
+                return cached
+
         # Step 1: Query Understanding
         query_analysis = self.query_agent.process(request.query)
         
@@ -659,14 +728,22 @@ class AgentOrchestrator:
             }
         
         # Step 3: Knowledge Retrieval and Answer Generation
-        response = self.retrieval_agent.process(
+        response, answered = self.retrieval_agent.retrieve(
             query=request.query,
             query_analysis=query_analysis,
             patient_context=patient_context,
-            n_results=request.max_results
+            n_results=request.max_results,
+            disease_filter=request.disease_filter
         )
+
+        if use_cache and answered:
+            self.answer_cache.store(request, generation, response, query_vector)
         
         return response
+
+    def get_answer_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Answer cache hit rate and occupancy, or None when disabled"""
+        return self.answer_cache.stats() if self.answer_cache else None
     
     def get_recommendations(
         self,
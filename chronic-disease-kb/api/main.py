@@ -2,11 +2,15 @@
 FastAPI main application
 """
 
+import asyncio
+
 from fastapi import FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from config import settings
+from kb.vector_store import vector_store
+from kb.knowledge_base import knowledge_base
 from api.routes import knowledge, patients, query, recommendations, health
 
 
@@ -17,11 +21,17 @@ async def lifespan(app: FastAPI):
     print("🚀 Starting Chronic Disease Knowledge Base API...")
     print(f"API Version: {settings.API_VERSION}")
     print(f"Debug Mode: {settings.DEBUG}")
+
+    # Load the vector store, embedding model and metadata indexes in the
+    # background so /health answers while the model is still loading
+    if settings.WARMUP_ON_STARTUP:
+        asyncio.get_running_loop().run_in_executor(None, knowledge_base.warmup)
     
     yield
     
     # Shutdown
     print("👋 Shutting down API...")
+    vector_store.close()
 
 
 app = FastAPI(
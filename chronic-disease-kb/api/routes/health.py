@@ -3,6 +3,7 @@ Health check endpoints
 """
 
 from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
 from datetime import datetime
 
 from kb.knowledge_base import knowledge_base
@@ -11,6 +12,16 @@ from agents.orchestrator import agent_orchestrator
 router = APIRouter()
 
 
+def _knowledge_base_status() -> str:
+    """Knowledge base status derived from vector store readiness"""
+    readiness = knowledge_base.vector_store.readiness()
+    if readiness["ready"]:
+        return "available"
+    if "errors" in readiness:
+        return "unavailable"
+    return "warming_up"
+
+
 @router.get("/health", status_code=status.HTTP_200_OK)
 async def health_check():
     """Health check endpoint"""
@@ -19,18 +30,32 @@ async def health_check():
         "timestamp": datetime.now().isoformat(),
         "services": {
             "api": "running",
-            "knowledge_base": "available",
+            "knowledge_base": _knowledge_base_status(),
             "agents": "available"
         }
     }
 
 
+@router.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: 503 until the vector store and embedding model are loaded"""
+    readiness = knowledge_base.vector_store.readiness()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if readiness["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "status": "ready" if readiness["ready"] else "not_ready",
+            "timestamp": datetime.now().isoformat(),
+            "vector_store": readiness
+        }
+    )
+
+
 @router.get("/health/detailed", status_code=status.HTTP_200_OK)
 async def detailed_health_check():
     """Detailed health check with system status"""
     kb_stats = {
-        "total_documents": knowledge_base.count_documents(),
-        "diseases_covered": len(knowledge_base.get_all_diseases())
+        "total_documents": await knowledge_base.acount_documents(),
+        "diseases_covered": len(await knowledge_base.aget_all_diseases())
     }
     
     return {
@@ -40,7 +65,16 @@ async def detailed_health_check():
         "knowledge_base": kb_stats,
         "services": {
             "api": {"status": "running", "latency_ms": 0},
-            "knowledge_base": {"status": "available", "stats": kb_stats},
+            "knowledge_base": {
+                "status": _knowledge_base_status(),
+                "readiness": knowledge_base.vector_store.readiness(),
+                "stats": kb_stats
+            },
+            "caches": {
+                **knowledge_base.vector_store.cache_stats(),
+                "search_results": knowledge_base.get_search_cache_stats(),
+                "answers": agent_orchestrator.get_answer_cache_stats(),
+            },
             "agents": {
                 "query_agent": "available",
                 "retrieval_agent": "available",
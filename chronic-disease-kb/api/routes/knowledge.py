@@ -2,25 +2,137 @@
 Knowledge base management endpoints
 """
 
-from fastapi import APIRouter, HTTPException, status, Query
-from typing import List, Optional, Dict, Any
+import asyncio
+import concurrent.futures
+import json
+import threading
 
+import anyio
+from fastapi import APIRouter, HTTPException, Request, status, Query
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from typing import AsyncIterator, Callable, List, Optional, Dict, Any, Iterator, Union
+
+from config import settings
 from kb.knowledge_base import knowledge_base
 from models.disease import DiseaseKnowledge
-from models.knowledge import KnowledgeCreate
+from models.knowledge import KnowledgeCreate, KnowledgeSearchBatchRequest
 
 router = APIRouter()
 
 
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    Streaming response that does not read from the client while sending
+    
+    StreamingResponse listens for a disconnect on receive(), which would
+    consume request body messages still being read by the endpoint. A
+    disconnect during upload surfaces through the body reader instead.
+    
+    on_close runs once the response ends, however it ends, in a worker
+    thread, so blocking cleanup never runs on the event loop.
+    """
+    media_type = "application/x-ndjson"
+
+    def __init__(self, content, on_close: Optional[Callable[[], None]] = None, **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        finally:
+            if self.on_close is not None:
+                with anyio.CancelScope(shield=True):
+                    await anyio.to_thread.run_sync(self.on_close)
+
+
+async def _ndjson_lines(request: Request, max_line_bytes: int) -> AsyncIterator[Union[bytes, Exception]]:
+    """Non-empty lines of the request body, read incrementally; over-long lines become errors"""
+    buffer = b""
+    skipping = False
+    async for chunk in request.stream():
+        lines = (buffer + chunk).split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            if skipping:
+                # Tail of an over-long line already reported
+                skipping = False
+            elif line.strip():
+                yield line
+        if not skipping and len(buffer) > max_line_bytes:
+            yield ValueError(f"Line exceeds {max_line_bytes} bytes")
+            skipping = True
+        if skipping:
+            buffer = b""
+    if buffer.strip() and not skipping:
+        yield buffer
+
+
+def _parse_knowledge_line(line: bytes) -> Union[Dict[str, Any], Exception]:
+    """add_knowledge arguments from one NDJSON line, or the validation error"""
+    try:
+        payload = KnowledgeCreate.model_validate_json(line)
+    except ValidationError as e:
+        return ValueError("; ".join(
+            f"{'.'.join(str(part) for part in error['loc']) or 'line'}: {error['msg']}"
+            for error in e.errors()
+        ))
+    return {
+        "content": payload.content,
+        "disease": payload.disease,
+        "category": payload.category,
+        "metadata": payload.metadata or {}
+    }
+
+
+def _knowledge_records(
+    lines: AsyncIterator[Union[bytes, Exception]],
+    loop: asyncio.AbstractEventLoop,
+    stop: threading.Event,
+    poll_seconds: float = 0.1
+) -> Iterator[Union[Dict[str, Any], Exception]]:
+    """
+    Pull body lines from the event loop into the ingestion pipeline's feeder thread
+    
+    Each read is polled so the feeder returns as soon as stop is set (the
+    response ended or the client went away), cancelling the pending read
+    instead of waiting on the loop.
+    """
+    while not stop.is_set():
+        future = asyncio.run_coroutine_threadsafe(lines.__anext__(), loop)
+        while True:
+            try:
+                line = future.result(timeout=poll_seconds)
+                break
+            except concurrent.futures.TimeoutError:
+                if stop.is_set():
+                    future.cancel()
+                    return
+            except StopAsyncIteration:
+                return
+        yield line if isinstance(line, Exception) else _parse_knowledge_line(line)
+
+
 @router.get("/knowledge/stats")
 async def get_knowledge_stats():
     """Get knowledge base statistics"""
-    metadata_summary = knowledge_base.get_metadata_summary()
+    metadata_summary = await knowledge_base.aget_metadata_summary()
     return {
-        "total_documents": knowledge_base.count_documents(),
-        "diseases_covered": knowledge_base.get_all_diseases(),
+        "total_documents": await knowledge_base.acount_documents(),
+        "diseases_covered": await knowledge_base.aget_all_diseases(),
         "disease_counts": metadata_summary["diseases"],
         "category_counts": metadata_summary["categories"],
+        "source_counts": metadata_summary["sources"],
+        "evidence_level_counts": metadata_summary["evidence_levels"],
+        "aggregate_generations": {
+            field: summary["generation"]
+            for field, summary in knowledge_base.get_aggregate_stats().items()
+        },
+        "deduplication": knowledge_base.get_dedup_stats(),
+        "prefilter": knowledge_base.get_prefilter_stats(),
+        "search_cache": knowledge_base.get_search_cache_stats(),
+        "tokens": knowledge_base.get_token_stats(),
         "categories": [
             "symptoms",
             "treatment",
@@ -37,7 +149,7 @@ async def get_knowledge_stats():
 @router.get("/knowledge/diseases")
 async def get_all_diseases():
     """Get list of all diseases in knowledge base"""
-    diseases = knowledge_base.get_all_diseases()
+    diseases = await knowledge_base.aget_all_diseases()
     return {
         "diseases": diseases,
         "count": len(diseases)
@@ -49,7 +161,8 @@ async def search_knowledge(
     query: str,
     disease: Optional[str] = None,
     category: Optional[str] = None,
-    n_results: int = Query(default=5, ge=1, le=20)
+    n_results: int = Query(default=5, ge=1, le=20),
+    search_ef: Optional[int] = Query(default=None, ge=1, le=1000)
 ):
     """
     Search knowledge base
@@ -59,13 +172,15 @@ async def search_knowledge(
         disease: Filter by disease name
         category: Filter by category (symptoms, treatment, etc.)
         n_results: Number of results to return
+        search_ef: HNSW search breadth; higher trades latency for recall
     """
     try:
-        results = knowledge_base.search(
+        results = await knowledge_base.asearch(
             query=query,
             disease_filter=disease,
             category_filter=category,
-            n_results=n_results
+            n_results=n_results,
+            search_ef=search_ef
         )
         
         return {
@@ -81,12 +196,81 @@ async def search_knowledge(
         )
 
 
+@router.post("/knowledge/search/batch")
+async def search_knowledge_batch(payload: KnowledgeSearchBatchRequest):
+    """
+    Run several searches in one request
+    
+    All queries are embedded in one batch and sent to the vector store as a
+    single multi-vector query. Results are returned per query, in order.
+    
+    Example:
+        ```json
+        {
+            "queries": ["糖尿病症状", "高血压饮食建议"],
+            "disease": "diabetes_type2",
+            "n_results": 3
+        }
+        ```
+    """
+    try:
+        results = await knowledge_base.asearch_many(
+            queries=payload.queries,
+            disease_filter=payload.disease,
+            category_filter=payload.category,
+            n_results=payload.n_results,
+            search_ef=payload.search_ef
+        )
+        
+        return {
+            "results": [
+                {"query": query, "results": query_results, "count": len(query_results)}
+                for query, query_results in zip(payload.queries, results)
+            ],
+            "count": len(results)
+        }
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error searching knowledge base: {str(e)}"
+        )
+
+
 @router.get("/knowledge/disease/{disease_name}")
-async def get_disease_knowledge(disease_name: str):
-    """Get all knowledge documents for a specific disease"""
-    documents = knowledge_base.get_documents_by_disease(disease_name)
+async def get_disease_knowledge(
+    disease_name: str,
+    limit: int = Query(default=100, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = None,
+    include: str = Query(default="full", pattern="^(full|metadata|ids)$")
+):
+    """
+    Get knowledge documents for a specific disease, one page at a time
     
-    if not documents:
+    Args:
+        disease_name: Disease name
+        limit: Page size
+        offset: Number of documents to skip (ignored when cursor is given)
+        cursor: next_cursor from the previous page
+        include: full (text and metadata), metadata (no text) or ids
+    """
+    try:
+        page = await knowledge_base.alist_documents_by_disease(
+            disease_name,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            include=include
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    documents = page["documents"]
+    if not documents and page["offset"] == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No knowledge found for disease: {disease_name}"
@@ -95,7 +279,10 @@ async def get_disease_knowledge(disease_name: str):
     return {
         "disease": disease_name,
         "documents": documents,
-        "count": len(documents)
+        "count": len(documents),
+        "offset": page["offset"],
+        "limit": limit,
+        "next_cursor": page["next_cursor"]
     }
 
 
@@ -123,7 +310,7 @@ async def add_knowledge(
         ```
     """
     try:
-        doc_id = knowledge_base.add_knowledge(
+        doc_id = await knowledge_base.aadd_knowledge(
             content=payload.content,
             disease=payload.disease,
             category=payload.category,
@@ -148,10 +335,62 @@ async def add_knowledge(
         )
 
 
+@router.post("/knowledge/bulk")
+async def add_knowledge_bulk(request: Request):
+    """
+    Add many knowledge documents from an NDJSON upload
+    
+    The body holds one KnowledgeCreate payload per line and is read as it
+    arrives, so memory stays bounded by the ingestion queues rather than
+    the upload size. One JSON result is streamed back per record, in
+    completion order, followed by a summary line:
+    
+        ```
+        {"index": 0, "status": "added", "doc_id": "..."}
+        {"index": 2, "status": "failed", "error": "content: Field required"}
+        {"index": 1, "status": "duplicate", "doc_id": "..."}
+        {"summary": {"added": 1, "duplicate": 1, "failed": 1}}
+        ```
+    
+    index is the record's position among the non-empty lines.
+    """
+    loop = asyncio.get_running_loop()
+    stop = threading.Event()
+    records = _knowledge_records(
+        _ndjson_lines(request, settings.BULK_MAX_LINE_BYTES), loop, stop
+    )
+    results = knowledge_base.add_knowledge_batch(records)
+
+    def stream_results():
+        counts = {"added": 0, "duplicate": 0, "failed": 0}
+        try:
+            for result in results:
+                counts[result["status"]] += 1
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+            yield json.dumps({"summary": counts}) + "\n"
+        finally:
+            # Runs in the threadpool: stop reading the body, then stop the pipeline
+            stop.set()
+            results.close()
+
+    stream = stream_results()
+
+    def close_stream():
+        stop.set()
+        try:
+            stream.close()
+        except ValueError:
+            # Still inside next() on another thread; with the feeder stopped
+            # the pipeline drains and that call returns on its own
+            pass
+
+    return NDJSONStreamingResponse(stream, on_close=close_stream)
+
+
 @router.delete("/knowledge/{doc_id}")
 async def delete_knowledge(doc_id: str):
     """Delete knowledge document by ID"""
-    success = knowledge_base.delete_document(doc_id)
+    success = await knowledge_base.adelete_document(doc_id)
     
     if not success:
         raise HTTPException(
@@ -3,6 +3,7 @@ Query endpoints
 """
 
 from fastapi import APIRouter, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional
 
 from models.query import QueryRequest, QueryResponse, RecommendationRequest, RecommendationResponse
@@ -38,8 +39,9 @@ async def query_knowledge_base(request: QueryRequest):
             # TODO: Load patient from database
             pass
         
-        # Process query through agent orchestrator
-        response = agent_orchestrator.process_query(request, patient)
+        # Process query through agent orchestrator; LLM and search calls block,
+        # so keep them off the event loop
+        response = await run_in_threadpool(agent_orchestrator.process_query, request, patient)
         
         return response
         
@@ -3,6 +3,7 @@ Recommendations endpoints
 """
 
 from fastapi import APIRouter, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from typing import List
 
 from models.query import RecommendationRequest, RecommendationResponse
@@ -42,7 +43,9 @@ async def get_recommendations(request: RecommendationRequest):
             pass
         
         # Generate recommendations
-        response = agent_orchestrator.get_recommendations(request, patient, metrics)
+        response = await run_in_threadpool(
+            agent_orchestrator.get_recommendations, request, patient, metrics
+        )
         
         return response
         
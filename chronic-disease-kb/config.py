@@ -20,12 +20,63 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./data/chronic_disease.db"
     VECTOR_DB_PATH: str = "./data/vector_db"
+    VECTOR_BACKEND: str = "chroma"  # chroma | numpy
+    VECTOR_QUANTIZATION: str = "none"  # none | float16 | int8 (numpy backend)
+    VECTOR_RESCORE_FACTOR: int = 4
+    # HNSW graph parameters (chroma backend); M and construction ef apply
+    # when a collection is created
+    HNSW_M: int = 16
+    HNSW_CONSTRUCTION_EF: int = 100
+    HNSW_SEARCH_EF: int = 10
+    SHARDING_MODE: str = "none"  # none | disease | hash
+    SHARD_COUNT: int = 8  # hash mode only
+    SHARD_SEARCH_WORKERS: int = 4
+    VECTOR_SNAPSHOT_PATH: Optional[str] = None  # restored into an empty numpy store at boot
+    VECTOR_SNAPSHOT_VERIFY: bool = False  # recompute checksums before restoring
     
     # Knowledge Base
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_WORKERS: int = 0  # 0 encodes in-process
+    EMBEDDING_WORKER_SHARD_SIZE: int = 64
     CHUNK_SIZE: int = 512
     CHUNK_OVERLAP: int = 50
+    # tokens: CHUNK_SIZE/CHUNK_OVERLAP count embedding-model tokens, capped at
+    # the model's max sequence length (characters if no tokenizer is available)
+    CHUNK_SIZE_UNIT: str = "tokens"  # tokens | chars
+    EMBEDDING_MAX_TOKENS: Optional[int] = None  # overrides the model's max sequence length
+    TOKEN_COUNT_CACHE_SIZE: int = 8192
+    DEDUP_ENABLED: bool = True
+    ENFORCE_SOURCE_SCOPE: bool = False  # reject sources whose registry disease_scopes exclude the disease
     TOP_K_RESULTS: int = 5
+    SEARCH_MODE: str = "vector"  # vector | hybrid | lexical
+    HYBRID_RRF_K: int = 60
+    LEXICAL_FAST_PATH_ENABLED: bool = True
+    METADATA_PREFILTER_ENABLED: bool = True
+    METADATA_PREFILTER_MAX_SELECTIVITY: float = 0.5
+    WARMUP_ON_STARTUP: bool = True
+    KB_READ_WORKERS: int = 8  # threads for async search and fetch
+    KB_WRITE_WORKERS: int = 2  # threads for async ingest, update and delete
+    BULK_LOAD_BATCH_SIZE: int = 256
+    INGEST_CHUNK_WORKERS: int = 2
+    INGEST_EMBED_WORKERS: int = 1
+    INGEST_PERSIST_WORKERS: int = 1
+    INGEST_QUEUE_SIZE: int = 32  # documents buffered between pipeline stages
+    INGEST_EMBED_BATCH_SIZE: int = 64  # chunks per embedding call
+    BULK_MAX_LINE_BYTES: int = 1_000_000  # longest NDJSON record accepted by /knowledge/bulk
+
+    # Embedding Cache
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MEMORY_ENTRIES: int = 10000
+    EMBEDDING_CACHE_DISK_ENTRIES: int = 200000
+    QUERY_EMBEDDING_CACHE_SIZE: int = 1024
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: int = 3600
+    SEARCH_RESULT_CACHE_ENABLED: bool = True
+    SEARCH_RESULT_CACHE_SIZE: int = 2048
+
+    # Embedding Micro-batching
+    EMBEDDING_BATCHING_ENABLED: bool = True
+    EMBEDDING_BATCH_MAX_SIZE: int = 32
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 3.0
     
     # LLM Configuration
     # Priority order: OpenAI > Claude > Gemini > Local
@@ -34,6 +85,12 @@ class Settings(BaseSettings):
     GOOGLE_API_KEY: Optional[str] = None
     DEFAULT_LLM_PROVIDER: str = "openai"
     DEFAULT_MODEL: str = "gpt-3.5-turbo"
+
+    # Answer Cache (near-duplicate /query requests without patient context)
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95
+    ANSWER_CACHE_SIZE: int = 1000
+    ANSWER_CACHE_TTL_SECONDS: int = 3600
     
     # Agent Configuration
     AGENT_TIMEOUT: int = 30
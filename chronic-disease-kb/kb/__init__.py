@@ -4,11 +4,32 @@ Knowledge Base module exports
 
 from .vector_store import VectorStore, vector_store
 from .knowledge_base import KnowledgeBase, knowledge_base, DocumentChunker
+from .embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from .result_cache import SearchResultCache
+from .source_registry import SourceRegistry, SourceRegistryIndex
+from .embedding_batcher import EmbeddingBatcher
+from .ingestion import IngestionPipeline
+from .numpy_store import NumpyCollection
+from .lexical_index import LexicalIndex
+from .embedders import Embedder, LocalEmbedder, ProcessPoolEmbedder, create_embedder
 
 __all__ = [
     'VectorStore',
     'vector_store',
     'KnowledgeBase',
     'knowledge_base',
-    'DocumentChunker'
+    'DocumentChunker',
+    'EmbeddingCache',
+    'QueryEmbeddingCache',
+    'SearchResultCache',
+    'SourceRegistry',
+    'SourceRegistryIndex',
+    'EmbeddingBatcher',
+    'IngestionPipeline',
+    'NumpyCollection',
+    'LexicalIndex',
+    'Embedder',
+    'LocalEmbedder',
+    'ProcessPoolEmbedder',
+    'create_embedder'
 ]
\ No newline at end of file
@@ -0,0 +1,106 @@
+"""
+Metadata aggregate index
+Running counts of stored vectors by disease, category, source and evidence level
+"""
+
+import threading
+from typing import Any, Dict, Iterable
+
+
+class MetadataAggregates:
+    """
+    Counts of stored vectors per metadata value, kept current on write
+
+    Counts are per stored vector (chunk), matching a scan over the
+    collection. Each field carries a generation counter that is bumped
+    whenever its counts change, so callers can tell whether a previously
+    read summary is still current.
+    """
+
+    FIELDS = ("disease", "category", "source_id", "evidence_level")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {field: {} for field in self.FIELDS}
+        self._generations: Dict[str, int] = {field: 0 for field in self.FIELDS}
+        self._total = 0
+        self._loaded = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def rebuild(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Rebuild from stored records with 'metadata'"""
+        with self._lock:
+            self._counts = {field: {} for field in self.FIELDS}
+            self._total = 0
+            for record in records:
+                self._apply(record['metadata'], 1)
+            for field in self.FIELDS:
+                self._generations[field] += 1
+            self._loaded = True
+
+    def add(self, metadata: Dict[str, Any]) -> None:
+        """Count a newly stored vector"""
+        with self._lock:
+            self._bump(self._apply(metadata, 1))
+
+    def remove(self, metadata: Dict[str, Any]) -> None:
+        """Uncount a deleted vector"""
+        with self._lock:
+            self._bump(self._apply(metadata, -1))
+
+    def clear(self) -> None:
+        """Reset all counts to zero (the store was cleared)"""
+        with self._lock:
+            self._counts = {field: {} for field in self.FIELDS}
+            self._total = 0
+            for field in self.FIELDS:
+                self._generations[field] += 1
+
+    def total(self) -> int:
+        """Number of stored vectors"""
+        with self._lock:
+            return self._total
+
+    def counts(self, field: str) -> Dict[str, int]:
+        """Counts per value of field, sorted by value"""
+        with self._lock:
+            return dict(sorted(self._counts[field].items()))
+
+    def count(self, field: str, value: str) -> int:
+        """Number of stored vectors with field == value"""
+        with self._lock:
+            return self._counts[field].get(value, 0)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Counts and generation for every field"""
+        with self._lock:
+            return {
+                field: {
+                    "counts": dict(sorted(self._counts[field].items())),
+                    "generation": self._generations[field],
+                }
+                for field in self.FIELDS
+            }
+
+    def _apply(self, metadata: Dict[str, Any], delta: int) -> set:
+        self._total = max(self._total + delta, 0)
+        changed = set()
+        for field in self.FIELDS:
+            value = metadata.get(field)
+            if not value:
+                continue
+            counts = self._counts[field]
+            count = counts.get(value, 0) + delta
+            if count > 0:
+                counts[value] = count
+            else:
+                counts.pop(value, None)
+            changed.add(field)
+        return changed
+
+    def _bump(self, fields: set) -> None:
+        for field in fields:
+            self._generations[field] += 1
@@ -0,0 +1,147 @@
+"""
+Content-hash deduplication index
+Maps hashes of stored documents to the doc ids that hold them
+"""
+
+import hashlib
+import threading
+import unicodedata
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of text after Unicode and whitespace normalization"""
+    normalized = " ".join(unicodedata.normalize("NFKC", text).split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class ContentHashIndex:
+    """
+    In-memory index of whole-document content hashes
+
+    Hashes are scoped by disease, source_id and document_version, so
+    identical text filed under another disease or a new guideline version
+    is stored with its own governance metadata. Only whole documents are
+    deduplicated: every stored document keeps all of its chunks, so no
+    document depends on another's vectors. The index is rebuilt from
+    stored metadata; vectors written before hashes were recorded carry no
+    hash and are not deduplicated against.
+
+    A document being ingested holds a reservation on its key from the
+    moment it is prepared until it is stored or released, so concurrent
+    submissions of the same document resolve to one copy.
+    """
+
+    DOCUMENT_HASH_FIELD = "document_hash"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._documents: Dict[Tuple[str, str, str, str], str] = {}
+        self._vector_counts: Dict[Tuple[str, str, str, str], int] = {}
+        self._reserved: Dict[Tuple[str, str, str, str], str] = {}
+        self._loaded = False
+        self._documents_deduplicated = 0
+        self._vectors_saved = 0
+        self._bytes_saved = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @staticmethod
+    def key(metadata: Dict[str, Any], document_hash: Optional[str] = None) -> Tuple[str, str, str, str]:
+        """Dedup key of a document: disease, source, version and content hash"""
+        return (
+            metadata.get('disease', ''),
+            metadata.get('source_id', ''),
+            metadata.get('document_version', ''),
+            document_hash or metadata.get(ContentHashIndex.DOCUMENT_HASH_FIELD) or '',
+        )
+
+    def rebuild(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Rebuild from stored records with 'id' and 'metadata'"""
+        with self._lock:
+            self._documents = {}
+            self._vector_counts = {}
+            for record in records:
+                self._add(record['metadata'])
+            self._loaded = True
+
+    def find_document(self, key: Tuple[str, str, str, str]) -> Optional[str]:
+        """Doc id already holding the document with this key, if any"""
+        with self._lock:
+            return self._documents.get(key)
+
+    def reserve(self, key: Tuple[str, str, str, str], doc_id: str) -> Optional[str]:
+        """
+        Claim key for a document about to be stored
+
+        Args:
+            key: Dedup key of the document
+            doc_id: Id the document will be stored under
+
+        Returns:
+            None if the key was claimed, else the doc id that already
+            holds or has reserved it
+        """
+        with self._lock:
+            existing = self._documents.get(key) or self._reserved.get(key)
+            if existing:
+                return existing
+            self._reserved[key] = doc_id
+            return None
+
+    def release(self, key: Tuple[str, str, str, str], doc_id: str) -> None:
+        """Drop doc_id's reservation of key (its write failed or was abandoned)"""
+        with self._lock:
+            if self._reserved.get(key) == doc_id:
+                del self._reserved[key]
+
+    def add(self, metadata: Dict[str, Any]) -> None:
+        """Register a newly stored vector"""
+        with self._lock:
+            self._add(metadata)
+
+    def remove(self, metadata: Dict[str, Any]) -> None:
+        """Unregister a deleted vector; the hash is freed with the document's last vector"""
+        key = self.key(metadata)
+        if not key[3]:
+            return
+        with self._lock:
+            if key in self._vector_counts:
+                self._vector_counts[key] -= 1
+                if self._vector_counts[key] <= 0:
+                    del self._vector_counts[key]
+                    self._documents.pop(key, None)
+
+    def record_duplicate_document(self, key: Tuple[str, str, str, str], size_bytes: int) -> None:
+        """Count a resubmitted document that was not stored again"""
+        with self._lock:
+            self._documents_deduplicated += 1
+            self._vectors_saved += self._vector_counts.get(key, 1)
+            self._bytes_saved += size_bytes
+
+    def clear(self) -> None:
+        """Forget stored hashes (the store was cleared); in-flight reservations stay"""
+        with self._lock:
+            self._documents = {}
+            self._vector_counts = {}
+
+    def stats(self) -> Dict[str, int]:
+        """Deduplication counters and storage saved"""
+        with self._lock:
+            return {
+                "indexed_documents": len(self._documents),
+                "reserved_documents": len(self._reserved),
+                "documents_deduplicated": self._documents_deduplicated,
+                "vectors_saved": self._vectors_saved,
+                "text_bytes_saved": self._bytes_saved,
+            }
+
+    def _add(self, metadata: Dict[str, Any]) -> None:
+        key = self.key(metadata)
+        if key[3] and metadata.get('doc_id'):
+            if self._reserved.get(key) == metadata['doc_id']:
+                del self._reserved[key]
+            self._documents.setdefault(key, metadata['doc_id'])
+            self._vector_counts[key] = self._vector_counts.get(key, 0) + 1
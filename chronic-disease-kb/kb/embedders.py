@@ -0,0 +1,140 @@
+"""
+Embedding model backends
+In-process SentenceTransformer encoder and a process-pool encoder that
+shards large batches across worker processes
+"""
+
+import multiprocessing
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, List, Optional
+
+import numpy as np
+
+
+class Embedder(ABC):
+    """Base class for embedding backends"""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    @abstractmethod
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embed texts, returning one row per text in input order"""
+
+    def tokenizer(self) -> Optional[Any]:
+        """The model's Hugging Face tokenizer, or None if unavailable"""
+        return None
+
+    def max_seq_length(self) -> Optional[int]:
+        """Tokens the model reads per input before truncating, or None if unknown"""
+        return None
+
+    def close(self) -> None:
+        """Release backend resources"""
+
+
+class LocalEmbedder(Embedder):
+    """SentenceTransformer running in the calling process"""
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(texts))
+
+    def tokenizer(self) -> Optional[Any]:
+        return self.model.tokenizer
+
+    def max_seq_length(self) -> Optional[int]:
+        return self.model.max_seq_length
+
+
+# Model loaded once per worker process by _init_worker
+_worker_model = None
+
+
+def _init_worker(model_name: str) -> None:
+    global _worker_model
+    from sentence_transformers import SentenceTransformer
+
+    _worker_model = SentenceTransformer(model_name)
+
+
+def _worker_encode(texts: List[str]) -> np.ndarray:
+    return np.asarray(_worker_model.encode(texts))
+
+
+def _worker_max_seq_length() -> int:
+    return _worker_model.max_seq_length
+
+
+class ProcessPoolEmbedder(Embedder):
+    """
+    Embedder that shards batches across a pool of worker processes
+
+    Each worker loads the model once at startup. Batches larger than
+    shard_size are split, encoded in parallel and reassembled in order.
+    If the pool breaks, encoding falls back to an in-process model.
+    """
+
+    def __init__(self, model_name: str, workers: int, shard_size: int = 64):
+        super().__init__(model_name)
+        self.workers = workers
+        self.shard_size = max(1, shard_size)
+        # spawn avoids forking a parent that may already hold torch threads
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_name,)
+        )
+        self._fallback: Optional[LocalEmbedder] = None
+        self._tokenizer = None
+        self._max_seq_length: Optional[int] = None
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        if self._fallback is not None:
+            return self._fallback.encode(texts)
+
+        shards = [
+            texts[start:start + self.shard_size]
+            for start in range(0, len(texts), self.shard_size)
+        ]
+        if not shards:
+            return np.empty((0, 0), dtype=np.float32)
+        try:
+            return np.vstack(list(self._executor.map(_worker_encode, shards)))
+        except BrokenProcessPool as e:
+            print(f"Embedding worker pool failed, falling back to in-process model: {e}")
+            self._fallback = LocalEmbedder(self.model_name)
+            return self._fallback.encode(texts)
+
+    def tokenizer(self) -> Optional[Any]:
+        # Tokenizing needs no model weights, so load just the tokenizer here
+        if self._tokenizer is None:
+            from transformers import AutoTokenizer
+
+            self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        return self._tokenizer
+
+    def max_seq_length(self) -> Optional[int]:
+        if self._fallback is not None:
+            return self._fallback.max_seq_length()
+        if self._max_seq_length is None:
+            self._max_seq_length = self._executor.submit(_worker_max_seq_length).result()
+        return self._max_seq_length
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_embedder(model_name: str, workers: int = 0, shard_size: int = 64) -> Embedder:
+    """Create a process-pool embedder when workers > 0, else an in-process one"""
+    if workers > 0:
+        return ProcessPoolEmbedder(model_name, workers=workers, shard_size=shard_size)
+    return LocalEmbedder(model_name)
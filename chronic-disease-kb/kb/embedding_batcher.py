@@ -0,0 +1,135 @@
+"""
+Embedding batcher module
+Coalesces concurrent small encode calls into one batched model call
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batching scheduler in front of an embedding model
+
+    Callers block in encode() while a background worker gathers requests
+    for up to max_wait_ms or until max_batch_size texts are pending, runs
+    a single batched encode, and hands each caller its slice of vectors.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 3.0
+    ):
+        self._encode = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._queue: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._histogram: Dict[int, int] = {}
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Encode texts as part of the next batch
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Array with one embedding row per text
+        """
+        texts = list(texts)
+        if len(texts) >= self.max_batch_size:
+            # Already a full batch on its own; coalescing would only add latency
+            vectors = np.asarray(self._encode(texts))
+            self._record(len(texts))
+            return vectors
+
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((texts, future))
+        return future.result()
+
+    def stats(self) -> Dict[str, object]:
+        """Batch count, mean batch size and batch-size histogram"""
+        with self._stats_lock:
+            return {
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": self._items / self._batches if self._batches else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "histogram": {
+                    self._bucket_label(bucket): count
+                    for bucket, count in sorted(self._histogram.items())
+                },
+            }
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run,
+                    name="embedding-batcher",
+                    daemon=True
+                )
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            pending = [self._queue.get()]
+            size = len(pending[0][0])
+            deadline = time.monotonic() + self.max_wait_ms / 1000.0
+
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(request)
+                size += len(request[0])
+
+            self._flush(pending)
+
+    def _flush(self, pending: List[Tuple[List[str], Future]]) -> None:
+        texts = [text for request_texts, _ in pending for text in request_texts]
+        try:
+            vectors = np.asarray(self._encode(texts))
+        except Exception as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+
+        self._record(len(texts))
+        offset = 0
+        for request_texts, future in pending:
+            future.set_result(vectors[offset:offset + len(request_texts)])
+            offset += len(request_texts)
+
+    def _record(self, batch_size: int) -> None:
+        # Power-of-two buckets: 1, 2-3, 4-7, 8-15, ...
+        bucket = 1 << (max(batch_size, 1).bit_length() - 1)
+        with self._stats_lock:
+            self._batches += 1
+            self._items += batch_size
+            self._histogram[bucket] = self._histogram.get(bucket, 0) + 1
+
+    @staticmethod
+    def _bucket_label(bucket: int) -> str:
+        return str(bucket) if bucket == 1 else f"{bucket}-{bucket * 2 - 1}"
@@ -0,0 +1,292 @@
+"""
+Embedding cache module
+Content-addressed cache of document embeddings with an in-memory LRU tier
+and a size-bounded on-disk tier, plus a TTL cache for query embeddings
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed by content hash and embedding model name
+
+    The memory tier is an LRU of recently used vectors. The disk tier is a
+    SQLite table under the vector DB directory that survives restarts and
+    evicts least recently used entries once it exceeds its size bound.
+    """
+
+    DISK_FILENAME = "embedding_cache.sqlite3"
+
+    def __init__(
+        self,
+        model_name: str,
+        cache_dir: Optional[str] = None,
+        max_memory_entries: int = 10000,
+        max_disk_entries: int = 200000
+    ):
+        self.model_name = model_name
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if cache_dir and max_disk_entries > 0:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._db = sqlite3.connect(
+                os.path.join(cache_dir, self.DISK_FILENAME),
+                check_same_thread=False
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used "
+                "ON embeddings (last_used)"
+            )
+            self._db.commit()
+
+    def key(self, text: str) -> str:
+        """Content hash of text, namespaced by the embedding model"""
+        digest = hashlib.sha256()
+        digest.update(self.model_name.encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Look up cached vectors, returning None for each miss"""
+        keys = [self.key(text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+
+            disk_keys = [key for key in dict.fromkeys(keys) if key not in found]
+            disk_found = self._disk_get(disk_keys)
+            for key, vector in disk_found.items():
+                self._memory_put(key, vector)
+            found.update(disk_found)
+
+            results: List[Optional[np.ndarray]] = []
+            for key in keys:
+                vector = found.get(key)
+                if vector is None:
+                    self._misses += 1
+                elif key in disk_found:
+                    self._disk_hits += 1
+                else:
+                    self._memory_hits += 1
+                results.append(vector)
+
+        return results
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[np.ndarray]) -> None:
+        """Store vectors for texts in both tiers"""
+        entries = {
+            self.key(text): np.asarray(vector, dtype=np.float32)
+            for text, vector in zip(texts, vectors)
+        }
+        with self._lock:
+            for key, vector in entries.items():
+                self._memory_put(key, vector)
+            self._disk_put(entries)
+
+    def get_or_compute(
+        self,
+        texts: Sequence[str],
+        compute: Callable[[List[str]], Sequence[np.ndarray]]
+    ) -> List[np.ndarray]:
+        """
+        Return vectors for texts, computing only the ones not cached
+
+        Args:
+            texts: Texts to embed
+            compute: Embeds a list of texts, returning one vector per text
+
+        Returns:
+            One vector per input text, in input order
+        """
+        vectors = self.get_many(texts)
+        missing = list(dict.fromkeys(
+            text for text, vector in zip(texts, vectors) if vector is None
+        ))
+
+        if missing:
+            computed = compute(missing)
+            self.put_many(missing, computed)
+            by_text = {
+                text: np.asarray(vector, dtype=np.float32)
+                for text, vector in zip(missing, computed)
+            }
+            vectors = [
+                vector if vector is not None else by_text[text]
+                for text, vector in zip(texts, vectors)
+            ]
+
+        return vectors
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and tier sizes"""
+        with self._lock:
+            lookups = self._memory_hits + self._disk_hits + self._misses
+            return {
+                "memory_hits": self._memory_hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_ratio": (
+                    (self._memory_hits + self._disk_hits) / lookups if lookups else 0.0
+                ),
+                "memory_entries": len(self._memory),
+                "disk_entries": self._disk_count(),
+            }
+
+    def clear(self) -> None:
+        """Drop all cached vectors from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+
+    def _memory_put(self, key: str, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        if self._db is None or not keys:
+            return {}
+
+        found: Dict[str, np.ndarray] = {}
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                batch
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+
+            if rows:
+                self._db.execute(
+                    f"UPDATE embeddings SET last_used = ? WHERE key IN ({placeholders})",
+                    [time.time(), *batch]
+                )
+        self._db.commit()
+        return found
+
+    def _disk_put(self, entries: Dict[str, np.ndarray]) -> None:
+        if self._db is None or not entries:
+            return
+
+        now = time.time()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+            [(key, vector.tobytes(), now) for key, vector in entries.items()]
+        )
+        overflow = self._disk_count() - self.max_disk_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                "SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (overflow,)
+            )
+        self._db.commit()
+
+    def _disk_count(self) -> int:
+        if self._db is None:
+            return 0
+        return self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU of query embeddings with a time-to-live
+
+    Keys are normalized query text, so trivially different spellings of
+    the same query (case, full-width characters, extra whitespace) share
+    one entry.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Normalize query text for use as a cache key"""
+        return " ".join(unicodedata.normalize("NFKC", query).split()).casefold()
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        """Return the cached embedding for query, or None"""
+        key = self.normalize(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                self._expired += 1
+                entry = None
+
+            if entry is None:
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, query: str, vector: np.ndarray) -> None:
+        """Cache the embedding for query"""
+        key = self.normalize(query)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), np.asarray(vector, dtype=np.float32))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit ratio and occupancy"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "expired": self._expired,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "capacity": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+    def clear(self) -> None:
+        """Drop all cached query embeddings"""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,30 @@
+"""
+Retrieval evaluation helpers
+"""
+
+from typing import Hashable, Sequence
+
+
+def recall_at_k(
+    retrieved: Sequence[Sequence[Hashable]],
+    expected: Sequence[Sequence[Hashable]],
+    k: int
+) -> float:
+    """
+    Mean recall@k of retrieved result lists against expected (exact) lists
+
+    Args:
+        retrieved: Result ids per query from the approximate search
+        expected: Result ids per query from exact search
+        k: Result depth
+
+    Returns:
+        Mean fraction of the expected top-k found in the retrieved top-k
+    """
+    recalls = []
+    for got, want in zip(retrieved, expected):
+        want_top = set(want[:k])
+        if not want_top:
+            continue
+        recalls.append(len(want_top & set(got[:k])) / len(want_top))
+    return sum(recalls) / len(recalls) if recalls else 1.0
@@ -0,0 +1,351 @@
+"""
+Ingestion pipeline module
+Runs chunking, embedding and persisting of documents as concurrent stages
+connected by bounded queues
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class _Stage:
+    """Worker threads reading one bounded input queue, with throughput counters"""
+
+    def __init__(self, name: str, workers: int, queue_size: int):
+        self.name = name
+        self.workers = max(1, workers)
+        self.queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+        self.lock = threading.Lock()
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self.running = 0
+
+    def record(self, items: int, seconds: float) -> None:
+        with self.lock:
+            self.items += items
+            self.busy_seconds += seconds
+
+    def stats(self, elapsed: float) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "items": self.items,
+                "items_per_second": self.items / elapsed if elapsed > 0 else 0.0,
+                "busy_seconds": self.busy_seconds,
+                # Share of the run the stage's workers spent working
+                "utilization": (
+                    self.busy_seconds / (elapsed * self.workers) if elapsed > 0 else 0.0
+                ),
+                "queue_depth": self.queue.qsize(),
+                "max_queue_depth": self.max_depth,
+                "queue_capacity": self.queue.maxsize,
+            }
+
+
+class IngestionPipeline:
+    """
+    Chunk → embed → persist ingestion with backpressure
+
+    Each stage has its own worker threads and reads from a bounded queue,
+    so a slow stage blocks the one feeding it instead of buffering the
+    whole corpus. Embedding workers batch chunks from several documents
+    into one model call. Results are yielded per document as they
+    complete; a failing document is reported and the rest continue.
+
+    Persisting runs on the vector store's write pool, so pipeline writes
+    share one bound with every other write. Documents in flight hold a
+    dedup reservation, so a document submitted twice is stored once; the
+    reservation is released when a document fails or is abandoned.
+    """
+
+    STAGES = ("chunk", "embed", "persist")
+
+    def __init__(
+        self,
+        kb,
+        chunk_workers: int = 2,
+        embed_workers: int = 1,
+        persist_workers: int = 1,
+        queue_size: int = 32,
+        embed_batch_size: int = 64
+    ):
+        self.kb = kb
+        self.workers = {"chunk": chunk_workers, "embed": embed_workers, "persist": persist_workers}
+        self.queue_size = queue_size
+        self.embed_batch_size = max(1, embed_batch_size)
+        self._stop = threading.Event()
+        self._counts_lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._stages = {
+            name: _Stage(name, self.workers[name], self.queue_size) for name in self.STAGES
+        }
+        self._results: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, self.queue_size))
+        self._started = 0.0
+        self._counts = {"added": 0, "duplicate": 0, "failed": 0}
+
+    def ingest(self, documents: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Ingest documents, yielding one result per document as it completes
+
+        Args:
+            documents: Dicts of add_knowledge arguments (content, disease,
+                category and optional metadata); an exception in place of a
+                document is reported as that document's failure
+
+        Yields:
+            {'index', 'status': 'added' | 'duplicate' | 'failed', 'doc_id' or 'error'}
+        """
+        self._reset()
+        # A fresh event per run, so a feeder left over from a closed run
+        # still sees its own run as stopped
+        self._stop = threading.Event()
+        self._started = time.perf_counter()
+        # The feeder may be blocked inside the input iterator, where the stop
+        # flag cannot reach it, so it is never joined; it exits at its next put
+        feeder = threading.Thread(
+            target=self._feed,
+            args=(documents, self._stages["chunk"], self._stop),
+            name="ingest-feed",
+            daemon=True
+        )
+        threads = []
+        for name, work in (
+            ("chunk", self._chunk),
+            ("embed", self._embed),
+            ("persist", self._persist),
+        ):
+            stage = self._stages[name]
+            stage.running = stage.workers
+            threads.extend(
+                threading.Thread(
+                    target=self._work, args=(name, work), name=f"ingest-{name}-{i}", daemon=True
+                )
+                for i in range(stage.workers)
+            )
+        feeder.start()
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                result = self._results.get()
+                if result is _DONE:
+                    break
+                yield result
+        finally:
+            # Unblock every stage worker if the consumer stopped early
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+            self._release_unfinished()
+
+    def run(
+        self,
+        documents: Iterable[Dict[str, Any]],
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Ingest documents and return a report
+
+        Args:
+            documents: Dicts of add_knowledge arguments
+            progress_callback: Called with each document result
+
+        Returns:
+            Report with per-document results and stage statistics
+        """
+        results = []
+        for result in self.ingest(documents):
+            results.append(result)
+            if progress_callback:
+                progress_callback(result)
+        report = self.stats()
+        report["results"] = sorted(results, key=lambda result: result["index"])
+        return report
+
+    def stats(self) -> Dict[str, Any]:
+        """Document counts and per-stage throughput and queue depth"""
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        with self._counts_lock:
+            counts = dict(self._counts)
+        return {
+            **counts,
+            "elapsed_seconds": elapsed,
+            "docs_per_second": (
+                (counts["added"] + counts["duplicate"]) / elapsed if elapsed > 0 else 0.0
+            ),
+            "stages": {
+                name: stage.stats(elapsed) for name, stage in self._stages.items()
+            },
+        }
+
+    def _feed(self, documents: Iterable[Dict[str, Any]], stage: _Stage, stop: threading.Event) -> None:
+        try:
+            for index, document in enumerate(documents):
+                if not self._put(stage.queue, (index, document), stop):
+                    return
+        except Exception as e:
+            print(f"Error reading documents for ingestion: {e}")
+        for _ in range(stage.workers):
+            self._put(stage.queue, _DONE, stop)
+
+    def _work(self, name: str, work: Callable[[Any], int]) -> None:
+        stage = self._stages[name]
+        while True:
+            item = self._get(stage.queue)
+            if item is None or item is _DONE:
+                break
+            started = time.perf_counter()
+            try:
+                items = work(item)
+            except Exception as e:
+                print(f"Error in ingestion {name} stage: {e}")
+                items = 1
+            stage.record(items, time.perf_counter() - started)
+
+        # The last worker out tells the next stage (or the consumer) to finish
+        with stage.lock:
+            stage.running -= 1
+            last = stage.running == 0
+        if last:
+            following = self.STAGES.index(name) + 1
+            if following < len(self.STAGES):
+                next_stage = self._stages[self.STAGES[following]]
+                for _ in range(next_stage.workers):
+                    self._put(next_stage.queue, _DONE)
+            else:
+                self._put(self._results, _DONE)
+
+    def _chunk(self, item) -> int:
+        index, document = item
+        if isinstance(document, Exception):
+            self._finish(index, error=document)
+            return 1
+        try:
+            prepared = self.kb.prepare_knowledge(
+                content=document["content"],
+                disease=document["disease"],
+                category=document["category"],
+                metadata=document.get("metadata")
+            )
+        except Exception as e:
+            self._finish(index, error=e)
+            return 1
+        if not prepared["chunks"]:
+            self._finish(index, doc_id=prepared["doc_id"], duplicate=True)
+        elif not self._put(self._stages["embed"].queue, (index, prepared)):
+            self.kb.release_knowledge(prepared)
+        return 1
+
+    def _embed(self, item) -> int:
+        # Batch chunks from queued documents into one model call
+        batch = [item]
+        chunk_count = len(item[1]["chunks"])
+        embed_queue = self._stages["embed"].queue
+        while chunk_count < self.embed_batch_size:
+            try:
+                queued = embed_queue.get_nowait()
+            except queue.Empty:
+                break
+            if queued is _DONE:
+                # Leave the end marker for another worker (or this one's next get)
+                embed_queue.put(queued)
+                break
+            batch.append(queued)
+            chunk_count += len(queued[1]["chunks"])
+
+        texts = [chunk for _, prepared in batch for chunk in prepared["chunks"]]
+        try:
+            embeddings = self.kb.vector_store.embed_documents(texts)
+        except Exception as e:
+            for index, prepared in batch:
+                self.kb.release_knowledge(prepared)
+                self._finish(index, error=e)
+            return len(batch)
+
+        offset = 0
+        for index, prepared in batch:
+            size = len(prepared["chunks"])
+            if not self._put(
+                self._stages["persist"].queue,
+                (index, prepared, embeddings[offset:offset + size])
+            ):
+                self.kb.release_knowledge(prepared)
+            offset += size
+        return len(batch)
+
+    def _persist(self, item) -> int:
+        index, prepared, embeddings = item
+        try:
+            doc_id = self.kb.vector_store.submit_write(
+                self.kb.persist_knowledge, prepared, embeddings
+            ).result()
+        except Exception as e:
+            self._finish(index, error=e)
+        else:
+            self._finish(index, doc_id=doc_id)
+        return 1
+
+    def _release_unfinished(self) -> None:
+        """Release reservations of documents left queued when the pipeline stopped"""
+        for name in ("embed", "persist"):
+            stage_queue = self._stages[name].queue
+            while True:
+                try:
+                    item = stage_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _DONE:
+                    self.kb.release_knowledge(item[1])
+
+    def _finish(
+        self,
+        index: int,
+        doc_id: Optional[str] = None,
+        duplicate: bool = False,
+        error: Optional[Exception] = None
+    ) -> None:
+        if error is not None:
+            status, result = "failed", {"error": str(error)}
+        else:
+            status, result = ("duplicate" if duplicate else "added"), {"doc_id": doc_id}
+        with self._counts_lock:
+            self._counts[status] += 1
+        self._put(self._results, {"index": index, "status": status, **result})
+
+    def _put(
+        self,
+        target: "queue.Queue[Any]",
+        item: Any,
+        stop: Optional[threading.Event] = None
+    ) -> bool:
+        """Put with backpressure; False once stop (default: the current run's) is set"""
+        stop = stop or self._stop
+        while not stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            for stage in self._stages.values():
+                if stage.queue is target:
+                    with stage.lock:
+                        stage.max_depth = max(stage.max_depth, target.qsize())
+            return True
+        return False
+
+    def _get(self, source: "queue.Queue[Any]") -> Any:
+        """Get the next item, or None once the pipeline is stopped"""
+        while not self._stop.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
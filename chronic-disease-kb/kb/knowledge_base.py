@@ -3,23 +3,65 @@ Knowledge Base Management Module
 Handles CRUD operations, document chunking, and semantic search
 """
 
+import bisect
+import json
+import threading
 import uuid
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Set, TextIO, Tuple, Union
 from datetime import datetime
 import re
 from pathlib import Path
 
 from kb.vector_store import vector_store
+from kb.dedup import ContentHashIndex, content_hash
+from kb.aggregates import MetadataAggregates
+from kb.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from kb.metadata_index import MetadataIndex
+from kb.result_cache import SearchResultCache
+from kb.source_registry import SourceRegistry
+from kb.token_counter import TokenCounter
+from kb.ingestion import IngestionPipeline
 from models.disease import DiseaseKnowledge
 from config import settings
 
 
 class DocumentChunker:
     """Split documents into chunks for vector storage"""
+
+    # Sentence ends: CJK terminators, or Latin ones followed by whitespace
+    # (so "3.5 mg" is not split), with closing quotes/brackets, or a line break
+    SENTENCE_BOUNDARY = re.compile(
+        r'(?:[。！？；…]+|[.!?;]+(?=\s))[”’"\'」』）)]*\s*|\n\s*'
+    )
+    # Non-whitespace characters a sentence boundary match can contain
+    BOUNDARY_CHARS = frozenset('。！？；….!?;”’"\'」』）)')
+    READ_SIZE = 64 * 1024
     
-    def __init__(self, chunk_size: int = 512, overlap: int = 50):
+    def __init__(
+        self,
+        chunk_size: int = 512,
+        overlap: int = 50,
+        token_counter: Optional[TokenCounter] = None
+    ):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        if not 0 <= overlap < chunk_size:
+            raise ValueError(
+                f"overlap must be at least 0 and less than chunk_size ({chunk_size}), got {overlap}"
+            )
         self.chunk_size = chunk_size
         self.overlap = overlap
+        self.token_counter = token_counter
+        # Characters per token seen so far, to size the text window to tokenize
+        self._chars_per_token = 4.0
+
+    @property
+    def token_budget(self) -> Optional[int]:
+        """Text tokens per chunk in token mode (chunk_size capped at the model limit)"""
+        if self.token_counter is None:
+            return None
+        limit = min(self.chunk_size, self.token_counter.max_tokens)
+        return max(1, limit - self.token_counter.special_tokens)
     
     def chunk_text(self, text: str) -> List[str]:
         """
@@ -31,35 +73,164 @@ class DocumentChunker:
         Returns:
             List of text chunks
         """
-        chunks = []
-        start = 0
+        return list(self.iter_chunks(text))
+
+    def iter_chunks(self, source: Union[str, TextIO, Iterable[str]]) -> Iterator[str]:
+        """
+        Yield overlapping chunks of a text in one pass
+        
+        Chunks end at the last sentence boundary in the second half of the
+        window, else at the last space there, else at the window end. The
+        window is chunk_size characters, or with a token counter, as much
+        text as fits in chunk_size model tokens (overlap is then in tokens
+        too). Sentence boundary offsets are found once per piece of input
+        read, and each chunk starts at least one character after the
+        previous one, so the pass is linear in the text length. Only about
+        one chunk plus one read of text is held in memory.
         
-        while start < len(text):
-            # Find chunk end
-            end = start + self.chunk_size
+        Args:
+            source: Text, a text file object, or an iterable of text pieces
             
-            if end >= len(text):
+        Yields:
+            Text chunks, in order
+        """
+        pieces = self._pieces(source)
+        buffer = ""
+        base = 0  # offset of buffer[0] in the whole text
+        start = 0
+        eof = False
+        sentence_ends: List[int] = []
+        resume = 0  # offset where the boundary scan continues
+
+        def fill(until: int) -> None:
+            """Read until text past offset until is buffered (or input ends)"""
+            nonlocal buffer, base, eof, resume
+            while not eof and base + len(buffer) <= until:
+                piece = next(pieces, None)
+                if piece is None:
+                    eof = True
+                else:
+                    # Keep unscanned text that may hold a boundary split across reads
+                    keep = min(start, resume)
+                    buffer = buffer[keep - base:] + piece
+                    base = keep
+                resume = self._scan_boundaries(buffer, base, resume, eof, sentence_ends)
+
+        while True:
+            ends = None
+            if self.token_counter is None:
+                fill(start + self.chunk_size)
+                total = base + len(buffer)
+                limit = start + self.chunk_size
+            else:
+                # Tokenize a window expected to hold the budget, widening it if not
+                budget = self.token_budget
+                window = max(budget, int(budget * self._chars_per_token * 1.25))
+                while True:
+                    fill(start + window)
+                    total = base + len(buffer)
+                    ends = self.token_counter.token_ends(
+                        buffer[start - base:start - base + window]
+                    )
+                    if len(ends) > budget or (eof and start + window >= total):
+                        break
+                    window *= 2
+                if len(ends) > budget:
+                    limit = start + ends[budget - 1]
+                    self._chars_per_token = ends[budget - 1] / budget
+                else:
+                    limit = total
+
+            if start >= total:
+                return
+            if eof and total <= limit:
                 # Last chunk
-                chunks.append(text[start:])
-                break
-            
-            # Try to break at sentence or word boundary
-            chunk = text[start:end]
-            
-            # Look for sentence boundary
-            sentence_match = re.search(r'[.!?。！？]\s*$', chunk)
-            if sentence_match:
-                end = start + sentence_match.end()
+                chunk = buffer[start - base:]
+                if ends is not None:
+                    self.token_counter.remember(
+                        chunk, len(ends) + self.token_counter.special_tokens
+                    )
+                yield chunk
+                return
+
+            # Prefer a sentence boundary, then a word boundary, in the second half
+            min_end = start + (limit - start) // 2
+            end = self._last_boundary(sentence_ends, min_end, limit)
+            if end is None:
+                last_space = buffer.rfind(' ', min_end + 1 - base, limit - base)
+                end = base + last_space if last_space >= 0 else limit
+            chunk = buffer[start - base:end - base]
+
+            if ends is None:
+                next_start = end - self.overlap
             else:
-                # Look for word boundary
-                last_space = chunk.rfind(' ')
-                if last_space > self.chunk_size * 0.5:  # At least 50% of chunk size
-                    end = start + last_space
-            
-            chunks.append(text[start:end])
-            start = end - self.overlap
+                tokens = bisect.bisect_right(ends, end - start)
+                self.token_counter.remember(chunk, tokens + self.token_counter.special_tokens)
+                next_start = (
+                    start + ends[tokens - self.overlap - 1]
+                    if tokens > self.overlap else end
+                )
+            yield chunk
+            start = max(next_start, start + 1)
+
+            # Drop passed offsets once they make up half the list (amortized O(1))
+            passed = bisect.bisect_right(sentence_ends, start)
+            if passed > 1024 and passed * 2 > len(sentence_ends):
+                del sentence_ends[:passed]
+
+    def _pieces(self, source: Union[str, TextIO, Iterable[str]]) -> Iterator[str]:
+        """Iterate over the text of a string, file object or iterable of strings"""
+        if isinstance(source, str):
+            yield source
+        elif hasattr(source, 'read'):
+            for piece in iter(lambda: source.read(self.READ_SIZE), ''):
+                yield piece
+        else:
+            for piece in source:
+                if piece:
+                    yield piece
+
+    def _scan_boundaries(
+        self,
+        buffer: str,
+        base: int,
+        resume: int,
+        eof: bool,
+        sentence_ends: List[int]
+    ) -> int:
+        """
+        Record sentence boundary offsets found from resume on; return the next resume
         
-        return chunks
+        A match ending before the end of the buffer is the same match the
+        whole text would give. One that could still grow with the next
+        read, or that needs the next character to be seen at all, lies in
+        the trailing run of characters a match can contain, so the scan
+        resumes at the start of that run (or after the last match) and
+        matches exactly as one scan over the whole text would.
+        """
+        position = resume - base
+        for match in self.SENTENCE_BOUNDARY.finditer(buffer, position):
+            if match.end() == len(buffer) and not eof:
+                break
+            sentence_ends.append(base + match.end())
+            position = match.end()
+        if eof:
+            return base + len(buffer)
+
+        tail = len(buffer)
+        while tail > position and (
+            buffer[tail - 1] in self.BOUNDARY_CHARS or buffer[tail - 1].isspace()
+        ):
+            tail -= 1
+        return base + tail
+
+    @staticmethod
+    def _last_boundary(offsets: List[int], low: int, high: int) -> Optional[int]:
+        """Largest offset in (low, high], or None"""
+        index = bisect.bisect_right(offsets, high) - 1
+        if index >= 0 and offsets[index] > low:
+            return offsets[index]
+        return None
 
 
 class KnowledgeBase:
@@ -76,7 +247,31 @@ class KnowledgeBase:
             chunk_size=settings.CHUNK_SIZE,
             overlap=settings.CHUNK_OVERLAP
         )
-        self._registered_source_ids: Optional[set[str]] = None
+        self.source_registry = SourceRegistry(self.SOURCE_REGISTRY_PATH)
+        self._overdue_warned: Set[Tuple[int, str]] = set()
+        self.content_index = ContentHashIndex()
+        self.aggregates = MetadataAggregates()
+        self.lexical_index = LexicalIndex()
+        self.metadata_index = MetadataIndex()
+        self.result_cache = (
+            SearchResultCache(settings.SEARCH_RESULT_CACHE_SIZE)
+            if settings.SEARCH_RESULT_CACHE_ENABLED else None
+        )
+        self._generation_lock = threading.Lock()
+        # Held by index builds and by every store write together with its
+        # index maintenance, so a build never misses a concurrent write
+        self._index_lock = threading.RLock()
+        self._write_generation = 0
+        self._token_chunker_checked = False
+        self._token_stats_lock = threading.Lock()
+        self._token_stats = {
+            'ingests': 0,
+            'chunks': 0,
+            'truncated_chunks': 0,
+            'utilization_total': 0.0,
+            'max_tokens': None,
+            'last_ingest': None,
+        }
 
     REQUIRED_GOVERNANCE_METADATA_FIELDS = (
         "source_id",
@@ -87,9 +282,6 @@ class KnowledgeBase:
     SOURCE_REGISTRY_PATH = Path(__file__).resolve().parents[1] / "data" / "sources" / "source_registry.yaml"
     SOURCE_ID_PATTERN = re.compile(r"^[a-z0-9][a-z0-9-]{1,63}$")
     DOCUMENT_VERSION_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,31}$")
-    SOURCE_ID_DECLARATION_PATTERN = re.compile(
-        r"source_id:\s*\"?(?P<source_id>[a-z0-9][a-z0-9-]{1,63})\"?"
-    )
     ALLOWED_EVIDENCE_LEVELS = {
         "GRADE_HIGH",
         "GRADE_MODERATE",
@@ -98,40 +290,12 @@ class KnowledgeBase:
         "EXPERT_OPINION",
     }
     FALLBACK_SOURCE_ID = "guideline-consensus-global"
-    DEFAULT_SOURCE_IDS_BY_DISEASE = {
-        "diabetes_type1": "ada-2026-soc",
-        "diabetes_type2": "ada-2026-soc",
-        "hypertension": "nice-ng136",
-        "copd": "gold-2026-report",
-        "asthma": "gina-2025-strategy",
-    }
-
-    def _get_registered_source_ids(self) -> set[str]:
-        """Load and cache allowed source IDs from the registry file."""
-        if self._registered_source_ids is not None:
-            return self._registered_source_ids
-
-        if not self.SOURCE_REGISTRY_PATH.exists():
-            raise ValueError(
-                f"Source registry not found: {self.SOURCE_REGISTRY_PATH}"
-            )
-
-        source_ids: set[str] = set()
-        content = self.SOURCE_REGISTRY_PATH.read_text(encoding="utf-8")
-        for line in content.splitlines():
-            match = self.SOURCE_ID_DECLARATION_PATTERN.search(line)
-            if match:
-                source_ids.add(match.group("source_id"))
-
-        if not source_ids:
-            raise ValueError(
-                f"No source_id entries found in registry: {self.SOURCE_REGISTRY_PATH}"
-            )
 
-        self._registered_source_ids = source_ids
-        return source_ids
-
-    def _validate_governance_metadata(self, metadata: Dict[str, Any]) -> None:
+    def _validate_governance_metadata(
+        self,
+        metadata: Dict[str, Any],
+        disease: Optional[str] = None
+    ) -> None:
         """Validate required governance fields before writing knowledge."""
         missing = [
             field
@@ -153,11 +317,30 @@ class KnowledgeBase:
                 "Invalid source_id format. Expected lowercase slug like 'ada-2026-soc'"
             )
 
-        if source_id not in self._get_registered_source_ids():
+        registry = self.source_registry.index()
+        if source_id not in registry:
             raise ValueError(
                 f"Unknown source_id '{source_id}'. Register it in {self.SOURCE_REGISTRY_PATH}"
             )
 
+        # Disease knowledge is stored under its display name; scopes use the ID
+        scope_disease = metadata.get("disease_id") or disease
+        if (
+            settings.ENFORCE_SOURCE_SCOPE
+            and scope_disease
+            and not registry.covers(source_id, scope_disease)
+        ):
+            raise ValueError(
+                f"source_id '{source_id}' is not registered for disease '{scope_disease}'"
+            )
+
+        if registry.overdue(source_id) and (registry.mtime_ns, source_id) not in self._overdue_warned:
+            self._overdue_warned.add((registry.mtime_ns, source_id))
+            print(
+                f"Warning: source '{source_id}' is past its registry review date "
+                f"{registry.get(source_id)['review_due_date']}"
+            )
+
         if not self.DOCUMENT_VERSION_PATTERN.fullmatch(document_version):
             raise ValueError(
                 "Invalid document_version format. Use alphanumeric version like '2026.1' or 'NG136'"
@@ -192,8 +375,53 @@ class KnowledgeBase:
         Returns:
             Document ID
         """
+        prepared = self.prepare_knowledge(content, disease, category, metadata)
+        return self.persist_knowledge(prepared)
+
+    def add_knowledge_batch(
+        self,
+        documents: Iterable[Union[Dict[str, Any], Exception]]
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Add many documents through the ingestion pipeline
+        
+        Documents are consumed lazily, so the input can be a stream of any
+        length. An exception in place of a document (e.g. a payload that
+        failed to parse) is reported as failed at its position.
+        
+        Args:
+            documents: Dicts of add_knowledge arguments
+            
+        Yields:
+            {'index', 'status': 'added' | 'duplicate' | 'failed', 'doc_id' or 'error'}
+            per document, in completion order
+        """
+        return self.ingestion_pipeline().ingest(documents)
+
+    def prepare_knowledge(
+        self,
+        content: str,
+        disease: str,
+        category: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Validate, deduplicate and chunk a document without storing it
+        
+        Args:
+            content: Document content
+            disease: Disease name/ID
+            category: Knowledge category (symptoms, treatment, etc.)
+            metadata: Additional metadata
+            
+        Returns:
+            Dict with 'doc_id' and the 'chunks', 'metadatas' and 'ids' to
+            store; chunks is empty when the document is already stored or
+            being stored. The document's dedup key stays reserved until
+            persist_knowledge stores it or release_knowledge drops it.
+        """
         incoming_metadata = dict(metadata or {})
-        self._validate_governance_metadata(incoming_metadata)
+        self._validate_governance_metadata(incoming_metadata, disease)
 
         doc_id = str(uuid.uuid4())
         
@@ -205,10 +433,31 @@ class KnowledgeBase:
         }
 
         doc_metadata.update(incoming_metadata)
+
+        # Resubmitted documents resolve to the copy already stored, or to
+        # the one still in flight
+        document_key = None
+        if settings.DEDUP_ENABLED:
+            self._ensure_content_index()
+            document_hash = content_hash(content)
+            key = ContentHashIndex.key(doc_metadata, document_hash)
+            existing_doc_id = self.content_index.reserve(key, doc_id)
+            if existing_doc_id:
+                self.content_index.record_duplicate_document(
+                    key, len(content.encode('utf-8'))
+                )
+                return {'doc_id': existing_doc_id, 'chunks': [], 'metadatas': [], 'ids': []}
+            document_key = key
+            doc_metadata[ContentHashIndex.DOCUMENT_HASH_FIELD] = document_hash
         
         # Chunk document if it's too long
-        if len(content) > settings.CHUNK_SIZE:
-            chunks = self.chunker.chunk_text(content)
+        try:
+            chunks = self._ingest_chunker().chunk_text(content)
+        except Exception:
+            if document_key:
+                self.content_index.release(document_key, doc_id)
+            raise
+        if len(chunks) > 1:
             chunk_metadatas = []
             
             for i, chunk in enumerate(chunks):
@@ -217,26 +466,258 @@ class KnowledgeBase:
                 chunk_meta['total_chunks'] = str(len(chunks))
                 chunk_metadatas.append(chunk_meta)
             
-            ids = self.vector_store.add_documents(
-                documents=chunks,
-                metadatas=chunk_metadatas,
-                ids=[f"{doc_id}_chunk_{i}" for i in range(len(chunks))]
-            )
+            ids = [f"{doc_id}_chunk_{i}" for i in range(len(chunks))]
         else:
-            ids = self.vector_store.add_documents(
-                documents=[content],
-                metadatas=[doc_metadata],
-                ids=[doc_id]
+            chunks = [content]
+            chunk_metadatas = [doc_metadata]
+            ids = [doc_id]
+
+        self._record_token_usage(doc_id, chunks)
+        return {
+            'doc_id': doc_id,
+            'chunks': chunks,
+            'metadatas': chunk_metadatas,
+            'ids': ids,
+            'document_key': document_key
+        }
+
+    def release_knowledge(self, prepared: Dict[str, Any]) -> None:
+        """Drop the dedup reservation of a prepared document that will not be persisted"""
+        if prepared.get('document_key'):
+            self.content_index.release(prepared['document_key'], prepared['doc_id'])
+
+    def persist_knowledge(
+        self,
+        prepared: Dict[str, Any],
+        embeddings: Optional[List[List[float]]] = None
+    ) -> str:
+        """
+        Store a document prepared by prepare_knowledge and index its chunks
+        
+        Call it on the vector store's write pool (run_write or submit_write)
+        like every other write. If the store write fails, the document's
+        dedup reservation is released so it can be submitted again.
+        
+        Args:
+            prepared: Output of prepare_knowledge
+            embeddings: Optional precomputed chunk embeddings, in chunk order
+            
+        Returns:
+            Document ID
+        """
+        chunks = prepared['chunks']
+        chunk_metadatas = prepared['metadatas']
+        ids = prepared['ids']
+        if not chunks:
+            # Duplicate of a stored document; nothing to write
+            return prepared['doc_id']
+
+        try:
+            if embeddings is None:
+                embeddings = self.vector_store.embed_documents(chunks)
+        except Exception:
+            self.release_knowledge(prepared)
+            raise
+
+        # The store write and index maintenance share the index lock so a
+        # lazy index build sees both or neither. The generation is bumped
+        # only once the indexes match the store, so no search can cache
+        # results from a half-applied write under it
+        with self._index_lock:
+            try:
+                try:
+                    self.vector_store.add_documents(
+                        documents=chunks,
+                        metadatas=chunk_metadatas,
+                        ids=ids,
+                        embeddings=embeddings
+                    )
+                except Exception:
+                    self.release_knowledge(prepared)
+                    raise
+
+                if self.content_index.loaded:
+                    for chunk_meta in chunk_metadatas:
+                        self.content_index.add(chunk_meta)
+                if self.aggregates.loaded:
+                    for chunk_meta in chunk_metadatas:
+                        self.aggregates.add(chunk_meta)
+                if self.lexical_index.loaded:
+                    for vector_id, chunk, chunk_meta in zip(ids, chunks, chunk_metadatas):
+                        self.lexical_index.add(vector_id, chunk, chunk_meta)
+                if self.metadata_index.loaded:
+                    for vector_id, chunk_meta in zip(ids, chunk_metadatas):
+                        self.metadata_index.add(vector_id, chunk_meta)
+            finally:
+                self._bump_generation()
+        
+        return prepared['doc_id']
+
+    async def aadd_knowledge(
+        self,
+        content: str,
+        disease: str,
+        category: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Async add_knowledge(), run on the vector store's write pool"""
+        return await self.vector_store.run_write(
+            self.add_knowledge, content, disease, category, metadata
+        )
+
+    def _ingest_chunker(self) -> DocumentChunker:
+        """Chunker for ingest, switched to model tokens on first use when configured"""
+        if settings.CHUNK_SIZE_UNIT == 'tokens' and not self._token_chunker_checked:
+            token_counter = self.vector_store.token_counter()
+            if token_counter is not None:
+                self.chunker = DocumentChunker(
+                    chunk_size=settings.CHUNK_SIZE,
+                    overlap=settings.CHUNK_OVERLAP,
+                    token_counter=token_counter
+                )
+            else:
+                print("Warning: embedding model tokenizer unavailable, sizing chunks in characters")
+            self._token_chunker_checked = True
+        return self.chunker
+
+    def _record_token_usage(self, doc_id: str, chunks: List[str]) -> None:
+        """Track how much of the model's input each chunk fills, warning on truncation"""
+        token_counter = self.vector_store.token_counter()
+        if token_counter is None or not chunks:
+            return
+
+        # Counts were cached while chunking in token mode
+        counts = token_counter.count_many(chunks)
+        max_tokens = token_counter.max_tokens
+        truncated = sum(1 for count in counts if count > max_tokens)
+        utilization = [min(count, max_tokens) / max_tokens for count in counts]
+        last_ingest = {
+            'doc_id': doc_id,
+            'chunks': len(chunks),
+            'truncated_chunks': truncated,
+            'avg_tokens': sum(counts) / len(counts),
+            'avg_utilization': sum(utilization) / len(utilization),
+        }
+        with self._token_stats_lock:
+            self._token_stats['ingests'] += 1
+            self._token_stats['chunks'] += len(chunks)
+            self._token_stats['truncated_chunks'] += truncated
+            self._token_stats['utilization_total'] += sum(utilization)
+            self._token_stats['max_tokens'] = max_tokens
+            self._token_stats['last_ingest'] = last_ingest
+
+        if truncated:
+            print(
+                f"Warning: {truncated} of {len(chunks)} chunks of document {doc_id} exceed "
+                f"the embedding model's {max_tokens}-token limit and will be truncated"
             )
+
+    def get_token_stats(self) -> Dict[str, Any]:
+        """Chunk token utilization across ingests and for the last one"""
+        with self._token_stats_lock:
+            stats = dict(self._token_stats)
+        utilization_total = stats.pop('utilization_total')
+        stats['avg_utilization'] = (
+            utilization_total / stats['chunks'] if stats['chunks'] else None
+        )
+        stats['chunk_size_unit'] = 'tokens' if self.chunker.token_counter else 'chars'
+        return stats
+
+    def _ensure_index(self, index, include: str = 'metadata') -> None:
+        """
+        Build an in-memory index from one read of the store on first use
         
-        return doc_id
+        The read and rebuild hold the index lock, so writes wait for the
+        build and concurrent first searches build only once.
+        """
+        if index.loaded:
+            return
+        with self._index_lock:
+            if not index.loaded:
+                if include == 'full':
+                    index.rebuild(self.vector_store.get_all_documents())
+                else:
+                    index.rebuild(self.vector_store.get_all_metadata())
+
+    def _ensure_content_index(self) -> None:
+        """Build the content-hash index from stored metadata on first use"""
+        self._ensure_index(self.content_index)
+
+    def _ensure_aggregates(self) -> None:
+        """Build the metadata aggregates from stored metadata on first use"""
+        self._ensure_index(self.aggregates)
+
+    def _ensure_lexical_index(self) -> None:
+        """Build the lexical index from stored chunks on first use"""
+        self._ensure_index(self.lexical_index, include='full')
+
+    def _ensure_metadata_index(self) -> None:
+        """Build the metadata posting lists from stored metadata on first use"""
+        self._ensure_index(self.metadata_index)
+
+    def load_indexes(self) -> None:
+        """Rebuild the in-memory indexes from a single read (run at startup)"""
+        with self._index_lock:
+            if settings.SEARCH_MODE == 'vector':
+                records = self.vector_store.get_all_metadata()
+            else:
+                records = self.vector_store.get_all_documents()
+                self.lexical_index.rebuild(records)
+            self.content_index.rebuild(records)
+            self.aggregates.rebuild(records)
+            self.metadata_index.rebuild(records)
+
+    def warmup(self) -> Dict[str, Any]:
+        """Warm up the vector store, then build the in-memory indexes once"""
+        readiness = self.vector_store.warmup()
+        try:
+            self.load_indexes()
+        except Exception as e:
+            print(f"Error loading knowledge base indexes: {e}")
+        return readiness
+
+    @property
+    def write_generation(self) -> int:
+        """Counter bumped by every write; results read at an older value may be stale"""
+        return self._write_generation
+
+    def _bump_generation(self) -> None:
+        with self._generation_lock:
+            self._write_generation += 1
+
+    def get_search_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Search result cache hit rate and occupancy, or None when disabled"""
+        if self.result_cache is None:
+            return None
+        return {**self.result_cache.stats(), "generation": self._write_generation}
+
+    def get_dedup_stats(self) -> Dict[str, int]:
+        """Deduplication counters and storage saved"""
+        return self.content_index.stats()
     
+    async def aadd_disease_knowledge(self, knowledge: DiseaseKnowledge) -> str:
+        """Async add_disease_knowledge(), run on the write pool"""
+        return await self.vector_store.run_write(self.add_disease_knowledge, knowledge)
+
     def add_disease_knowledge(self, knowledge: DiseaseKnowledge) -> str:
         """Add comprehensive disease knowledge"""
+        return self.add_knowledge(**self.disease_knowledge_document(knowledge))
+
+    def ingestion_pipeline(self) -> IngestionPipeline:
+        """Chunk → embed → persist pipeline for bulk ingest, sized from settings"""
+        return IngestionPipeline(
+            self,
+            chunk_workers=settings.INGEST_CHUNK_WORKERS,
+            embed_workers=settings.INGEST_EMBED_WORKERS,
+            persist_workers=settings.INGEST_PERSIST_WORKERS,
+            queue_size=settings.INGEST_QUEUE_SIZE,
+            embed_batch_size=settings.INGEST_EMBED_BATCH_SIZE
+        )
+
+    def disease_knowledge_document(self, knowledge: DiseaseKnowledge) -> Dict[str, Any]:
+        """Build add_knowledge arguments (content, disease, category, metadata) for disease knowledge"""
         if not knowledge.sources:
             raise ValueError("Disease knowledge must include at least one source")
-
-        doc_id = str(uuid.uuid4())
         
         # Create structured content
         content_parts = [
@@ -274,10 +755,8 @@ class KnowledgeBase:
         primary_source = knowledge.sources[0]
         source_year_match = re.search(r"(19|20)\d{2}", primary_source)
         source_year = source_year_match.group(0) if source_year_match else knowledge.last_updated.strftime("%Y")
-        source_id = self.DEFAULT_SOURCE_IDS_BY_DISEASE.get(
-            knowledge.disease_id,
-            self.FALLBACK_SOURCE_ID,
-        )
+        registry = self.source_registry.index()
+        source_id = registry.default_source(knowledge.disease_id) or self.FALLBACK_SOURCE_ID
 
         metadata = {
             'disease_id': knowledge.disease_id,
@@ -287,53 +766,284 @@ class KnowledgeBase:
             'sources': knowledge.sources,
             'source_id': source_id,
             'document_version': source_year,
-            'evidence_level': 'GUIDELINE_CONSENSUS'
+            'evidence_level': registry.default_evidence_level(source_id) or 'GUIDELINE_CONSENSUS'
         }
         
-        return self.add_knowledge(
-            content=content,
-            disease=knowledge.name,
-            category="comprehensive",
-            metadata=metadata
-        )
+        return {
+            'content': content,
+            'disease': knowledge.name,
+            'category': "comprehensive",
+            'metadata': metadata
+        }
     
     def search(
         self,
         query: str,
-        disease_filter: Optional[str] = None,
+        disease_filter: Optional[Union[str, List[str]]] = None,
         category_filter: Optional[str] = None,
-        n_results: int = 5
+        n_results: int = 5,
+        search_ef: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
         Search knowledge base
         
         Args:
             query: Search query
-            disease_filter: Filter by disease
+            disease_filter: Filter by disease, or by any of a list of diseases
             category_filter: Filter by category
             n_results: Number of results
+            search_ef: Optional HNSW search breadth, trading latency for recall
             
         Returns:
             List of search results
         """
-        # Build filter
-        filter_dict = {}
-        if disease_filter:
-            filter_dict['disease'] = disease_filter
-        if category_filter:
-            filter_dict['category'] = category_filter
+        return self.search_many(
+            [query], disease_filter, category_filter, n_results, search_ef
+        )[0]
+
+    async def asearch(
+        self,
+        query: str,
+        disease_filter: Optional[Union[str, List[str]]] = None,
+        category_filter: Optional[str] = None,
+        n_results: int = 5,
+        search_ef: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Async search(), run on the vector store's read pool"""
+        return await self.vector_store.run_read(
+            self.search, query, disease_filter, category_filter, n_results, search_ef
+        )
+
+    async def asearch_many(
+        self,
+        queries: List[str],
+        disease_filter: Optional[Union[str, List[str]]] = None,
+        category_filter: Optional[str] = None,
+        n_results: int = 5,
+        search_ef: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Async search_many(), run on the read pool"""
+        return await self.vector_store.run_read(
+            self.search_many, queries, disease_filter, category_filter, n_results, search_ef
+        )
+
+    def search_many(
+        self,
+        queries: List[str],
+        disease_filter: Optional[Union[str, List[str]]] = None,
+        category_filter: Optional[str] = None,
+        n_results: int = 5,
+        search_ef: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search knowledge base for several queries in one batch
         
-        results = self.vector_store.search(
-            query=query,
+        Args:
+            queries: Search queries
+            disease_filter: Filter by disease, or by any of a list of diseases
+            category_filter: Filter by category
+            n_results: Number of results per query
+            search_ef: Optional HNSW search breadth, trading latency for recall
+            
+        Returns:
+            List of search results per query, in input order
+        """
+        filter_dict = self._build_filter(disease_filter, category_filter)
+        if self.result_cache is None or not queries:
+            return self._search_uncached(queries, n_results, filter_dict, search_ef)
+
+        # Read the generation first so results racing a write are cached as stale
+        generation = self._write_generation
+        options = (
+            json.dumps(filter_dict, sort_keys=True, ensure_ascii=False),
+            n_results,
+            search_ef,
+            settings.SEARCH_MODE,
+        )
+        keys = [SearchResultCache.key(query, *options) for query in queries]
+        results = [self.result_cache.get(key, generation) for key in keys]
+
+        missing = {}
+        for key, query, cached in zip(keys, queries, results):
+            if cached is None:
+                missing.setdefault(key, query)
+        if missing:
+            fresh = dict(zip(
+                missing,
+                self._search_uncached(list(missing.values()), n_results, filter_dict, search_ef)
+            ))
+            for key, query_results in fresh.items():
+                self.result_cache.put(key, generation, query_results)
+            results = [
+                cached if cached is not None else fresh[key]
+                for key, cached in zip(keys, results)
+            ]
+        return results
+
+    def _search_uncached(
+        self,
+        queries: List[str],
+        n_results: int,
+        filter_dict: Optional[Dict[str, Any]],
+        search_ef: Optional[int]
+    ) -> List[List[Dict[str, Any]]]:
+        """Search the indexes and vector store, bypassing the result cache"""
+        candidate_ids = self._prefilter(filter_dict)
+        if settings.SEARCH_MODE != 'vector':
+            return self._search_lexical_or_hybrid(
+                queries, n_results, filter_dict, candidate_ids, search_ef
+            )
+
+        return self.vector_store.search_many(
+            queries=queries,
             n_results=n_results,
-            filter_dict=filter_dict if filter_dict else None
+            filter_dict=filter_dict,
+            candidate_ids=list(candidate_ids) if candidate_ids is not None else None,
+            search_ef=search_ef
         )
+
+    def _prefilter(self, filter_dict: Optional[Dict[str, Any]]) -> Optional[Set[str]]:
+        """
+        Ids matching filter_dict from the metadata index
+        
+        Returns None (let the store evaluate the filter) when there is no
+        filter, the index cannot answer it, or it keeps too much of the
+        collection to be worth narrowing.
+        """
+        if not filter_dict or not settings.METADATA_PREFILTER_ENABLED:
+            return None
+        self._ensure_metadata_index()
+        candidates = self.metadata_index.candidates(filter_dict)
+        if candidates is None:
+            return None
+        if len(candidates) > settings.METADATA_PREFILTER_MAX_SELECTIVITY * len(self.metadata_index):
+            return None
+        return candidates
+
+    def get_prefilter_stats(self) -> Dict[str, Any]:
+        """Metadata index size and measured filter selectivity"""
+        return self.metadata_index.stats()
+
+    def _search_lexical_or_hybrid(
+        self,
+        queries: List[str],
+        n_results: int,
+        filter_dict: Optional[Dict[str, Any]],
+        candidate_ids: Optional[Set[str]] = None,
+        search_ef: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Lexical or hybrid search for several queries
         
+        Queries that are a single known term (e.g. a drug name or lab code)
+        are answered from the lexical index alone without embedding them.
+        The rest are searched both ways and fused with reciprocal rank fusion.
+        """
+        self._ensure_lexical_index()
+        if candidate_ids is None and not self.lexical_index.can_filter(filter_dict):
+            # Let the store evaluate filters on fields the lexical index lacks
+            candidate_ids = {
+                record['id'] for record in self.vector_store.get_all_metadata(filter_dict)
+            }
+        lexical_hits = [
+            self.lexical_index.search(query, n_results, filter_dict, candidate_ids)
+            for query in queries
+        ]
+
+        results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        dense = []
+        for i, query in enumerate(queries):
+            if settings.SEARCH_MODE == 'lexical':
+                results[i] = self._lexical_results(lexical_hits[i])
+                continue
+            if (
+                settings.LEXICAL_FAST_PATH_ENABLED
+                and lexical_hits[i]
+                and self.lexical_index.is_known_term(query)
+            ):
+                # Only a chunk holding the whole term answers it without embedding
+                documents = self._lexical_results(lexical_hits[i])
+                if any(LexicalIndex.contains_term(doc['content'], query) for doc in documents):
+                    results[i] = documents
+                    continue
+            dense.append(i)
+
+        if dense:
+            vector_results = self.vector_store.search_many(
+                queries=[queries[i] for i in dense],
+                n_results=n_results,
+                filter_dict=filter_dict,
+                candidate_ids=list(candidate_ids) if candidate_ids is not None else None,
+                search_ef=search_ef
+            )
+            for i, vector_hits in zip(dense, vector_results):
+                results[i] = self._fuse(vector_hits, lexical_hits[i], n_results)
+
+        return results
+
+    def _lexical_results(self, hits: List[Tuple[str, float]]) -> List[Dict[str, Any]]:
+        """Load lexical hits from the store in search result format"""
+        scores = dict(hits)
+        documents = self.vector_store.get_documents([doc_id for doc_id, _ in hits])
+        for document in documents:
+            score = scores[document['id']]
+            document['distance'] = LexicalIndex.score_to_distance(score)
+            document['lexical_score'] = score
+        return documents
+
+    def _fuse(
+        self,
+        vector_hits: List[Dict[str, Any]],
+        lexical_hits: List[Tuple[str, float]],
+        n_results: int
+    ) -> List[Dict[str, Any]]:
+        """Merge vector and lexical rankings with reciprocal rank fusion"""
+        fused = reciprocal_rank_fusion(
+            [[hit['id'] for hit in vector_hits], [doc_id for doc_id, _ in lexical_hits]],
+            k=settings.HYBRID_RRF_K
+        )[:n_results]
+
+        by_id = {hit['id']: hit for hit in vector_hits}
+        lexical_only = [(doc_id, score) for doc_id, score in lexical_hits if doc_id not in by_id]
+        for document in self._lexical_results(lexical_only):
+            by_id[document['id']] = document
+
+        results = []
+        for doc_id, fusion_score in fused:
+            if doc_id in by_id:
+                results.append({**by_id[doc_id], 'fusion_score': fusion_score})
         return results
+
+    def _build_filter(
+        self,
+        disease_filter: Optional[Union[str, List[str]]] = None,
+        category_filter: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Build a metadata filter from disease and category filters"""
+        clauses = []
+        if disease_filter:
+            if isinstance(disease_filter, str):
+                disease_filter = [disease_filter]
+            diseases = list(dict.fromkeys(disease_filter))
+            if len(diseases) == 1:
+                clauses.append({'disease': diseases[0]})
+            else:
+                clauses.append({'disease': {'$in': diseases}})
+        if category_filter:
+            clauses.append({'category': category_filter})
+
+        if not clauses:
+            return None
+        # Chroma needs an explicit $and to combine conditions on several fields
+        return clauses[0] if len(clauses) == 1 else {'$and': clauses}
     
     def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
         """Get document by ID"""
         return self.vector_store.get_document(doc_id)
+
+    async def aget_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Async get_document(), run on the read pool"""
+        return await self.vector_store.aget_document(doc_id)
     
     def update_document(
         self,
@@ -342,11 +1052,107 @@ class KnowledgeBase:
         metadata: Optional[Dict[str, Any]] = None
     ) -> bool:
         """Update document"""
-        return self.vector_store.update_document(doc_id, content, metadata)
+        with self._index_lock:
+            previous = self.vector_store.get_document(doc_id) if (metadata or content) else None
+            if content and previous:
+                metadata = self._rehash_edited_document(doc_id, previous, content, metadata)
+            try:
+                if not self.vector_store.update_document(doc_id, content, metadata):
+                    return False
+
+                current = None
+                if previous or self.lexical_index.loaded:
+                    current = self.vector_store.get_document(doc_id)
+                if previous and self.content_index.loaded:
+                    self.content_index.remove(previous['metadata'])
+                    self.content_index.add(current['metadata'] if current else metadata)
+                if previous and self.aggregates.loaded:
+                    self.aggregates.remove(previous['metadata'])
+                    self.aggregates.add(current['metadata'] if current else metadata)
+                if previous and self.metadata_index.loaded:
+                    self.metadata_index.remove(doc_id, previous['metadata'])
+                    self.metadata_index.add(doc_id, current['metadata'] if current else metadata)
+                if current and self.lexical_index.loaded:
+                    self.lexical_index.add(doc_id, current['content'], current['metadata'])
+            finally:
+                self._bump_generation()
+            return True
     
+    def _rehash_edited_document(
+        self,
+        doc_id: str,
+        previous: Dict[str, Any],
+        content: str,
+        metadata: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Metadata for a content edit, with the document hash brought up to date
+        
+        A single-vector document is rehashed from its new text. Editing one
+        chunk of a larger document leaves no text to hash the whole document
+        by, so its hash is cleared on every chunk and the old text can be
+        added again as a new document.
+        """
+        metadata = dict(metadata or previous['metadata'])
+        hash_field = ContentHashIndex.DOCUMENT_HASH_FIELD
+        if 'chunk_index' not in previous['metadata']:
+            metadata[hash_field] = content_hash(content)
+            return metadata
+
+        # Stores merge metadata on update, so the hash is blanked rather than dropped
+        metadata[hash_field] = ''
+        owner = previous['metadata'].get('doc_id') or doc_id
+        for sibling in self.vector_store.get_all_metadata({'doc_id': owner}):
+            if sibling['id'] == doc_id or not sibling['metadata'].get(hash_field):
+                continue
+            cleared = {**sibling['metadata'], hash_field: ''}
+            if self.vector_store.update_document(sibling['id'], None, cleared) \
+                    and self.content_index.loaded:
+                self.content_index.remove(sibling['metadata'])
+        return metadata
+
+    async def aupdate_document(
+        self,
+        doc_id: str,
+        content: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Async update_document(), run on the write pool"""
+        return await self.vector_store.run_write(self.update_document, doc_id, content, metadata)
+
+    async def adelete_document(self, doc_id: str) -> bool:
+        """Async delete_document(), run on the write pool"""
+        return await self.vector_store.run_write(self.delete_document, doc_id)
+
     def delete_document(self, doc_id: str) -> bool:
-        """Delete document"""
-        return self.vector_store.delete_document(doc_id)
+        """Delete a document and all of its chunks"""
+        with self._index_lock:
+            document = self.vector_store.get_document(doc_id)
+            records = [document] if document else self.vector_store.get_all_metadata(
+                {'doc_id': doc_id}
+            )
+            if not records:
+                return False
+
+            try:
+                if not self.vector_store.delete_documents([record['id'] for record in records]):
+                    return False
+
+                if self.content_index.loaded:
+                    for record in records:
+                        self.content_index.remove(record['metadata'])
+                if self.aggregates.loaded:
+                    for record in records:
+                        self.aggregates.remove(record['metadata'])
+                if self.lexical_index.loaded:
+                    for record in records:
+                        self.lexical_index.remove(record['id'])
+                if self.metadata_index.loaded:
+                    for record in records:
+                        self.metadata_index.remove(record['id'], record['metadata'])
+            finally:
+                self._bump_generation()
+            return True
     
     def get_documents_by_disease(
         self,
@@ -356,47 +1162,89 @@ class KnowledgeBase:
         return self.vector_store.get_all_documents(
             filter_dict={'disease': disease}
         )
+
+    def list_documents_by_disease(
+        self,
+        disease: str,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        include: str = 'full'
+    ) -> Dict[str, Any]:
+        """Get one page of documents for a specific disease"""
+        return self.vector_store.list_documents(
+            filter_dict={'disease': disease},
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            include=include
+        )
+    
+    async def alist_documents_by_disease(
+        self,
+        disease: str,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        include: str = 'full'
+    ) -> Dict[str, Any]:
+        """Async list_documents_by_disease(), run on the read pool"""
+        return await self.vector_store.run_read(
+            self.list_documents_by_disease, disease, limit, offset, cursor, include
+        )
     
     def get_all_diseases(self) -> List[str]:
         """Get list of all diseases in knowledge base"""
-        all_docs = self.vector_store.get_all_documents()
-        diseases = set()
-        
-        for doc in all_docs:
-            if 'disease' in doc['metadata']:
-                diseases.add(doc['metadata']['disease'])
-        
-        return sorted(list(diseases))
+        self._ensure_aggregates()
+        return list(self.aggregates.counts('disease'))
 
     def get_metadata_summary(self) -> Dict[str, Dict[str, int]]:
-        """Summarize document counts by disease and category"""
-        all_docs = self.vector_store.get_all_documents()
-        disease_counts: Dict[str, int] = {}
-        category_counts: Dict[str, int] = {}
+        """Summarize document counts by disease, category, source and evidence level"""
+        self._ensure_aggregates()
+        return {
+            "diseases": self.aggregates.counts('disease'),
+            "categories": self.aggregates.counts('category'),
+            "sources": self.aggregates.counts('source_id'),
+            "evidence_levels": self.aggregates.counts('evidence_level')
+        }
 
-        for doc in all_docs:
-            metadata = doc.get("metadata", {})
-            disease = metadata.get("disease")
-            category = metadata.get("category")
+    async def aget_all_diseases(self) -> List[str]:
+        """Async get_all_diseases(), run on the read pool (the first call may scan)"""
+        return await self.vector_store.run_read(self.get_all_diseases)
 
-            if disease:
-                disease_counts[disease] = disease_counts.get(disease, 0) + 1
-            if category:
-                category_counts[category] = category_counts.get(category, 0) + 1
+    async def aget_metadata_summary(self) -> Dict[str, Dict[str, int]]:
+        """Async get_metadata_summary(), run on the read pool"""
+        return await self.vector_store.run_read(self.get_metadata_summary)
 
-        return {
-            "diseases": dict(sorted(disease_counts.items())),
-            "categories": dict(sorted(category_counts.items()))
-        }
+    def get_aggregate_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Metadata counts with their generation counters"""
+        self._ensure_aggregates()
+        return self.aggregates.summary()
     
     def count_documents(self, disease: Optional[str] = None) -> int:
         """Count documents in knowledge base"""
+        if self.aggregates.loaded:
+            if disease:
+                return self.aggregates.count('disease', disease)
+            return self.aggregates.total()
         filter_dict = {'disease': disease} if disease else None
         return self.vector_store.count(filter_dict)
     
+    async def acount_documents(self, disease: Optional[str] = None) -> int:
+        """Async count_documents(), run on the read pool"""
+        return await self.vector_store.run_read(self.count_documents, disease)
+    
     def clear(self):
         """Clear all knowledge"""
-        self.vector_store.clear()
+        with self._index_lock:
+            try:
+                self.vector_store.clear()
+                self.content_index.clear()
+                self.aggregates.clear()
+                self.lexical_index.clear()
+                self.metadata_index.clear()
+            finally:
+                self._bump_generation()
 
 
 # Global knowledge base instance
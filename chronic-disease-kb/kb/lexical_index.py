@@ -0,0 +1,259 @@
+"""
+Lexical index module
+In-process BM25 inverted index with CJK-aware tokenization, and
+reciprocal rank fusion for combining lexical and vector rankings
+"""
+
+import math
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from kb.where import matches_where, validate_where, where_fields
+
+# Han ideographs (including extension A and compatibility blocks)
+_CJK_CHARS = r"\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+# Words stop at Han characters, so "SGLT2抑制剂" is a word plus bigrams
+_TOKEN_PATTERN = re.compile(rf"([{_CJK_CHARS}]+)|([^\W_{_CJK_CHARS}]+)")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into index terms
+
+    Chinese runs become overlapping character bigrams (a lone character is
+    kept as is); other text becomes case-folded word tokens, so "HbA1c"
+    and "hba1c" match. Mixed runs such as "COPD患者" split at the script
+    change.
+    """
+    terms: List[str] = []
+    for cjk, word in _TOKEN_PATTERN.findall(unicodedata.normalize("NFKC", text).casefold()):
+        if cjk:
+            if len(cjk) == 1:
+                terms.append(cjk)
+            else:
+                terms.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+        else:
+            terms.append(word)
+    return terms
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]],
+    k: int = 60
+) -> List[Tuple[str, float]]:
+    """
+    Fuse several ranked id lists with reciprocal rank fusion
+
+    Args:
+        rankings: Id lists, best first
+        k: Rank smoothing constant
+
+    Returns:
+        (id, fused score) pairs, best first
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over stored chunks
+
+    Postings map each term to the ids containing it with term frequencies.
+    Only the metadata needed for filtering is kept alongside; chunk text is
+    read back from the vector store when results are returned.
+    """
+
+    FILTER_FIELDS = ("disease", "category", "source_id", "evidence_level", "language")
+    # Longer unbroken queries are phrases or sentences, not terms
+    MAX_KNOWN_TERM_TERMS = 8
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Dict[str, int]] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._metadata: Dict[str, Dict[str, Any]] = {}
+        self._total_length = 0
+        self._loaded = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def rebuild(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Rebuild from stored records with 'id', 'content' and 'metadata'"""
+        with self._lock:
+            self._reset()
+            for record in records:
+                self._add(record['id'], record['content'], record['metadata'])
+            self._loaded = True
+
+    def add(self, vector_id: str, text: str, metadata: Dict[str, Any]) -> None:
+        """Index a newly stored chunk (replacing any previous version)"""
+        with self._lock:
+            self._remove(vector_id)
+            self._add(vector_id, text, metadata)
+
+    def remove(self, vector_id: str) -> None:
+        """Drop a deleted chunk from the index"""
+        with self._lock:
+            self._remove(vector_id)
+
+    def clear(self) -> None:
+        """Drop every posting (the store was cleared)"""
+        with self._lock:
+            self._reset()
+
+    def is_known_term(self, query: str) -> bool:
+        """
+        Whether query is a single term present in the index
+
+        A term is one unbroken word or short run of Chinese characters,
+        such as "HbA1c" or "二甲双胍", whose index terms all occur in one
+        chunk. Postings carry no positions, so adjacency is left to
+        contains_term on the chunks returned.
+        """
+        if len(query.split()) != 1:
+            return False
+        terms = set(tokenize(query))
+        if not terms or len(terms) > self.MAX_KNOWN_TERM_TERMS:
+            return False
+        with self._lock:
+            postings = sorted(
+                (self._postings.get(term, {}) for term in terms), key=len
+            )
+            shared = set(postings[0])
+            for posting in postings[1:]:
+                if not shared:
+                    break
+                shared.intersection_update(posting)
+            return bool(shared)
+
+    @staticmethod
+    def contains_term(text: str, query: str) -> bool:
+        """Whether text contains query as one contiguous run, normalized as in tokenize"""
+        def normalize(value: str) -> str:
+            return unicodedata.normalize("NFKC", value).casefold()
+
+        return normalize(query.strip()) in normalize(text)
+
+    def can_filter(self, filter_dict: Optional[Dict[str, Any]]) -> bool:
+        """Whether filter_dict reads only the metadata fields kept per chunk"""
+        return where_fields(filter_dict) <= set(self.FILTER_FIELDS)
+
+    def search(
+        self,
+        query: str,
+        n_results: int = 5,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        candidate_ids: Optional[Set[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Rank chunks by BM25 score for query
+
+        Args:
+            query: Search query
+            n_results: Number of results
+            filter_dict: Optional metadata filters
+            candidate_ids: Optional ids already known to match filter_dict
+
+        Returns:
+            (id, score) pairs, best first
+
+        Raises:
+            ValueError: filter_dict uses an unsupported operator, or fields
+                outside FILTER_FIELDS without candidate_ids (see can_filter)
+        """
+        validate_where(filter_dict)
+        if candidate_ids is None and not self.can_filter(filter_dict):
+            raise ValueError("Filter reads fields the lexical index does not keep; pass candidate_ids")
+        terms = tokenize(query)
+        with self._lock:
+            doc_count = len(self._doc_lengths)
+            if not terms or not doc_count:
+                return []
+            avg_length = self._total_length / doc_count
+
+            scores: Dict[str, float] = {}
+            for term in set(terms):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1.0 + (doc_count - df + 0.5) / (df + 0.5))
+                query_tf = terms.count(term)
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1.0 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + (
+                        query_tf * idf * tf * (self.k1 + 1.0) / (tf + norm)
+                    )
+
+            if candidate_ids is not None:
+                scores = {
+                    doc_id: score for doc_id, score in scores.items()
+                    if doc_id in candidate_ids
+                }
+            elif filter_dict:
+                scores = {
+                    doc_id: score for doc_id, score in scores.items()
+                    if matches_where(self._metadata[doc_id], filter_dict)
+                }
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:n_results]
+
+    @staticmethod
+    def score_to_distance(score: float) -> float:
+        """Map an unbounded BM25 score onto a (0, 1] distance (higher score, smaller distance)"""
+        return 1.0 / (1.0 + max(score, 0.0))
+
+    def stats(self) -> Dict[str, int]:
+        """Index size"""
+        with self._lock:
+            return {
+                "documents": len(self._doc_lengths),
+                "terms": len(self._postings),
+            }
+
+    def _reset(self) -> None:
+        self._postings = {}
+        self._doc_terms = {}
+        self._doc_lengths = {}
+        self._metadata = {}
+        self._total_length = 0
+
+    def _add(self, vector_id: str, text: str, metadata: Dict[str, Any]) -> None:
+        frequencies: Dict[str, int] = {}
+        for term in tokenize(text):
+            frequencies[term] = frequencies.get(term, 0) + 1
+        for term, tf in frequencies.items():
+            self._postings.setdefault(term, {})[vector_id] = tf
+
+        length = sum(frequencies.values())
+        self._doc_terms[vector_id] = frequencies
+        self._doc_lengths[vector_id] = length
+        self._metadata[vector_id] = {
+            field: metadata[field] for field in self.FILTER_FIELDS if field in metadata
+        }
+        self._total_length += length
+
+    def _remove(self, vector_id: str) -> None:
+        frequencies = self._doc_terms.pop(vector_id, None)
+        if frequencies is None:
+            return
+        for term in frequencies:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(vector_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(vector_id, 0)
+        self._metadata.pop(vector_id, None)
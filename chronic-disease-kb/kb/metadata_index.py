@@ -0,0 +1,155 @@
+"""
+Metadata posting-list index
+Maps filterable metadata values to the ids of stored vectors so filtered
+searches can be narrowed to a candidate set before scoring
+"""
+
+import threading
+from typing import Any, Dict, Iterable, Optional, Set
+
+from kb.where import field_conditions, validate_where
+
+
+class MetadataIndex:
+    """
+    Posting lists of stored vector ids per metadata value
+
+    candidates() answers equality, $in, $and and $or filters over the
+    indexed fields. Filters it cannot answer exactly (other fields or
+    supported operators) return None so the caller falls back to the
+    store's own where clause; unsupported operators raise ValueError, as
+    they do in every where evaluator. Selectivity of every answered
+    filter is recorded.
+    """
+
+    FIELDS = ("disease", "category", "source_id", "evidence_level", "language")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in self.FIELDS}
+        self._ids: Set[str] = set()
+        self._loaded = False
+        self._lookups = 0
+        self._selectivity_total = 0.0
+        self._last_selectivity: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def rebuild(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Rebuild from stored records with 'id' and 'metadata'"""
+        with self._lock:
+            self._postings = {field: {} for field in self.FIELDS}
+            self._ids = set()
+            for record in records:
+                self._add(record['id'], record['metadata'])
+            self._loaded = True
+
+    def add(self, vector_id: str, metadata: Dict[str, Any]) -> None:
+        """Index a newly stored vector"""
+        with self._lock:
+            self._add(vector_id, metadata)
+
+    def remove(self, vector_id: str, metadata: Dict[str, Any]) -> None:
+        """Unindex a deleted vector"""
+        with self._lock:
+            self._ids.discard(vector_id)
+            for field in self.FIELDS:
+                postings = self._postings[field].get(metadata.get(field))
+                if postings is not None:
+                    postings.discard(vector_id)
+                    if not postings:
+                        del self._postings[field][metadata.get(field)]
+
+    def clear(self) -> None:
+        """Drop every posting list (the store was cleared)"""
+        with self._lock:
+            self._postings = {field: {} for field in self.FIELDS}
+            self._ids = set()
+
+    def candidates(self, filter_dict: Optional[Dict[str, Any]]) -> Optional[Set[str]]:
+        """
+        Ids of stored vectors matching filter_dict
+
+        Args:
+            filter_dict: Chroma-style metadata filter
+
+        Returns:
+            Matching ids, or None if the filter cannot be answered from the index
+
+        Raises:
+            ValueError: filter_dict uses an unsupported operator
+        """
+        if not filter_dict:
+            return None
+        validate_where(filter_dict)
+        with self._lock:
+            matched = self._evaluate(filter_dict)
+            if matched is None:
+                return None
+            selectivity = len(matched) / len(self._ids) if self._ids else 0.0
+            self._lookups += 1
+            self._selectivity_total += selectivity
+            self._last_selectivity = selectivity
+            return matched
+
+    def stats(self) -> Dict[str, Any]:
+        """Index size and measured filter selectivity"""
+        with self._lock:
+            return {
+                "indexed_vectors": len(self._ids),
+                "distinct_values": {
+                    field: len(values) for field, values in self._postings.items()
+                },
+                "filtered_lookups": self._lookups,
+                "avg_selectivity": (
+                    self._selectivity_total / self._lookups if self._lookups else None
+                ),
+                "last_selectivity": self._last_selectivity,
+            }
+
+    def _add(self, vector_id: str, metadata: Dict[str, Any]) -> None:
+        self._ids.add(vector_id)
+        for field in self.FIELDS:
+            value = metadata.get(field)
+            if value is not None:
+                self._postings[field].setdefault(value, set()).add(vector_id)
+
+    def _evaluate(self, filter_dict: Dict[str, Any]) -> Optional[Set[str]]:
+        matched: Optional[Set[str]] = None
+        for key, condition in filter_dict.items():
+            if key == "$and":
+                part = self._combine(condition, set.intersection)
+            elif key == "$or":
+                part = self._combine(condition, set.union)
+            else:
+                part = self._field_ids(key, condition)
+            if part is None:
+                return None
+            matched = part if matched is None else matched & part
+        return matched if matched is not None else set(self._ids)
+
+    def _combine(self, clauses, operation) -> Optional[Set[str]]:
+        parts = [self._evaluate(clause) for clause in clauses]
+        if not parts or any(part is None for part in parts):
+            return None
+        return operation(*parts)
+
+    def _field_ids(self, field: str, condition: Any) -> Optional[Set[str]]:
+        if field not in self._postings:
+            return None
+        values = self._postings[field]
+        matched: Optional[Set[str]] = None
+        for operator, operand in field_conditions(condition):
+            if operator == "$eq":
+                part = set(values.get(operand, ()))
+            elif operator == "$in":
+                part = set().union(*(values.get(value, ()) for value in operand))
+            else:
+                return None
+            matched = part if matched is None else matched & part
+        return matched
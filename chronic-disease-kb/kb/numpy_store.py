@@ -0,0 +1,646 @@
+"""
+Exact-search vector storage backend using NumPy
+Keeps normalized float32 embeddings in a memory-mapped .npy file and
+ids, documents and metadata in a SQLite side table, optionally with a
+resident int8/float16 copy of the embeddings for first-pass scoring
+"""
+
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from kb.evaluation import recall_at_k
+from kb.where import COMPARISONS, compare, field_conditions
+
+
+class NumpyCollection:
+    """
+    Collection backed by a memory-mapped embedding matrix
+
+    Implements the subset of the ChromaDB collection API that VectorStore
+    uses (add, query, get, update, delete, count) with the same argument
+    names and result shapes. Top-k queries are one matrix-vector product
+    plus argpartition; `where` filters are evaluated as boolean masks that
+    are cached per (field, value) until the next write.
+
+    Deleted rows are tombstoned and compacted away once they make up a
+    quarter of the matrix.
+
+    With quantization set to "int8" or "float16", queries are first scored
+    against a resident quantized copy of the matrix, and the best
+    k * rescore_factor candidates are rescored with the full-precision
+    vectors from the memory-mapped file, which stays on disk.
+    """
+
+    MATRIX_FILENAME = "embeddings.npy"
+    TABLE_FILENAME = "records.sqlite3"
+    INITIAL_CAPACITY = 1024
+    QUANTIZATION_MODES = ("none", "float16", "int8")
+    # Rows dequantized per block while scoring, bounding temporary memory
+    SCORE_BLOCK_ROWS = 8192
+
+    def __init__(
+        self,
+        path: str,
+        name: str = "medical_knowledge",
+        quantization: str = "none",
+        rescore_factor: int = 4
+    ):
+        if quantization not in self.QUANTIZATION_MODES:
+            raise ValueError(
+                f"Unknown quantization '{quantization}'. "
+                f"Allowed values: {', '.join(self.QUANTIZATION_MODES)}"
+            )
+        self.name = name
+        self.path = os.path.join(path, name)
+        self.quantization = quantization
+        self.rescore_factor = max(1, rescore_factor)
+        os.makedirs(self.path, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(
+            os.path.join(self.path, self.TABLE_FILENAME),
+            check_same_thread=False
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            "id TEXT PRIMARY KEY, row INTEGER NOT NULL UNIQUE, "
+            "document TEXT, metadata TEXT NOT NULL)"
+        )
+        self._db.commit()
+
+        self._matrix: Optional[np.ndarray] = None
+        self._quantized: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._count = 0
+        self._ids: List[Optional[str]] = []
+        self._metadatas: List[Optional[Dict[str, Any]]] = []
+        self._rows: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._masks: Dict[Any, np.ndarray] = {}
+        self._deferred = 0
+        self._load()
+
+    @property
+    def dimension(self) -> int:
+        """Embedding dimension (0 until the first vector is added)"""
+        return self._matrix.shape[1] if self._matrix is not None else 0
+
+    @property
+    def _matrix_path(self) -> str:
+        return os.path.join(self.path, self.MATRIX_FILENAME)
+
+    def _load(self) -> None:
+        rows = self._db.execute(
+            "SELECT id, row, metadata FROM records ORDER BY row"
+        ).fetchall()
+        self._count = rows[-1][1] + 1 if rows else 0
+        self._ids = [None] * self._count
+        self._metadatas = [None] * self._count
+        self._alive = np.zeros(self._count, dtype=bool)
+        for doc_id, row, metadata in rows:
+            self._ids[row] = doc_id
+            self._metadatas[row] = json.loads(metadata)
+            self._rows[doc_id] = row
+            self._alive[row] = True
+
+        if os.path.exists(self._matrix_path):
+            self._matrix = np.load(self._matrix_path, mmap_mode="r+")
+            self._rebuild_quantized(self._count)
+
+    def _quantize(self, vectors: np.ndarray):
+        """Quantize normalized vectors; int8 uses one scale per row"""
+        if self.quantization == "float16":
+            return vectors.astype(np.float16), None
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.rint(vectors / scales[:, np.newaxis]).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+
+    def _rebuild_quantized(self, used_rows: int) -> None:
+        """Rebuild the resident quantized matrix from the full-precision file"""
+        if self.quantization == "none" or self._matrix is None:
+            self._quantized = None
+            self._scales = None
+            return
+
+        capacity, dim = self._matrix.shape
+        dtype = np.float16 if self.quantization == "float16" else np.int8
+        self._quantized = np.zeros((capacity, dim), dtype=dtype)
+        self._scales = np.ones(capacity, dtype=np.float32) if dtype == np.int8 else None
+        for start in range(0, used_rows, self.SCORE_BLOCK_ROWS):
+            end = min(start + self.SCORE_BLOCK_ROWS, used_rows)
+            self._store_quantized(start, np.asarray(self._matrix[start:end]))
+
+    def _store_quantized(self, rows, vectors: np.ndarray) -> None:
+        if self._quantized is None:
+            return
+        if isinstance(rows, int):
+            rows = slice(rows, rows + len(vectors))
+        quantized, scales = self._quantize(vectors)
+        self._quantized[rows] = quantized
+        if scales is not None:
+            self._scales[rows] = scales
+
+    def _ensure_capacity(self, rows: int, dim: int) -> None:
+        if self._matrix is not None and self._matrix.shape[1] != dim:
+            raise ValueError(
+                f"Embedding dimension {dim} does not match collection dimension "
+                f"{self._matrix.shape[1]}"
+            )
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        if self._count + rows <= capacity:
+            return
+
+        new_capacity = max(capacity, self.INITIAL_CAPACITY)
+        while new_capacity < self._count + rows:
+            new_capacity *= 2
+        self._rewrite_matrix(np.arange(self._count), new_capacity, dim)
+
+    def _rewrite_matrix(self, keep_rows: np.ndarray, capacity: int, dim: int) -> None:
+        """Copy keep_rows into a fresh matrix file and swap it in atomically"""
+        tmp_path = self._matrix_path + ".tmp"
+        matrix = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.float32, shape=(capacity, dim)
+        )
+        if self._matrix is not None and len(keep_rows):
+            matrix[:len(keep_rows)] = self._matrix[keep_rows]
+        matrix.flush()
+        del matrix
+        os.replace(tmp_path, self._matrix_path)
+        self._matrix = np.load(self._matrix_path, mmap_mode="r+")
+        self._rebuild_quantized(len(keep_rows))
+
+    def _after_write(self) -> None:
+        """Drop cached masks and compact once tombstones dominate"""
+        self._masks = {}
+        if self._deferred:
+            return
+        if self._matrix is not None:
+            self._matrix.flush()
+        dead = self._count - int(self._alive.sum())
+        if dead and dead * 4 >= self._count:
+            self.compact()
+
+    @contextlib.contextmanager
+    def deferred_index_maintenance(self) -> Iterator[None]:
+        """Postpone flushing and compaction until the outermost block exits"""
+        with self._lock:
+            self._deferred += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._deferred -= 1
+                if not self._deferred:
+                    self._after_write()
+
+    def compact(self, min_capacity: Optional[int] = None) -> None:
+        """
+        Rewrite the matrix and side table without tombstoned rows
+
+        Args:
+            min_capacity: Rows to preallocate for future writes
+                (default INITIAL_CAPACITY; 0 trims the matrix to fit)
+        """
+        if min_capacity is None:
+            min_capacity = self.INITIAL_CAPACITY
+        with self._lock:
+            keep = np.flatnonzero(self._alive)
+            dim = self._matrix.shape[1] if self._matrix is not None else 0
+            if self._matrix is not None:
+                capacity = max(min_capacity, len(keep))
+                self._rewrite_matrix(keep, capacity, dim)
+
+            ids = [self._ids[row] for row in keep]
+            metadatas = [self._metadatas[row] for row in keep]
+            # Shift rows out of the way first so the UNIQUE(row) constraint holds
+            self._db.execute("UPDATE records SET row = -row - 1")
+            self._db.executemany(
+                "UPDATE records SET row = ? WHERE id = ?",
+                [(row, doc_id) for row, doc_id in enumerate(ids)]
+            )
+            self._db.commit()
+
+            self._ids = ids
+            self._metadatas = metadatas
+            self._rows = {doc_id: row for row, doc_id in enumerate(ids)}
+            self._count = len(ids)
+            self._alive = np.ones(self._count, dtype=bool)
+            self._masks = {}
+
+    def reset(self) -> None:
+        """Remove every record and the embedding matrix"""
+        with self._lock:
+            self._db.execute("DELETE FROM records")
+            self._db.commit()
+            self._matrix = None
+            self._quantized = None
+            self._scales = None
+            if os.path.exists(self._matrix_path):
+                os.remove(self._matrix_path)
+            self._count = 0
+            self._ids = []
+            self._metadatas = []
+            self._rows = {}
+            self._alive = np.zeros(0, dtype=bool)
+            self._masks = {}
+
+    def close(self) -> None:
+        """Flush the matrix and close the side table"""
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+            self._matrix = None
+            self._db.close()
+
+    def _field_mask(self, field: str, value: Any) -> np.ndarray:
+        key = (field, json.dumps(value, sort_keys=True))
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = np.fromiter(
+                (
+                    metadata is not None and metadata.get(field) == value
+                    for metadata in self._metadatas
+                ),
+                dtype=bool,
+                count=self._count
+            )
+            self._masks[key] = mask
+        return mask
+
+    def _where_mask(self, where: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Evaluate a Chroma-style where clause to a row mask"""
+        mask = self._alive.copy()
+        if not where:
+            return mask
+
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self._where_mask(clause)
+            elif key == "$or":
+                any_mask = np.zeros(self._count, dtype=bool)
+                for clause in condition:
+                    any_mask |= self._where_mask(clause)
+                mask &= any_mask
+            elif key.startswith("$"):
+                raise ValueError(f"Unsupported where operator: {key}")
+            else:
+                for operator, value in field_conditions(condition):
+                    mask &= self._operator_mask(key, operator, value)
+        return mask
+
+    def _operator_mask(self, field: str, operator: str, value: Any) -> np.ndarray:
+        if operator == "$eq":
+            return self._field_mask(field, value)
+        if operator == "$ne":
+            return ~self._field_mask(field, value)
+        if operator in ("$in", "$nin"):
+            any_mask = np.zeros(self._count, dtype=bool)
+            for item in value:
+                any_mask |= self._field_mask(field, item)
+            return any_mask if operator == "$in" else ~any_mask
+
+        if operator not in COMPARISONS:
+            raise ValueError(f"Unsupported where operator: {operator}")
+        return np.fromiter(
+            (
+                metadata is not None and compare(metadata.get(field), operator, value)
+                for metadata in self._metadatas
+            ),
+            dtype=bool,
+            count=self._count
+        )
+
+    @staticmethod
+    def _normalize(embeddings: Sequence[Sequence[float]]) -> np.ndarray:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[np.newaxis, :]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add(
+        self,
+        embeddings: Sequence[Sequence[float]],
+        documents: Optional[Sequence[str]] = None,
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+        ids: Optional[Sequence[str]] = None
+    ) -> None:
+        """Append records; ids must not already exist"""
+        vectors = self._normalize(embeddings)
+        ids = list(ids or [])
+        documents = list(documents) if documents is not None else [None] * len(ids)
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in ids]
+        if not (len(ids) == len(vectors) == len(documents) == len(metadatas)):
+            raise ValueError("ids, embeddings, documents and metadatas must have equal length")
+        if len(set(ids)) != len(ids):
+            raise ValueError("Duplicate ids in add request")
+
+        with self._lock:
+            existing = [doc_id for doc_id in ids if doc_id in self._rows]
+            if existing:
+                raise ValueError(f"IDs already exist in collection: {existing[:5]}")
+            if not ids:
+                return
+
+            self._ensure_capacity(len(ids), vectors.shape[1])
+            start = self._count
+            self._matrix[start:start + len(ids)] = vectors
+            self._store_quantized(start, vectors)
+
+            self._db.executemany(
+                "INSERT INTO records (id, row, document, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (doc_id, start + i, document, json.dumps(metadata or {}, ensure_ascii=False))
+                    for i, (doc_id, document, metadata) in enumerate(zip(ids, documents, metadatas))
+                ]
+            )
+            self._db.commit()
+
+            for i, (doc_id, metadata) in enumerate(zip(ids, metadatas)):
+                self._ids.append(doc_id)
+                self._metadatas.append(dict(metadata or {}))
+                self._rows[doc_id] = start + i
+            self._alive = np.concatenate([self._alive, np.ones(len(ids), dtype=bool)])
+            self._count += len(ids)
+            self._after_write()
+
+    def query(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        n_results: int = 10,
+        where: Optional[Dict[str, Any]] = None,
+        include: Sequence[str] = ("documents", "metadatas", "distances"),
+        ids: Optional[Sequence[str]] = None
+    ) -> Dict[str, List[List[Any]]]:
+        """Cosine top-k for each query embedding, optionally restricted to candidate ids"""
+        queries = self._normalize(query_embeddings)
+        with self._lock:
+            matrix = self._matrix
+            quantized = self._quantized
+            scales = self._scales
+            if ids is None:
+                mask = self._where_mask(where)
+            else:
+                mask = np.zeros(self._count, dtype=bool)
+                mask[[self._rows[doc_id] for doc_id in ids if doc_id in self._rows]] = True
+                mask &= self._alive
+                if where:
+                    mask &= self._where_mask(where)
+            row_ids = self._ids
+            metadatas = self._metadatas
+
+        results: Dict[str, List[List[Any]]] = {
+            "ids": [], "documents": [], "metadatas": [], "distances": []
+        }
+        candidates = np.flatnonzero(mask)
+        k = min(n_results, len(candidates))
+        if matrix is None or k == 0:
+            for key in results:
+                results[key] = [[] for _ in queries]
+            return results
+
+        for rows, similarities in self._top_k(matrix, candidates, queries, k, quantized, scales):
+            top_ids = [row_ids[row] for row in rows]
+            results["ids"].append(top_ids)
+            results["metadatas"].append([dict(metadatas[row]) for row in rows])
+            results["distances"].append([float(1.0 - s) for s in similarities])
+            results["documents"].append(
+                self._documents(top_ids) if "documents" in include else [None] * len(rows)
+            )
+        return results
+
+    def _top_k(
+        self,
+        matrix: np.ndarray,
+        candidates: np.ndarray,
+        queries: np.ndarray,
+        k: int,
+        quantized: Optional[np.ndarray] = None,
+        scales: Optional[np.ndarray] = None
+    ) -> List[tuple]:
+        """Top-k (rows, similarities) per query, exact or quantized with rescoring"""
+        if quantized is None:
+            # One matrix product scores every candidate against every query
+            scores = matrix[candidates] @ queries.T
+            return [self._select(candidates, scores[:, column], k) for column in range(len(queries))]
+
+        approximate = np.empty((len(candidates), len(queries)), dtype=np.float32)
+        for start in range(0, len(candidates), self.SCORE_BLOCK_ROWS):
+            block = candidates[start:start + self.SCORE_BLOCK_ROWS]
+            approximate[start:start + len(block)] = quantized[block].astype(np.float32) @ queries.T
+        if scales is not None:
+            approximate *= scales[candidates][:, np.newaxis]
+
+        shortlist_size = min(len(candidates), k * self.rescore_factor)
+        top = []
+        for column, query in enumerate(queries):
+            shortlist = np.sort(candidates[
+                np.argpartition(-approximate[:, column], shortlist_size - 1)[:shortlist_size]
+            ])
+            # Rescore the shortlist with full-precision vectors read from disk
+            top.append(self._select(shortlist, matrix[shortlist] @ query, k))
+        return top
+
+    @staticmethod
+    def _select(rows: np.ndarray, scores: np.ndarray, k: int) -> tuple:
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return rows[top], scores[top]
+
+    def memory_footprint(self) -> Dict[str, int]:
+        """
+        Bytes of scoring data versus full-precision vectors
+
+        The *_bytes figures are what the preallocated arrays occupy, including
+        capacity reserved for future writes; the *_used_bytes figures cover
+        only the rows written so far.
+        """
+        with self._lock:
+            if self._matrix is None:
+                return {
+                    "resident_bytes": 0,
+                    "resident_used_bytes": 0,
+                    "full_precision_bytes": 0,
+                    "full_precision_used_bytes": 0,
+                }
+            dim = self._matrix.shape[1]
+            full_used = self._count * dim * self._matrix.itemsize
+            if self._quantized is None:
+                resident, resident_used = self._matrix.nbytes, full_used
+            else:
+                resident = self._quantized.nbytes
+                resident_used = self._count * dim * self._quantized.itemsize
+                if self._scales is not None:
+                    resident += self._scales.nbytes
+                    resident_used += self._count * self._scales.itemsize
+            return {
+                "resident_bytes": resident,
+                "resident_used_bytes": resident_used,
+                "full_precision_bytes": self._matrix.nbytes,
+                "full_precision_used_bytes": full_used,
+            }
+
+    def recall_report(self, k: int = 10, sample_size: int = 100, seed: int = 0) -> Dict[str, Any]:
+        """
+        Measure recall@k of quantized search against exact search
+
+        Queries are stored vectors perturbed with small Gaussian noise.
+
+        Args:
+            k: Result depth to compare
+            sample_size: Number of sampled queries
+            seed: Random seed for sampling
+
+        Returns:
+            Report with recall@k, query count and memory footprint
+        """
+        with self._lock:
+            matrix = self._matrix
+            quantized = self._quantized
+            scales = self._scales
+            candidates = np.flatnonzero(self._alive)
+
+        report: Dict[str, Any] = {
+            "quantization": self.quantization,
+            "rescore_factor": self.rescore_factor,
+            "k": k,
+            "queries": 0,
+            "recall_at_k": 1.0,
+            **self.memory_footprint()
+        }
+        if matrix is None or not len(candidates) or quantized is None:
+            return report
+
+        rng = np.random.default_rng(seed)
+        sample = rng.choice(candidates, size=min(sample_size, len(candidates)), replace=False)
+        queries = np.asarray(matrix[np.sort(sample)])
+        queries = self._normalize(queries + rng.normal(0, 0.05, size=queries.shape))
+        depth = min(k, len(candidates))
+
+        exact = self._top_k(matrix, candidates, queries, depth)
+        approximate = self._top_k(matrix, candidates, queries, depth, quantized, scales)
+        report["queries"] = len(queries)
+        report["recall_at_k"] = recall_at_k(
+            [rows.tolist() for rows, _ in approximate],
+            [rows.tolist() for rows, _ in exact],
+            depth
+        )
+        return report
+
+    def get(
+        self,
+        ids: Optional[Sequence[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include: Sequence[str] = ("documents", "metadatas")
+    ) -> Dict[str, List[Any]]:
+        """Fetch records by id and/or where clause"""
+        with self._lock:
+            mask = self._where_mask(where)
+            if ids is not None:
+                id_rows = [self._rows[doc_id] for doc_id in ids if doc_id in self._rows]
+                rows = np.array([row for row in id_rows if mask[row]], dtype=np.int64)
+            else:
+                rows = np.flatnonzero(mask)
+
+            start = offset or 0
+            rows = rows[start:start + limit] if limit is not None else rows[start:]
+
+            result: Dict[str, List[Any]] = {"ids": [self._ids[row] for row in rows]}
+            if "metadatas" in include:
+                result["metadatas"] = [dict(self._metadatas[row]) for row in rows]
+            if "documents" in include:
+                result["documents"] = self._documents(result["ids"])
+            if "embeddings" in include:
+                result["embeddings"] = (
+                    self._matrix[rows].tolist() if self._matrix is not None else []
+                )
+            return result
+
+    def update(
+        self,
+        ids: Sequence[str],
+        embeddings: Optional[Sequence[Sequence[float]]] = None,
+        documents: Optional[Sequence[str]] = None,
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None
+    ) -> None:
+        """Update existing records; metadata is merged into the stored metadata"""
+        with self._lock:
+            missing = [doc_id for doc_id in ids if doc_id not in self._rows]
+            if missing:
+                raise ValueError(f"IDs not found in collection: {missing[:5]}")
+
+            rows = [self._rows[doc_id] for doc_id in ids]
+            if embeddings is not None:
+                vectors = self._normalize(embeddings)
+                self._matrix[rows] = vectors
+                self._store_quantized(rows, vectors)
+            if documents is not None:
+                self._db.executemany(
+                    "UPDATE records SET document = ? WHERE id = ?",
+                    list(zip(documents, ids))
+                )
+            if metadatas is not None:
+                for row, metadata in zip(rows, metadatas):
+                    self._metadatas[row] = {**self._metadatas[row], **(metadata or {})}
+                self._db.executemany(
+                    "UPDATE records SET metadata = ? WHERE id = ?",
+                    [
+                        (json.dumps(self._metadatas[row], ensure_ascii=False), doc_id)
+                        for row, doc_id in zip(rows, ids)
+                    ]
+                )
+            self._db.commit()
+            self._after_write()
+
+    def delete(
+        self,
+        ids: Optional[Sequence[str]] = None,
+        where: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Tombstone records by id and/or where clause"""
+        if ids is None and not where:
+            raise ValueError("delete requires ids or a where clause")
+        with self._lock:
+            rows = self.get(ids=ids, where=where, include=())["ids"]
+            if not rows:
+                return
+            alive = self._alive.copy()
+            for doc_id in rows:
+                alive[self._rows.pop(doc_id)] = False
+            self._alive = alive
+
+            self._db.executemany("DELETE FROM records WHERE id = ?", [(doc_id,) for doc_id in rows])
+            self._db.commit()
+            self._after_write()
+
+    def count(self, where: Optional[Dict[str, Any]] = None) -> int:
+        """Number of live records, optionally filtered"""
+        with self._lock:
+            if not where:
+                return int(self._alive.sum())
+            return int(self._where_mask(where).sum())
+
+    def _documents(self, ids: Sequence[str]) -> List[Optional[str]]:
+        if not ids:
+            return []
+        with self._lock:
+            found: Dict[str, Optional[str]] = {}
+            for start in range(0, len(ids), 500):
+                batch = list(ids[start:start + 500])
+                placeholders = ",".join("?" * len(batch))
+                found.update(self._db.execute(
+                    f"SELECT id, document FROM records WHERE id IN ({placeholders})",
+                    batch
+                ).fetchall())
+        return [found.get(doc_id) for doc_id in ids]
@@ -0,0 +1,84 @@
+"""
+Search result cache module
+Bounded LRU of knowledge base search results, tagged with the write
+generation they were computed at so results are never served after a write
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from kb.embedding_cache import QueryEmbeddingCache
+
+
+class SearchResultCache:
+    """
+    LRU cache of search results keyed by normalized query and search options
+
+    Every entry records the knowledge base write generation it was computed
+    at. A lookup at a later generation is a miss and drops the entry, so a
+    write invalidates everything cached before it without a scan.
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[int, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+
+    @staticmethod
+    def key(query: str, *options: Hashable) -> Hashable:
+        """Cache key for query text and the options that shape its results"""
+        return (QueryEmbeddingCache.normalize(query), *options)
+
+    def get(self, key: Hashable, generation: int) -> Optional[List[Dict[str, Any]]]:
+        """Return a copy of the results cached for key at generation, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] != generation:
+                del self._entries[key]
+                self._stale += 1
+                entry = None
+
+            if entry is None:
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            results = entry[1]
+        return copy.deepcopy(results)
+
+    def put(self, key: Hashable, generation: int, results: List[Dict[str, Any]]) -> None:
+        """Cache results computed at generation"""
+        results = copy.deepcopy(results)
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and current[0] > generation:
+                # A newer search already cached results for a later generation
+                return
+            self._entries[key] = (generation, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit ratio and occupancy"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "stale": self._stale,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "capacity": self.max_entries,
+            }
+
+    def clear(self) -> None:
+        """Drop all cached results"""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,512 @@
+"""
+Sharded collection module
+Spreads the knowledge collection over one collection per disease or per
+hash bucket, with parallel scatter-gather search across shards
+"""
+
+import contextlib
+import hashlib
+import inspect
+import re
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set
+
+RESULT_FIELDS = ("documents", "metadatas", "embeddings")
+
+
+class ShardedCollection:
+    """
+    Collection facade over several shard collections
+
+    Exposes the same add/query/get/update/delete/count interface as a
+    single Chroma or NumPy collection. In "disease" mode each disease gets
+    its own shard and a disease-filtered search touches only the matching
+    shards; in "hash" mode vectors are spread over shard_count buckets by
+    id. Searches that span shards run on a thread pool and the per-shard
+    top-k lists are merged by distance.
+
+    Writes to a shard hold that shard's lock, so a shard rebuild sees a
+    stable shard and the other shards stay writable while it runs.
+    """
+
+    MODES = ("disease", "hash")
+    # Name suffixes of a shard being rebuilt and of the shard it replaces
+    REBUILD_SUFFIX = "-rebuild"
+    RETIRED_SUFFIX = "-retired"
+
+    def __init__(
+        self,
+        base_name: str,
+        mode: str,
+        open_shard: Callable[[str], Any],
+        drop_shard: Callable[[str], None],
+        existing_shards: Iterable[str] = (),
+        shard_count: int = 8,
+        max_workers: int = 4,
+        rename_shard: Optional[Callable[[Any, str, str], Any]] = None
+    ):
+        if mode not in self.MODES:
+            raise ValueError(
+                f"Unknown sharding mode '{mode}'. Allowed values: {', '.join(self.MODES)}"
+            )
+        self.base_name = base_name
+        self.mode = mode
+        self.shard_count = max(1, shard_count)
+        self._open_shard = open_shard
+        self._drop_shard = drop_shard
+        self._rename_shard = rename_shard
+        self._lock = threading.Lock()
+        self._shard_locks: Dict[str, threading.RLock] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers),
+            thread_name_prefix="shard-search"
+        )
+        names = self._recover_rebuilds(
+            {name for name in existing_shards if name.startswith(self.prefix)}
+        )
+        self._shards: Dict[str, Any] = {name: open_shard(name) for name in sorted(names)}
+
+    @property
+    def prefix(self) -> str:
+        return f"{self.base_name}__"
+
+    def shard_name_for_disease(self, disease: Optional[str]) -> str:
+        """Shard holding a disease (collection-name safe, stable across restarts)"""
+        if not disease:
+            return f"{self.prefix}unassigned"
+        slug = re.sub(r"[^a-z0-9_-]+", "-", disease.lower()).strip("-")[:24]
+        digest = hashlib.sha1(disease.encode("utf-8")).hexdigest()[:8]
+        return f"{self.prefix}{slug or 'd'}-{digest}"
+
+    def shard_name_for_id(self, vector_id: str) -> str:
+        """Hash bucket shard holding a vector id"""
+        bucket = zlib.crc32(vector_id.encode("utf-8")) % self.shard_count
+        return f"{self.prefix}h{bucket:02d}"
+
+    def shard_names(self) -> List[str]:
+        with self._lock:
+            return sorted(self._shards)
+
+    def shard_stats(self) -> Dict[str, int]:
+        """Vector count per shard"""
+        return {name: shard.count() for name, shard in self._items()}
+
+    def _items(self):
+        with self._lock:
+            return sorted(self._shards.items())
+
+    def _shard(self, name: str, create: bool = False):
+        with self._lock:
+            shard = self._shards.get(name)
+            if shard is None and create:
+                shard = self._shards[name] = self._open_shard(name)
+            return shard
+
+    @contextlib.contextmanager
+    def _writing(self, *names: str) -> Iterator[None]:
+        """Hold the write locks of the named shards (taken in name order)"""
+        with self._lock:
+            locks = [
+                self._shard_locks.setdefault(name, threading.RLock())
+                for name in sorted(set(names))
+            ]
+        with contextlib.ExitStack() as stack:
+            for lock in locks:
+                stack.enter_context(lock)
+            yield
+
+    def _route(self, vector_id: str, metadata: Optional[Dict[str, Any]]) -> str:
+        if self.mode == "disease":
+            return self.shard_name_for_disease((metadata or {}).get("disease"))
+        return self.shard_name_for_id(vector_id)
+
+    def _names_for_where(self, where: Optional[Dict[str, Any]]) -> List[str]:
+        """Names of the shards that can hold vectors matching where"""
+        diseases = _pinned_diseases(where) if self.mode == "disease" else None
+        if diseases is None:
+            return self.shard_names()
+        names = self.shard_names()
+        return sorted({self.shard_name_for_disease(d) for d in diseases}.intersection(names))
+
+    def _names_for_ids(self, ids: Sequence[str]) -> List[tuple]:
+        """(shard name, ids) pairs for every shard that may hold some of ids"""
+        names = self.shard_names()
+        if self.mode == "hash":
+            groups: Dict[str, List[str]] = {}
+            for vector_id in ids:
+                groups.setdefault(self.shard_name_for_id(vector_id), []).append(vector_id)
+            return [(name, group) for name, group in sorted(groups.items()) if name in names]
+        # Disease shards are not derivable from the id alone
+        return [(name, list(ids)) for name in names]
+
+    def _shards_for_where(self, where: Optional[Dict[str, Any]]) -> List[Any]:
+        """Shards that can hold vectors matching where"""
+        shards = (self._shard(name) for name in self._names_for_where(where))
+        return [shard for shard in shards if shard is not None]
+
+    def _shards_for_ids(self, ids: Sequence[str]) -> List[tuple]:
+        """(shard, ids) pairs for every shard that may hold some of ids"""
+        pairs = [(self._shard(name), group) for name, group in self._names_for_ids(ids)]
+        return [(shard, group) for shard, group in pairs if shard is not None]
+
+    def _scatter(self, items: Sequence[Any], call: Callable[[Any], Any]) -> List[Any]:
+        """Run call on every item, in parallel when there is more than one"""
+        if len(items) <= 1:
+            return [call(item) for item in items]
+        return list(self._executor.map(call, items))
+
+    def add(self, embeddings, documents, metadatas, ids) -> None:
+        groups: Dict[str, List[int]] = {}
+        for i, vector_id in enumerate(ids):
+            groups.setdefault(self._route(vector_id, metadatas[i] if metadatas else None), []).append(i)
+
+        for name, positions in groups.items():
+            with self._writing(name):
+                self._shard(name, create=True).add(
+                    embeddings=[embeddings[i] for i in positions],
+                    documents=[documents[i] for i in positions],
+                    metadatas=[metadatas[i] for i in positions] if metadatas else None,
+                    ids=[ids[i] for i in positions]
+                )
+
+    def query(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        n_results: int = 10,
+        where: Optional[Dict[str, Any]] = None,
+        include: Sequence[str] = ("documents", "metadatas", "distances"),
+        ids: Optional[Sequence[str]] = None
+    ) -> Dict[str, List[List[Any]]]:
+        """
+        Scatter the query to the relevant shards and merge their top-k by distance
+
+        ids are candidates already known to match where (e.g. from a
+        metadata prefilter). Shards whose query takes ids score only those;
+        the others evaluate where.
+        """
+        # Distances are needed to merge shard results
+        shard_include = list(dict.fromkeys([*include, "distances"]))
+        if ids is None:
+            targets = [(shard, None) for shard in self._shards_for_where(where)]
+        elif self.mode == "hash":
+            targets = self._shards_for_ids(ids)
+        else:
+            targets = [(shard, list(ids)) for shard in self._shards_for_where(where)]
+
+        def query_shard(target):
+            shard, shard_ids = target
+            if shard.count() == 0:
+                return None
+            if shard_ids is not None and _accepts_ids(shard):
+                return shard.query(
+                    query_embeddings=query_embeddings,
+                    n_results=n_results,
+                    include=shard_include,
+                    ids=shard_ids
+                )
+            return shard.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                where=where,
+                include=shard_include
+            )
+
+        partials = [
+            partial for partial in self._scatter(targets, query_shard)
+            if partial is not None
+        ]
+        merged: Dict[str, List[List[Any]]] = {
+            "ids": [], "documents": [], "metadatas": [], "distances": []
+        }
+        for q in range(len(query_embeddings)):
+            hits = []
+            for partial in partials:
+                for i, vector_id in enumerate(partial["ids"][q]):
+                    hits.append((
+                        partial["distances"][q][i],
+                        vector_id,
+                        partial["documents"][q][i] if partial.get("documents") else None,
+                        partial["metadatas"][q][i] if partial.get("metadatas") else None,
+                    ))
+            hits.sort(key=lambda hit: hit[0])
+            hits = hits[:n_results]
+            merged["distances"].append([hit[0] for hit in hits])
+            merged["ids"].append([hit[1] for hit in hits])
+            merged["documents"].append([hit[2] for hit in hits])
+            merged["metadatas"].append([hit[3] for hit in hits])
+        return merged
+
+    def get(
+        self,
+        ids: Optional[Sequence[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include: Sequence[str] = ("documents", "metadatas")
+    ) -> Dict[str, Any]:
+        """Records from every relevant shard, paged in shard order"""
+        include = list(include)
+        result: Dict[str, Any] = {"ids": []}
+        for field in RESULT_FIELDS:
+            result[field] = [] if field in include else None
+
+        if ids is not None:
+            partials = self._scatter(
+                self._shards_for_ids(ids),
+                lambda pair: pair[0].get(ids=pair[1], where=where, include=include)
+            )
+            for partial in partials:
+                _extend(result, partial, include)
+            return result
+
+        skip = offset or 0
+        for shard in self._shards_for_where(where):
+            if limit is not None and len(result["ids"]) >= limit:
+                break
+            if skip:
+                matched = len(shard.get(where=where, include=[])["ids"])
+                if skip >= matched:
+                    skip -= matched
+                    continue
+            remaining = None if limit is None else limit - len(result["ids"])
+            partial = shard.get(where=where, limit=remaining, offset=skip or None, include=include)
+            skip = 0
+            _extend(result, partial, include)
+        return result
+
+    def update(self, ids, embeddings=None, documents=None, metadatas=None) -> None:
+        """Update vectors in place, moving them when a metadata change reroutes them"""
+        located = self._locate(ids)
+        for i, vector_id in enumerate(ids):
+            current_name = located.get(vector_id)
+            if current_name is None:
+                continue
+            target_name = current_name
+            if self.mode == "disease" and metadatas and "disease" in metadatas[i]:
+                target_name = self.shard_name_for_disease(metadatas[i]["disease"])
+            with self._writing(current_name, target_name):
+                self._update_one(
+                    i, vector_id, current_name, target_name, embeddings, documents, metadatas
+                )
+
+    def _update_one(
+        self,
+        i: int,
+        vector_id: str,
+        current_name: str,
+        target_name: str,
+        embeddings,
+        documents,
+        metadatas
+    ) -> None:
+        # Caller holds the write locks of both shards
+        current = self._shard(current_name)
+        if target_name == current_name:
+            current.update(
+                ids=[vector_id],
+                **{
+                    field: [values[i]]
+                    for field, values in (
+                        ("embeddings", embeddings),
+                        ("documents", documents),
+                        ("metadatas", metadatas),
+                    )
+                    if values is not None
+                }
+            )
+            return
+
+        record = current.get(ids=[vector_id], include=list(RESULT_FIELDS))
+        current.delete(ids=[vector_id])
+        self._shard(target_name, create=True).add(
+            embeddings=[embeddings[i] if embeddings is not None else record["embeddings"][0]],
+            documents=[documents[i] if documents is not None else record["documents"][0]],
+            metadatas=[{**record["metadatas"][0], **metadatas[i]}],
+            ids=[vector_id]
+        )
+
+    def delete(self, ids: Optional[Sequence[str]] = None, where: Optional[Dict[str, Any]] = None) -> None:
+        if ids is None and where is None:
+            raise ValueError("delete requires ids or where")
+
+        def delete_from(name: str, shard_ids: Optional[List[str]]) -> None:
+            # Look the shard up under its lock, in case a rebuild replaced it
+            with self._writing(name):
+                shard = self._shard(name)
+                if shard is None:
+                    return
+                if shard_ids is None:
+                    shard.delete(where=where)
+                else:
+                    shard.delete(ids=shard_ids, where=where)
+
+        if ids is not None:
+            self._scatter(self._names_for_ids(ids), lambda pair: delete_from(*pair))
+        else:
+            self._scatter(self._names_for_where(where), lambda name: delete_from(name, None))
+
+    def count(self) -> int:
+        return sum(shard.count() for _, shard in self._items())
+
+    @contextlib.contextmanager
+    def deferred_index_maintenance(self) -> Iterator[None]:
+        """Defer index maintenance on every shard that supports it"""
+        with contextlib.ExitStack() as stack:
+            for _, shard in self._items():
+                defer = getattr(shard, "deferred_index_maintenance", None)
+                if defer is not None:
+                    stack.enter_context(defer())
+            yield
+
+    def compact_shard(self, name: str) -> None:
+        """Reclaim space in one shard without touching the others"""
+        shard = self._shard(name)
+        if shard is None:
+            raise ValueError(f"Unknown shard: {name}")
+        if hasattr(shard, "compact"):
+            shard.compact()
+        else:
+            self.rebuild_shard(name)
+
+    def rebuild_shard(self, name: str, batch_size: int = 1000) -> int:
+        """
+        Recreate one shard from its own records, rebuilding its index
+
+        The records are copied in batches into a new collection, which then
+        takes the shard's name in place of the old one. Writes to the shard
+        wait on its lock for the whole rebuild, and the old collection stays
+        intact until the copy is complete, so a crash loses nothing (see
+        _recover_rebuilds).
+
+        Returns:
+            Number of vectors rewritten
+        """
+        if self._rename_shard is None:
+            raise ValueError("Shard rebuild needs a rename_shard callback")
+        temp_name = name + self.REBUILD_SUFFIX
+        retired_name = name + self.RETIRED_SUFFIX
+
+        with self._writing(name):
+            shard = self._shard(name)
+            if shard is None:
+                raise ValueError(f"Unknown shard: {name}")
+
+            self._drop_shard(temp_name)
+            temp = self._open_shard(temp_name)
+            copied = 0
+            while True:
+                records = shard.get(limit=batch_size, offset=copied, include=list(RESULT_FIELDS))
+                if not records["ids"]:
+                    break
+                temp.add(
+                    embeddings=[list(vector) for vector in records["embeddings"]],
+                    documents=records["documents"],
+                    metadatas=records["metadatas"],
+                    ids=records["ids"]
+                )
+                copied += len(records["ids"])
+
+            with self._lock:
+                retired = self._rename_shard(shard, name, retired_name)
+                self._shards[name] = self._rename_shard(temp, temp_name, name)
+            if hasattr(retired, "close"):
+                retired.close()
+            self._drop_shard(retired_name)
+        return copied
+
+    def _recover_rebuilds(self, names: Set[str]) -> Set[str]:
+        """
+        Finish or roll back shard rebuilds interrupted by a crash
+
+        A retired shard whose replacement never took its name is renamed
+        back; leftover rebuild copies and retired shards are dropped.
+        """
+        shards = set()
+        for name in sorted(names):
+            if name.endswith(self.RETIRED_SUFFIX):
+                original = name[:-len(self.RETIRED_SUFFIX)]
+                if original not in names and self._rename_shard is not None:
+                    restored = self._rename_shard(self._open_shard(name), name, original)
+                    if hasattr(restored, "close"):
+                        restored.close()
+                    shards.add(original)
+                else:
+                    self._drop_shard(name)
+            elif name.endswith(self.REBUILD_SUFFIX):
+                self._drop_shard(name)
+            else:
+                shards.add(name)
+        return shards
+
+    def reset(self) -> None:
+        """Drop every shard"""
+        with self._lock:
+            for name in list(self._shards):
+                self._drop(name)
+            self._shards = {}
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    def _drop(self, name: str) -> None:
+        # Caller holds self._lock
+        shard = self._shards.get(name)
+        if hasattr(shard, "reset"):
+            shard.reset()
+        else:
+            self._drop_shard(name)
+
+    def _locate(self, ids: Sequence[str]) -> Dict[str, str]:
+        """Shard name currently holding each id"""
+        items = self._items()
+        found = self._scatter(
+            [shard for _, shard in items],
+            lambda shard: shard.get(ids=list(ids), include=[])["ids"]
+        )
+        return {
+            vector_id: name
+            for (name, _), shard_ids in zip(items, found)
+            for vector_id in shard_ids
+        }
+
+
+def _accepts_ids(shard: Any) -> bool:
+    """Whether a shard's query takes candidate ids (the NumPy backend does, Chroma does not)"""
+    try:
+        return "ids" in inspect.signature(shard.query).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def _extend(result: Dict[str, Any], partial: Dict[str, Any], include: Sequence[str]) -> None:
+    result["ids"].extend(partial["ids"])
+    for field in RESULT_FIELDS:
+        if field in include:
+            result[field].extend(partial[field])
+
+
+def _pinned_diseases(where: Optional[Dict[str, Any]]) -> Optional[Set[str]]:
+    """Diseases a where clause restricts matches to, or None if unrestricted"""
+    if not where:
+        return None
+    pinned: Optional[Set[str]] = None
+    for key, condition in where.items():
+        if key == "$and":
+            for clause in condition:
+                clause_diseases = _pinned_diseases(clause)
+                if clause_diseases is not None:
+                    pinned = clause_diseases if pinned is None else pinned & clause_diseases
+        elif key == "disease":
+            if isinstance(condition, dict):
+                if "$eq" in condition:
+                    diseases = {condition["$eq"]}
+                elif "$in" in condition:
+                    diseases = set(condition["$in"])
+                else:
+                    continue
+            else:
+                diseases = {condition}
+            pinned = diseases if pinned is None else pinned & diseases
+    return pinned
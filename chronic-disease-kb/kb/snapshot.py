@@ -0,0 +1,209 @@
+"""
+Vector index snapshot module
+Writes the collection as a versioned, checksummed snapshot in the NumPy
+backend's on-disk layout, so a new node can memory-map it at boot
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from kb.numpy_store import NumpyCollection
+
+SNAPSHOT_FORMAT = "chronic-disease-kb-snapshot"
+SNAPSHOT_VERSION = 1
+MANIFEST_FILENAME = "manifest.json"
+SNAPSHOT_FILES = (NumpyCollection.MATRIX_FILENAME, NumpyCollection.TABLE_FILENAME)
+
+
+class SnapshotError(ValueError):
+    """Snapshot is missing, from an incompatible version, or corrupt"""
+
+
+def create_snapshot(
+    collection,
+    path: str,
+    embedding_model: str,
+    page_size: int = 1000
+) -> Dict[str, Any]:
+    """
+    Write every record of a collection to a snapshot directory
+
+    The snapshot holds a trimmed embedding matrix and the record table in
+    the NumPy backend's format, plus a manifest with a format version and
+    SHA-256 checksums. It replaces any snapshot already at path only once
+    it is completely written.
+
+    Args:
+        collection: Source collection (Chroma, NumPy or sharded)
+        path: Snapshot directory to create
+        embedding_model: Model that produced the vectors
+        page_size: Records copied per batch
+
+    Returns:
+        Snapshot manifest
+    """
+    path = os.path.abspath(path)
+    staging = path + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    target = NumpyCollection(os.path.dirname(staging), name=os.path.basename(staging))
+
+    offset = 0
+    with target.deferred_index_maintenance():
+        while True:
+            page = collection.get(
+                limit=page_size,
+                offset=offset or None,
+                include=["embeddings", "documents", "metadatas"]
+            )
+            if not page["ids"]:
+                break
+            target.add(
+                embeddings=page["embeddings"],
+                documents=page["documents"],
+                metadatas=page["metadatas"],
+                ids=page["ids"]
+            )
+            offset += len(page["ids"])
+            if len(page["ids"]) < page_size:
+                break
+
+    target.compact(min_capacity=0)
+    dimension = target.dimension
+    count = target.count()
+    target.close()
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "created_at": datetime.now().isoformat(),
+        "embedding_model": embedding_model,
+        "count": count,
+        "dimension": dimension,
+        # Vectors are searched exactly; no ANN graph is stored
+        "index": "exact",
+        "files": {
+            filename: _file_entry(os.path.join(staging, filename))
+            for filename in SNAPSHOT_FILES
+            if os.path.exists(os.path.join(staging, filename))
+        },
+    }
+    with open(os.path.join(staging, MANIFEST_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    previous = path + ".old"
+    if os.path.exists(path):
+        os.replace(path, previous)
+    os.replace(staging, path)
+    shutil.rmtree(previous, ignore_errors=True)
+    return manifest
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    """Read a snapshot manifest and check its format and version"""
+    manifest_path = os.path.join(path, MANIFEST_FILENAME)
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise SnapshotError(f"No snapshot manifest at {manifest_path}")
+    except json.JSONDecodeError as e:
+        raise SnapshotError(f"Unreadable snapshot manifest: {e}")
+
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise SnapshotError(f"Not a knowledge base snapshot: {path}")
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        raise SnapshotError(
+            f"Unsupported snapshot version {manifest.get('version')} "
+            f"(expected {SNAPSHOT_VERSION})"
+        )
+    return manifest
+
+
+def verify_snapshot(path: str, checksums: bool = True) -> Dict[str, Any]:
+    """
+    Check a snapshot's manifest, file sizes, checksums and record count
+
+    Args:
+        path: Snapshot directory
+        checksums: Also recompute SHA-256 of every file (reads the whole snapshot)
+
+    Returns:
+        Snapshot manifest
+
+    Raises:
+        SnapshotError: If any check fails
+    """
+    manifest = read_manifest(path)
+    for filename, expected in manifest["files"].items():
+        file_path = os.path.join(path, filename)
+        if not os.path.exists(file_path):
+            raise SnapshotError(f"Snapshot file missing: {filename}")
+        if os.path.getsize(file_path) != expected["bytes"]:
+            raise SnapshotError(f"Snapshot file has wrong size: {filename}")
+        if checksums and _sha256(file_path) != expected["sha256"]:
+            raise SnapshotError(f"Snapshot file checksum mismatch: {filename}")
+
+    if checksums and NumpyCollection.TABLE_FILENAME in manifest["files"]:
+        table_path = os.path.join(path, NumpyCollection.TABLE_FILENAME)
+        db = sqlite3.connect(f"file:{table_path}?mode=ro", uri=True)
+        try:
+            count = db.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+        finally:
+            db.close()
+        if count != manifest["count"]:
+            raise SnapshotError(
+                f"Snapshot has {count} records, manifest says {manifest['count']}"
+            )
+    return manifest
+
+
+def restore_snapshot(
+    path: str,
+    collection_dir: str,
+    embedding_model: Optional[str] = None,
+    checksums: bool = False
+) -> Dict[str, Any]:
+    """
+    Copy a snapshot into an (empty) NumPy collection directory
+
+    The NumPy backend then memory-maps the restored matrix when it opens.
+
+    Args:
+        path: Snapshot directory
+        collection_dir: NumPy collection directory to populate
+        embedding_model: If given, the snapshot must have been built with it
+        checksums: Recompute checksums before restoring
+
+    Returns:
+        Snapshot manifest
+    """
+    manifest = verify_snapshot(path, checksums=checksums)
+    if embedding_model and manifest["embedding_model"] != embedding_model:
+        raise SnapshotError(
+            f"Snapshot was built with {manifest['embedding_model']}, "
+            f"not {embedding_model}"
+        )
+
+    os.makedirs(collection_dir, exist_ok=True)
+    for filename in manifest["files"]:
+        destination = os.path.join(collection_dir, filename)
+        shutil.copyfile(os.path.join(path, filename), destination + ".tmp")
+        os.replace(destination + ".tmp", destination)
+    return manifest
+
+
+def _file_entry(file_path: str) -> Dict[str, Any]:
+    return {"sha256": _sha256(file_path), "bytes": os.path.getsize(file_path)}
+
+
+def _sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
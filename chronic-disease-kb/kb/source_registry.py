@@ -0,0 +1,181 @@
+"""
+Source registry module
+Parses the governance source registry YAML into an immutable index and
+reloads it when the file changes on disk
+"""
+
+import os
+import threading
+from datetime import date
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Mapping, Optional, Tuple, Union
+
+import yaml
+
+
+class SourceRegistryIndex:
+    """
+    Read-only lookups over one version of the source registry
+
+    Built once per file version: source_id → record, disease → allowed
+    sources, source → default evidence level and disease → preferred
+    sources. Sources without disease_scopes may be used for any disease.
+    """
+
+    def __init__(self, registry: Mapping[str, Any], mtime_ns: int = 0):
+        entries = registry.get("sources") or []
+        if not isinstance(entries, list):
+            raise ValueError("Registry 'sources' must be a list")
+
+        sources: Dict[str, Mapping[str, Any]] = {}
+        by_disease: Dict[str, set] = {}
+        for entry in entries:
+            if not isinstance(entry, dict):
+                raise ValueError(f"Registry source must be a mapping, got: {entry!r}")
+            source_id = str(entry.get("source_id") or "").strip().lower()
+            if not source_id:
+                raise ValueError("Registry source is missing source_id")
+            if source_id in sources:
+                raise ValueError(f"Duplicate source_id in registry: {source_id}")
+
+            record = dict(entry)
+            record["source_id"] = source_id
+            record["disease_scopes"] = self._string_list(
+                record.get("disease_scopes"), f"disease_scopes of {source_id}"
+            )
+            evidence_level = record.get("evidence_level")
+            if evidence_level is not None and not isinstance(evidence_level, str):
+                raise ValueError(f"evidence_level of {source_id} must be a string")
+            if record.get("review_due_date"):
+                record["review_due_date"] = date.fromisoformat(str(record["review_due_date"]))
+            sources[source_id] = MappingProxyType(record)
+            for disease in record["disease_scopes"]:
+                by_disease.setdefault(disease, set()).add(source_id)
+
+        if not sources:
+            raise ValueError("No sources found in registry")
+
+        self.version = registry.get("version")
+        self.mtime_ns = mtime_ns
+        self.sources: Mapping[str, Mapping[str, Any]] = MappingProxyType(sources)
+        self.sources_by_disease: Mapping[str, FrozenSet[str]] = MappingProxyType({
+            disease: frozenset(source_ids) for disease, source_ids in by_disease.items()
+        })
+        self.evidence_levels: Mapping[str, Optional[str]] = MappingProxyType({
+            source_id: record.get("evidence_level") for source_id, record in sources.items()
+        })
+        priorities = registry.get("disease_source_priority") or {}
+        if not isinstance(priorities, dict):
+            raise ValueError("Registry 'disease_source_priority' must be a mapping")
+        self.source_priority: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+            str(disease): self._string_list(source_ids, f"disease_source_priority of {disease}")
+            for disease, source_ids in priorities.items()
+        })
+
+    @staticmethod
+    def _string_list(value: Any, field: str) -> Tuple[str, ...]:
+        """Tuple of a list of strings, rejecting any other shape with ValueError"""
+        if value is None:
+            return ()
+        if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+            raise ValueError(f"Registry {field} must be a list of strings")
+        return tuple(value)
+
+    def __contains__(self, source_id: str) -> bool:
+        return source_id in self.sources
+
+    def get(self, source_id: str) -> Optional[Mapping[str, Any]]:
+        """Registry record for source_id, or None"""
+        return self.sources.get(source_id)
+
+    def covers(self, source_id: str, disease: str) -> bool:
+        """Whether source_id is registered and in scope for disease"""
+        record = self.sources.get(source_id)
+        if record is None:
+            return False
+        return not record["disease_scopes"] or source_id in self.sources_by_disease.get(disease, ())
+
+    def default_evidence_level(self, source_id: str) -> Optional[str]:
+        """Evidence level the registry assigns to source_id"""
+        return self.evidence_levels.get(source_id)
+
+    def default_source(self, disease: str) -> Optional[str]:
+        """Preferred source for disease: its priority list, else any source scoped to it"""
+        for source_id in self.source_priority.get(disease, ()):
+            if source_id in self.sources:
+                return source_id
+        scoped = self.sources_by_disease.get(disease)
+        return min(scoped) if scoped else None
+
+    def overdue(self, source_id: str, today: Optional[date] = None) -> bool:
+        """Whether source_id is past its review_due_date"""
+        record = self.sources.get(source_id)
+        due = record.get("review_due_date") if record else None
+        return due is not None and due < (today or date.today())
+
+
+class SourceRegistry:
+    """
+    Source registry file with mtime-based hot reload
+
+    index() stats the file and rebuilds the index only when its mtime
+    changed, swapping in the new index in one assignment so readers see
+    either the old or the new registry, never a mix. A registry edit that
+    fails to parse keeps the previous index.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._index: Optional[SourceRegistryIndex] = None
+        self._lock = threading.Lock()
+        self._reloads = 0
+        self._failed_mtime_ns: Optional[int] = None
+
+    def index(self) -> SourceRegistryIndex:
+        """Current registry index, reloaded if the file changed"""
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except OSError:
+            if self._index is not None:
+                return self._index
+            raise ValueError(f"Source registry not found: {self.path}")
+
+        index = self._index
+        if index is not None and index.mtime_ns == mtime_ns:
+            return index
+
+        with self._lock:
+            index = self._index
+            if index is not None and (
+                index.mtime_ns == mtime_ns or self._failed_mtime_ns == mtime_ns
+            ):
+                return index
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    registry = yaml.safe_load(f) or {}
+                if not isinstance(registry, dict):
+                    raise ValueError("Registry must be a mapping")
+                new_index = SourceRegistryIndex(registry, mtime_ns)
+            except (OSError, ValueError, yaml.YAMLError) as e:
+                if index is None:
+                    raise ValueError(f"Invalid source registry {self.path}: {e}")
+                # Keep serving the last good registry until the file is fixed
+                self._failed_mtime_ns = mtime_ns
+                print(f"Error reloading source registry {self.path}, keeping previous version: {e}")
+                return index
+
+            self._index = new_index
+            self._failed_mtime_ns = None
+            self._reloads += 1
+            return new_index
+
+    def stats(self) -> Dict[str, Any]:
+        """Loaded registry version and reload count"""
+        index = self._index
+        return {
+            "path": str(self.path),
+            "version": index.version if index else None,
+            "sources": len(index.sources) if index else 0,
+            "reloads": self._reloads,
+        }
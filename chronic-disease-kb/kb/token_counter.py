@@ -0,0 +1,102 @@
+"""
+Token counting module
+Counts embedding-model tokens for chunk sizing and truncation checks, with
+an LRU cache of counts so each chunk is tokenized at most once
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+
+class TokenCounter:
+    """
+    Token counts and offsets from an embedding model's (fast) tokenizer
+
+    Counts include the model's special tokens, so they compare directly
+    with max_tokens, the model's maximum sequence length. Counts computed
+    while chunking are cached and reused when the chunks are checked for
+    truncation at ingest.
+    """
+
+    def __init__(self, tokenizer: Any, max_tokens: int, cache_size: int = 8192):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.cache_size = cache_size
+        self.special_tokens = tokenizer.num_special_tokens_to_add(pair=False)
+        self._counts: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def content_budget(self) -> int:
+        """Tokens of text that fit in one model input"""
+        return max(1, self.max_tokens - self.special_tokens)
+
+    def count(self, text: str) -> int:
+        """Tokens in text, including special tokens"""
+        return self.count_many([text])[0]
+
+    def count_many(self, texts: Sequence[str]) -> List[int]:
+        """Token counts for texts, tokenizing only those not cached"""
+        counts: List[Optional[int]] = []
+        with self._lock:
+            for text in texts:
+                count = self._counts.get(text)
+                if count is None:
+                    self._misses += 1
+                else:
+                    self._counts.move_to_end(text)
+                    self._hits += 1
+                counts.append(count)
+
+        missing = list(dict.fromkeys(
+            text for text, count in zip(texts, counts) if count is None
+        ))
+        if missing:
+            encoded = self.tokenizer(missing, add_special_tokens=False, verbose=False)
+            computed = {
+                text: len(ids) + self.special_tokens
+                for text, ids in zip(missing, encoded['input_ids'])
+            }
+            self._remember(computed)
+            counts = [
+                count if count is not None else computed[text]
+                for text, count in zip(texts, counts)
+            ]
+        return counts
+
+    def token_ends(self, text: str) -> List[int]:
+        """Character offset just past each token of text (special tokens excluded)"""
+        encoded = self.tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            verbose=False
+        )
+        return [end for _, end in encoded['offset_mapping']]
+
+    def remember(self, text: str, count: int) -> None:
+        """Cache a count already known, e.g. from token offsets"""
+        self._remember({text: count})
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache hit ratio and model limit"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "max_tokens": self.max_tokens,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+                "entries": len(self._counts),
+            }
+
+    def _remember(self, counts: Dict[str, int]) -> None:
+        with self._lock:
+            for text, count in counts.items():
+                self._counts[text] = count
+                self._counts.move_to_end(text)
+            while len(self._counts) > self.cache_size:
+                self._counts.popitem(last=False)
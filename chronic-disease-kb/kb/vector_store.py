@@ -1,54 +1,443 @@
 """
-Vector database module using ChromaDB for knowledge base storage
+Vector database module for knowledge base storage
+Backed by ChromaDB or by the NumPy exact-search collection
 """
 
+import asyncio
+import base64
+import binascii
+import contextlib
+import functools
+import itertools
 import os
+import shutil
+import threading
+import time
 import uuid
-from typing import List, Dict, Any, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple, Callable
 from datetime import datetime
-import chromadb
-from chromadb.config import Settings as ChromaSettings
-from sentence_transformers import SentenceTransformer
 
 from config import settings
+from kb.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from kb.embedding_batcher import EmbeddingBatcher
+from kb.embedders import create_embedder
+from kb.numpy_store import NumpyCollection
+from kb.sharding import ShardedCollection
+from kb.snapshot import create_snapshot, restore_snapshot, SnapshotError
+from kb.token_counter import TokenCounter
 
 
 class VectorStore:
-    """Vector database store for medical knowledge"""
-    
+    """
+    Vector database store for medical knowledge
+
+    The storage backend and the embedder are loaded lazily, on first use or
+    through an explicit warmup(), so importing this module is cheap.
+    """
+
+    COLLECTION_NAME = "medical_knowledge"
+
+    COLD = "cold"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
     def __init__(self):
-        self.client = None
-        self.collection = None
-        self.embedding_model = None
-        self._initialize()
-    
-    def _initialize(self):
-        """Initialize ChromaDB client and embedding model"""
-        # Create directory if not exists
-        os.makedirs(settings.VECTOR_DB_PATH, exist_ok=True)
-        
-        # Initialize ChromaDB
-        self.client = chromadb.Client(
-            ChromaSettings(
-                chroma_db_impl="duckdb+parquet",
-                persist_directory=settings.VECTOR_DB_PATH
+        self._client = None
+        self._collection = None
+        self._embedder = None
+        self.embedding_cache = None
+        self.embedding_batcher = None
+        self.query_cache = None
+        self._token_counter: Optional[TokenCounter] = None
+        self._token_counter_loaded = False
+
+        if settings.QUERY_EMBEDDING_CACHE_SIZE > 0:
+            self.query_cache = QueryEmbeddingCache(
+                max_entries=settings.QUERY_EMBEDDING_CACHE_SIZE,
+                ttl_seconds=settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS
             )
+
+        self._store_lock = threading.Lock()
+        self._model_lock = threading.Lock()
+        self._executor_lock = threading.Lock()
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._state = {"store": self.COLD, "model": self.COLD}
+        self._errors: Dict[str, str] = {}
+
+    @property
+    def client(self):
+        """ChromaDB client, created on first access"""
+        self._ensure_store()
+        return self._client
+
+    @property
+    def collection(self):
+        """Knowledge collection, opened on first access"""
+        self._ensure_store()
+        return self._collection
+
+    @property
+    def embedder(self):
+        """Embedding backend, loaded on first access"""
+        self._ensure_model()
+        return self._embedder
+
+    def _ensure_store(self):
+        """Initialize the storage backend and collection once"""
+        if self._state["store"] == self.READY:
+            return
+
+        with self._store_lock:
+            if self._state["store"] == self.READY:
+                return
+            self._state["store"] = self.LOADING
+            try:
+                # Create directory if not exists
+                os.makedirs(settings.VECTOR_DB_PATH, exist_ok=True)
+                self._collection = self._open_collection()
+            except Exception as e:
+                self._state["store"] = self.FAILED
+                self._errors["store"] = str(e)
+                raise
+
+            self._errors.pop("store", None)
+            self._state["store"] = self.READY
+
+    def _open_collection(self):
+        """Open the knowledge collection, sharded if SHARDING_MODE is set"""
+        if settings.SHARDING_MODE == "none":
+            if settings.VECTOR_SNAPSHOT_PATH:
+                self._restore_snapshot(settings.VECTOR_SNAPSHOT_PATH)
+            return self._open_backend_collection(self.COLLECTION_NAME)
+
+        return ShardedCollection(
+            base_name=self.COLLECTION_NAME,
+            mode=settings.SHARDING_MODE,
+            open_shard=self._open_backend_collection,
+            drop_shard=self._drop_backend_collection,
+            existing_shards=self._list_backend_collections(),
+            shard_count=settings.SHARD_COUNT,
+            max_workers=settings.SHARD_SEARCH_WORKERS,
+            rename_shard=self._rename_backend_collection
         )
+
+    def _restore_snapshot(self, snapshot_path: str) -> None:
+        """Seed an empty NumPy collection from a snapshot before it is opened"""
+        if settings.VECTOR_BACKEND != "numpy":
+            print("Vector snapshot ignored: snapshots are restored into VECTOR_BACKEND=numpy")
+            return
+
+        collection_dir = os.path.join(self._numpy_path, self.COLLECTION_NAME)
+        if os.path.exists(os.path.join(collection_dir, NumpyCollection.TABLE_FILENAME)):
+            # Local data wins over the snapshot
+            return
+        try:
+            manifest = restore_snapshot(
+                snapshot_path,
+                collection_dir,
+                embedding_model=settings.EMBEDDING_MODEL,
+                checksums=settings.VECTOR_SNAPSHOT_VERIFY
+            )
+            print(f"Restored {manifest['count']} vectors from snapshot {snapshot_path}")
+        except SnapshotError as e:
+            print(f"Error restoring vector snapshot: {e}")
+
+    def write_snapshot(self, path: str) -> Dict[str, Any]:
+        """
+        Write the collection to a snapshot directory
         
+        Args:
+            path: Snapshot directory (replaced atomically if it exists)
+            
+        Returns:
+            Snapshot manifest
+        """
+        return create_snapshot(self.collection, path, embedding_model=settings.EMBEDDING_MODEL)
+
+    @property
+    def _numpy_path(self) -> str:
+        return os.path.join(settings.VECTOR_DB_PATH, "numpy")
+
+    def _chroma_client(self):
+        """ChromaDB client, created once"""
+        if self._client is None:
+            import chromadb
+            from chromadb.config import Settings as ChromaSettings
+
+            # Initialize ChromaDB
+            self._client = chromadb.Client(
+                ChromaSettings(
+                    chroma_db_impl="duckdb+parquet",
+                    persist_directory=settings.VECTOR_DB_PATH
+                )
+            )
+        return self._client
+
+    def _open_backend_collection(self, name: str):
+        """Open (or create) a named collection on the configured backend"""
+        if settings.VECTOR_BACKEND == "numpy":
+            return NumpyCollection(
+                self._numpy_path,
+                name=name,
+                quantization=settings.VECTOR_QUANTIZATION,
+                rescore_factor=settings.VECTOR_RESCORE_FACTOR
+            )
+
+        if settings.VECTOR_BACKEND != "chroma":
+            raise ValueError(f"Unknown VECTOR_BACKEND: {settings.VECTOR_BACKEND}")
+
         # Get or create collection
-        self.collection = self.client.get_or_create_collection(
-            name="medical_knowledge",
-            metadata={"hnsw:space": "cosine"}
+        return self._chroma_client().get_or_create_collection(
+            name=name,
+            metadata=self.hnsw_metadata()
         )
+
+    @staticmethod
+    def hnsw_metadata() -> Dict[str, Any]:
+        """Chroma collection metadata carrying the configured HNSW parameters"""
+        return {
+            "hnsw:space": "cosine",
+            "hnsw:M": settings.HNSW_M,
+            "hnsw:construction_ef": settings.HNSW_CONSTRUCTION_EF,
+            "hnsw:search_ef": settings.HNSW_SEARCH_EF,
+        }
+
+    def _drop_backend_collection(self, name: str) -> None:
+        """Delete a named collection on the configured backend, if it exists"""
+        if settings.VECTOR_BACKEND == "numpy":
+            shutil.rmtree(os.path.join(self._numpy_path, name), ignore_errors=True)
+            return
+        try:
+            self._chroma_client().delete_collection(name)
+        except ValueError:
+            # Chroma raises ValueError for a collection that does not exist
+            pass
+
+    def _rename_backend_collection(self, collection, name: str, new_name: str):
+        """Rename a collection on the configured backend; returns it opened under new_name"""
+        if settings.VECTOR_BACKEND == "numpy":
+            # Open handles keep serving in-flight reads from the moved files
+            os.replace(
+                os.path.join(self._numpy_path, name),
+                os.path.join(self._numpy_path, new_name)
+            )
+            return self._open_backend_collection(new_name)
+        collection.modify(name=new_name)
+        return collection
+
+    def _list_backend_collections(self) -> List[str]:
+        """Names of the collections stored on the configured backend"""
+        if settings.VECTOR_BACKEND == "numpy":
+            if not os.path.isdir(self._numpy_path):
+                return []
+            return sorted(os.listdir(self._numpy_path))
+        return [collection.name for collection in self._chroma_client().list_collections()]
+
+    def _ensure_model(self):
+        """Load the embedder and its batcher and cache once"""
+        if self._state["model"] == self.READY:
+            return
+
+        with self._model_lock:
+            if self._state["model"] == self.READY:
+                return
+            self._state["model"] = self.LOADING
+            try:
+                # Initialize embedding model, in-process or on worker processes
+                self._embedder = create_embedder(
+                    settings.EMBEDDING_MODEL,
+                    workers=settings.EMBEDDING_WORKERS,
+                    shard_size=settings.EMBEDDING_WORKER_SHARD_SIZE
+                )
+
+                # Coalesce concurrent small encode calls into batched model calls
+                if settings.EMBEDDING_BATCHING_ENABLED:
+                    self.embedding_batcher = EmbeddingBatcher(
+                        encode=self._embedder.encode,
+                        max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+                        max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS
+                    )
+
+                # Content-addressed embedding cache
+                if settings.EMBEDDING_CACHE_ENABLED:
+                    self.embedding_cache = EmbeddingCache(
+                        model_name=settings.EMBEDDING_MODEL,
+                        cache_dir=settings.VECTOR_DB_PATH,
+                        max_memory_entries=settings.EMBEDDING_CACHE_MEMORY_ENTRIES,
+                        max_disk_entries=settings.EMBEDDING_CACHE_DISK_ENTRIES
+                    )
+            except Exception as e:
+                self._state["model"] = self.FAILED
+                self._errors["model"] = str(e)
+                raise
+
+            self._errors.pop("model", None)
+            self._state["model"] = self.READY
+
+    def token_counter(self) -> Optional[TokenCounter]:
+        """
+        Token counter for the embedding model, created once
         
-        # Initialize embedding model
-        self.embedding_model = SentenceTransformer(settings.EMBEDDING_MODEL)
+        Returns None when the model has no fast (offset-mapping) tokenizer
+        or its maximum sequence length is unknown.
+        """
+        if self._token_counter_loaded:
+            return self._token_counter
+
+        self._ensure_model()
+        with self._model_lock:
+            if not self._token_counter_loaded:
+                try:
+                    tokenizer = self._embedder.tokenizer()
+                    max_tokens = settings.EMBEDDING_MAX_TOKENS or self._embedder.max_seq_length()
+                    if tokenizer is not None and getattr(tokenizer, "is_fast", False) and max_tokens:
+                        self._token_counter = TokenCounter(
+                            tokenizer,
+                            max_tokens=max_tokens,
+                            cache_size=settings.TOKEN_COUNT_CACHE_SIZE
+                        )
+                except Exception as e:
+                    print(f"Error loading tokenizer: {e}")
+                self._token_counter_loaded = True
+        return self._token_counter
+
+    def warmup(self) -> Dict[str, Any]:
+        """
+        Load the vector store and embedding model ahead of the first request
+
+        Returns:
+            Readiness report after warmup
+        """
+        for ensure in (self._ensure_store, self._ensure_model):
+            try:
+                ensure()
+            except Exception as e:
+                print(f"Error warming up vector store: {e}")
+        return self.readiness()
+
+    def close(self) -> None:
+        """Shut down the embedder (and any worker processes it owns)"""
+        with self._executor_lock:
+            for executor in self._executors.values():
+                executor.shutdown(wait=False, cancel_futures=True)
+            self._executors = {}
+        if self._embedder is not None:
+            self._embedder.close()
+        if isinstance(self._collection, ShardedCollection):
+            self._collection.close()
+
+    def _executor(self, kind: str) -> ThreadPoolExecutor:
+        """Bounded thread pool for 'read' or 'write' work, created on first use"""
+        with self._executor_lock:
+            executor = self._executors.get(kind)
+            if executor is None:
+                workers = settings.KB_READ_WORKERS if kind == "read" else settings.KB_WRITE_WORKERS
+                executor = self._executors[kind] = ThreadPoolExecutor(
+                    max_workers=max(1, workers),
+                    thread_name_prefix=f"kb-{kind}"
+                )
+            return executor
+
+    async def run_read(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run blocking read work (embedding, search, fetch) on the read pool"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor("read"), functools.partial(func, *args, **kwargs)
+        )
+
+    async def run_write(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run blocking write work (ingest, update, delete) on the write pool"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor("write"), functools.partial(func, *args, **kwargs)
+        )
+
+    def submit_write(self, func: Callable[..., Any], *args, **kwargs) -> Future:
+        """Queue blocking write work on the write pool from a worker thread"""
+        return self._executor("write").submit(func, *args, **kwargs)
+
+    @property
+    def is_ready(self) -> bool:
+        """Whether both the store and the embedding model are loaded"""
+        return all(state == self.READY for state in self._state.values())
+
+    def readiness(self) -> Dict[str, Any]:
+        """Load state of the store and embedding model, without triggering a load"""
+        report: Dict[str, Any] = {"ready": self.is_ready, **self._state}
+        if self._errors:
+            report["errors"] = dict(self._errors)
+        return report
+
+    def _encode(self, texts: List[str]):
+        """Run the embedding model, through the batcher when enabled"""
+        self._ensure_model()
+        if self.embedding_batcher is not None:
+            return self.embedding_batcher.encode(texts)
+        return self.embedder.encode(texts)
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, reusing cached vectors for content seen before"""
+        self._ensure_model()
+        if self.embedding_cache is None:
+            return self._encode(texts).tolist()
+
+        vectors = self.embedding_cache.get_or_compute(texts, self._encode)
+        return [vector.tolist() for vector in vectors]
+
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed search queries in one batch, skipping those in the query cache"""
+        if self.query_cache is None:
+            return self._encode(queries).tolist()
+
+        vectors = [self.query_cache.get(query) for query in queries]
+        missing = list(dict.fromkeys(
+            query for query, vector in zip(queries, vectors) if vector is None
+        ))
+        if missing:
+            computed = dict(zip(missing, self._encode(missing)))
+            for query, vector in computed.items():
+                self.query_cache.put(query, vector)
+            vectors = [
+                vector if vector is not None else computed[query]
+                for query, vector in zip(queries, vectors)
+            ]
+        return [vector.tolist() for vector in vectors]
+
+    def embed_documents(self, documents: List[str]) -> List[List[float]]:
+        """Embed documents for a later add_documents call, using the embedding cache"""
+        return self._embed(documents)
+
+    def embed_query(self, query: str) -> List[float]:
+        """Embed one search query, sharing the query embedding cache with search"""
+        return self._embed_queries([query])[0]
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Embedding cache, query cache and batcher statistics"""
+        return {
+            "embedding_cache": (
+                self.embedding_cache.stats() if self.embedding_cache else None
+            ),
+            "query_cache": self.query_cache.stats() if self.query_cache else None,
+            "embedding_batcher": (
+                self.embedding_batcher.stats() if self.embedding_batcher else None
+            )
+        }
     
-    def add_documents(
+    async def aadd_documents(
         self,
         documents: List[str],
         metadatas: Optional[List[Dict[str, Any]]] = None,
         ids: Optional[List[str]] = None
+    ) -> List[str]:
+        """Async add_documents(), run on the write pool"""
+        return await self.run_write(self.add_documents, documents, metadatas, ids)
+
+    def add_documents(
+        self,
+        documents: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+        embeddings: Optional[List[List[float]]] = None
     ) -> List[str]:
         """
         Add documents to vector store
@@ -57,6 +446,7 @@ class VectorStore:
             documents: List of text documents
             metadatas: Optional metadata for each document
             ids: Optional custom IDs
+            embeddings: Optional precomputed embeddings (see embed_documents)
             
         Returns:
             List of document IDs
@@ -72,7 +462,8 @@ class VectorStore:
             metadata["added_at"] = datetime.now().isoformat()
         
         # Generate embeddings
-        embeddings = self.embedding_model.encode(documents).tolist()
+        if embeddings is None:
+            embeddings = self._embed(documents)
         
         # Add to collection
         self.collection.add(
@@ -83,12 +474,118 @@ class VectorStore:
         )
         
         return ids
+
+    def bulk_load(
+        self,
+        records: Iterable[Tuple[str, Optional[Dict[str, Any]], Optional[str]]],
+        batch_size: Optional[int] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Stream documents into the vector store in fixed-size batches
+
+        Embedding of batch N+1 overlaps with the collection write of batch N,
+        and at most two batches are held in memory regardless of corpus size.
+        A failing batch is recorded and skipped; the load continues.
+
+        Args:
+            records: Iterable of (text, metadata, id); metadata and id may be None
+            batch_size: Documents per embed/write batch
+            progress_callback: Called with the running report after each batch
+
+        Returns:
+            Load report with counts, failures and throughput
+        """
+        batch_size = batch_size or settings.BULK_LOAD_BATCH_SIZE
+        report: Dict[str, Any] = {
+            "loaded": 0,
+            "failed": 0,
+            "batches": 0,
+            "errors": [],
+            "elapsed_seconds": 0.0,
+            "docs_per_second": 0.0
+        }
+        started = time.perf_counter()
+        pending: Optional[Tuple[Future, List[str]]] = None
+
+        def record(batch_ids: List[str], error: Optional[Exception] = None) -> None:
+            if error is None:
+                report["loaded"] += len(batch_ids)
+            else:
+                report["failed"] += len(batch_ids)
+                report["errors"].append({"ids": batch_ids, "error": str(error)})
+            report["batches"] += 1
+            report["elapsed_seconds"] = time.perf_counter() - started
+            report["docs_per_second"] = report["loaded"] / report["elapsed_seconds"]
+            if progress_callback:
+                progress_callback(dict(report))
+
+        def finish(write: Future, batch_ids: List[str]) -> None:
+            try:
+                write.result()
+            except Exception as e:
+                record(batch_ids, e)
+            else:
+                record(batch_ids)
+
+        records = iter(records)
+        defer = getattr(self.collection, "deferred_index_maintenance", None)
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="bulk-load") as writer, \
+                (defer() if defer else contextlib.nullcontext()):
+            while True:
+                batch = list(itertools.islice(records, batch_size))
+                if not batch:
+                    break
+
+                documents = [text for text, _, _ in batch]
+                ids = [doc_id or str(uuid.uuid4()) for _, _, doc_id in batch]
+                added_at = datetime.now().isoformat()
+                metadatas = [
+                    {**(metadata or {}), "added_at": added_at}
+                    for _, metadata, _ in batch
+                ]
+
+                try:
+                    embeddings = self._embed(documents)
+                except Exception as e:
+                    embeddings = None
+                    embed_error = e
+
+                # Keep a single write in flight so memory stays bounded
+                if pending is not None:
+                    finish(*pending)
+                    pending = None
+
+                if embeddings is None:
+                    record(ids, embed_error)
+                    continue
+
+                pending = (
+                    writer.submit(
+                        self.collection.add,
+                        embeddings=embeddings,
+                        documents=documents,
+                        metadatas=metadatas,
+                        ids=ids
+                    ),
+                    ids
+                )
+
+            if pending is not None:
+                finish(*pending)
+
+        report["elapsed_seconds"] = time.perf_counter() - started
+        if report["elapsed_seconds"] > 0:
+            report["docs_per_second"] = report["loaded"] / report["elapsed_seconds"]
+        return report
     
     def search(
         self,
         query: str,
         n_results: int = 5,
-        filter_dict: Optional[Dict[str, Any]] = None
+        filter_dict: Optional[Dict[str, Any]] = None,
+        candidate_ids: Optional[List[str]] = None,
+        search_ef: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
         Search vector store for relevant documents
@@ -97,32 +594,111 @@ class VectorStore:
             query: Search query
             n_results: Number of results to return
             filter_dict: Optional metadata filters
+            candidate_ids: Optional ids matching filter_dict, from a metadata index
+            search_ef: Optional HNSW search breadth for this call (see search_many)
             
         Returns:
             List of results with content, metadata, and distance
         """
-        # Generate query embedding
-        query_embedding = self.embedding_model.encode([query]).tolist()
+        return self.search_many([query], n_results, filter_dict, candidate_ids, search_ef)[0]
+
+    async def asearch(
+        self,
+        query: str,
+        n_results: int = 5,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        search_ef: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Async search(), run on the read pool"""
+        return await self.run_read(
+            self.search, query, n_results, filter_dict, search_ef=search_ef
+        )
+
+    async def asearch_many(
+        self,
+        queries: List[str],
+        n_results: int = 5,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        search_ef: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Async search_many(), run on the read pool"""
+        return await self.run_read(
+            self.search_many, queries, n_results, filter_dict, search_ef=search_ef
+        )
+
+    def search_many(
+        self,
+        queries: List[str],
+        n_results: int = 5,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        candidate_ids: Optional[List[str]] = None,
+        search_ef: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for several queries with one batched encode and one collection query
+        
+        Args:
+            queries: Search queries
+            n_results: Number of results per query
+            filter_dict: Optional metadata filters applied to every query
+            candidate_ids: Optional ids matching filter_dict. The NumPy backend
+                scores only these rows; Chroma keeps evaluating filter_dict.
+            search_ef: Optional HNSW search breadth for this call. hnswlib
+                searches with max(ef, k), so Chroma is asked for search_ef
+                candidates and the best n_results are kept; values below
+                HNSW_SEARCH_EF have no effect. Ignored by the exact NumPy backend.
+            
+        Returns:
+            Result list per query, in input order
+        """
+        if not queries:
+            return []
+        if candidate_ids is not None and not candidate_ids:
+            # Nothing can match the filter, so skip embedding altogether
+            return [[] for _ in queries]
+
+        # Generate query embeddings
+        query_embeddings = self._embed_queries(queries)
         
         # Search
-        results = self.collection.query(
-            query_embeddings=query_embedding,
-            n_results=n_results,
-            where=filter_dict
-        )
+        if candidate_ids is not None and isinstance(self.collection, NumpyCollection):
+            results = self.collection.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                ids=candidate_ids
+            )
+        else:
+            fetch = n_results
+            if search_ef and settings.VECTOR_BACKEND != "numpy":
+                fetch = max(n_results, search_ef)
+            # Shards that take ids score only the candidates; the rest use the filter
+            candidates = (
+                {'ids': candidate_ids}
+                if candidate_ids is not None and isinstance(self.collection, ShardedCollection)
+                else {}
+            )
+            results = self.collection.query(
+                query_embeddings=query_embeddings,
+                n_results=fetch,
+                where=filter_dict,
+                **candidates
+            )
         
         # Format results
-        formatted_results = []
-        if results['ids'] and results['ids'][0]:
-            for i, doc_id in enumerate(results['ids'][0]):
-                formatted_results.append({
-                    'id': doc_id,
-                    'content': results['documents'][0][i],
-                    'metadata': results['metadatas'][0][i],
-                    'distance': results['distances'][0][i]
-                })
-        
-        return formatted_results
+        all_results = []
+        for q in range(len(queries)):
+            formatted_results = []
+            if results['ids'] and results['ids'][q]:
+                for i, doc_id in enumerate(results['ids'][q][:n_results]):
+                    formatted_results.append({
+                        'id': doc_id,
+                        'content': results['documents'][q][i],
+                        'metadata': results['metadatas'][q][i],
+                        'distance': results['distances'][q][i]
+                    })
+            all_results.append(formatted_results)
+        
+        return all_results
     
     def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific document by ID"""
@@ -136,6 +712,26 @@ class VectorStore:
             }
         return None
     
+    async def aget_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Async get_document(), run on the read pool"""
+        return await self.run_read(self.get_document, doc_id)
+
+    def get_documents(self, doc_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get several documents by ID, in the order given (missing ids are skipped)"""
+        if not doc_ids:
+            return []
+        result = self.collection.get(ids=doc_ids)
+        
+        found = {
+            doc_id: {
+                'id': doc_id,
+                'content': result['documents'][i],
+                'metadata': result['metadatas'][i]
+            }
+            for i, doc_id in enumerate(result['ids'])
+        }
+        return [found[doc_id] for doc_id in doc_ids if doc_id in found]
+    
     def update_document(
         self,
         doc_id: str,
@@ -148,7 +744,7 @@ class VectorStore:
             
             if document:
                 updates['documents'] = [document]
-                updates['embeddings'] = self.embedding_model.encode([document]).tolist()
+                updates['embeddings'] = self._embed([document])
             
             if metadata:
                 metadata['updated_at'] = datetime.now().isoformat()
@@ -166,41 +762,169 @@ class VectorStore:
     
     def delete_document(self, doc_id: str) -> bool:
         """Delete a document"""
+        return self.delete_documents([doc_id])
+
+    def delete_documents(self, doc_ids: List[str]) -> bool:
+        """Delete several documents by ID"""
         try:
-            self.collection.delete(ids=[doc_id])
+            self.collection.delete(ids=doc_ids)
             return True
         except Exception as e:
             print(f"Error deleting document: {e}")
             return False
     
+    # Projections accepted by list_documents, mapped to collection includes
+    PROJECTIONS = {
+        'full': ['documents', 'metadatas'],
+        'metadata': ['metadatas'],
+        'ids': [],
+    }
+
+    @staticmethod
+    def encode_cursor(offset: int) -> str:
+        """Opaque pagination cursor for an offset"""
+        return base64.urlsafe_b64encode(f"offset:{offset}".encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> int:
+        """Offset encoded in a pagination cursor"""
+        try:
+            kind, value = base64.urlsafe_b64decode(cursor.encode()).decode().split(":", 1)
+            offset = int(value)
+        except (ValueError, UnicodeDecodeError, binascii.Error):
+            raise ValueError(f"Invalid cursor: {cursor}")
+        if kind != "offset" or offset < 0:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        return offset
+
+    def list_documents(
+        self,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        include: str = 'full'
+    ) -> Dict[str, Any]:
+        """
+        Get one page of documents with optional filtering and projection
+        
+        Args:
+            filter_dict: Optional metadata filters
+            limit: Page size; None returns everything from offset on
+            offset: Number of matching documents to skip
+            cursor: Cursor from a previous page; overrides offset
+            include: 'full', 'metadata' (no text) or 'ids'
+            
+        Returns:
+            Dict with documents, offset and next_cursor (None on the last page)
+        """
+        if include not in self.PROJECTIONS:
+            raise ValueError(
+                f"Invalid include '{include}'. Allowed values: {', '.join(self.PROJECTIONS)}"
+            )
+        if cursor:
+            offset = self.decode_cursor(cursor)
+
+        projection = self.PROJECTIONS[include]
+        results = self.collection.get(
+            where=filter_dict,
+            limit=limit,
+            offset=offset or None,
+            include=projection
+        )
+        
+        documents = []
+        for i, doc_id in enumerate(results['ids']):
+            document = {'id': doc_id}
+            if 'documents' in projection:
+                document['content'] = results['documents'][i]
+            if 'metadatas' in projection:
+                document['metadata'] = results['metadatas'][i]
+            documents.append(document)
+
+        full_page = limit is not None and len(documents) == limit
+        return {
+            'documents': documents,
+            'offset': offset,
+            'next_cursor': self.encode_cursor(offset + len(documents)) if full_page else None
+        }
+
+    def iter_documents(
+        self,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        include: str = 'full',
+        page_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over all matching documents one page at a time
+        
+        Pages are offsets, so a write between pages can shift records past
+        the cursor; use get_all_documents or get_all_metadata where a
+        complete, consistent read matters.
+        """
+        cursor = None
+        while True:
+            page = self.list_documents(
+                filter_dict=filter_dict,
+                limit=page_size,
+                cursor=cursor,
+                include=include
+            )
+            yield from page['documents']
+            cursor = page['next_cursor']
+            if cursor is None:
+                return
+
     def get_all_documents(
         self,
         filter_dict: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
         """Get all documents with optional filtering"""
-        results = self.collection.get(where=filter_dict)
-        
-        formatted_results = []
-        for i, doc_id in enumerate(results['ids']):
-            formatted_results.append({
-                'id': doc_id,
-                'content': results['documents'][i],
-                'metadata': results['metadatas'][i]
-            })
-        
-        return formatted_results
+        return self.list_documents(filter_dict)['documents']
+    
+    def get_all_metadata(
+        self,
+        filter_dict: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Get id and metadata of all documents, without document text, in one read"""
+        return self.list_documents(filter_dict, include='metadata')['documents']
     
     def count(self, filter_dict: Optional[Dict[str, Any]] = None) -> int:
         """Count documents in collection"""
-        return self.collection.count(where=filter_dict)
+        if isinstance(self.collection, NumpyCollection):
+            return self.collection.count(where=filter_dict)
+        if filter_dict:
+            # Chroma's count() takes no filter
+            return len(self.collection.get(where=filter_dict, include=[])['ids'])
+        return self.collection.count()
+    
+    def shard_stats(self) -> Dict[str, int]:
+        """Vector count per shard (a single entry when sharding is off)"""
+        if isinstance(self.collection, ShardedCollection):
+            return self.collection.shard_stats()
+        return {self.COLLECTION_NAME: self.collection.count()}
+
+    def compact_shard(self, name: str) -> None:
+        """Compact one shard, leaving the others online"""
+        self._sharded_collection().compact_shard(name)
+
+    def rebuild_shard(self, name: str) -> int:
+        """Rebuild one shard from its own records; returns the vectors rewritten"""
+        return self._sharded_collection().rebuild_shard(name)
+
+    def _sharded_collection(self) -> ShardedCollection:
+        if not isinstance(self.collection, ShardedCollection):
+            raise ValueError("Sharding is disabled (SHARDING_MODE=none)")
+        return self.collection
     
     def clear(self):
         """Clear all documents from collection"""
-        self.client.delete_collection("medical_knowledge")
-        self.collection = self.client.create_collection(
-            name="medical_knowledge",
-            metadata={"hnsw:space": "cosine"}
-        )
+        if isinstance(self.collection, (NumpyCollection, ShardedCollection)):
+            self.collection.reset()
+            return
+
+        self.client.delete_collection(self.COLLECTION_NAME)
+        self._collection = self._open_collection()
 
 
 # Global vector store instance
@@ -0,0 +1,109 @@
+"""
+Where-clause evaluation
+Shared semantics for Chroma-style metadata filters, used by the NumPy
+store, the metadata index and the lexical index
+"""
+
+import operator
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Ordering operators apply to numeric metadata only, as in ChromaDB
+COMPARISONS = {
+    "$gt": operator.gt,
+    "$gte": operator.ge,
+    "$lt": operator.lt,
+    "$lte": operator.le,
+}
+OPERATORS = frozenset(("$eq", "$ne", "$in", "$nin", *COMPARISONS))
+LOGICAL_OPERATORS = ("$and", "$or")
+
+
+def field_conditions(condition: Any) -> List[Tuple[str, Any]]:
+    """
+    (operator, operand) pairs of one field's condition
+
+    A bare value means $eq. Unknown operators raise ValueError instead of
+    being ignored, so a filter is never silently widened.
+    """
+    if not isinstance(condition, dict):
+        return [("$eq", condition)]
+    for op in condition:
+        if op not in OPERATORS:
+            raise ValueError(f"Unsupported where operator: {op}")
+    return list(condition.items())
+
+
+def compare(value: Any, op: str, operand: Any) -> bool:
+    """Whether a metadata value satisfies one operator"""
+    if op == "$eq":
+        return value == operand
+    if op == "$ne":
+        return value != operand
+    if op == "$in":
+        return value in operand
+    if op == "$nin":
+        return value not in operand
+    if op not in COMPARISONS:
+        raise ValueError(f"Unsupported where operator: {op}")
+    return isinstance(value, (int, float)) and COMPARISONS[op](value, operand)
+
+
+def validate_where(where: Optional[Dict[str, Any]]) -> None:
+    """Raise ValueError if where uses an operator no evaluator supports"""
+    for key, condition in (where or {}).items():
+        if key in LOGICAL_OPERATORS:
+            for clause in condition:
+                validate_where(clause)
+        elif key.startswith("$"):
+            raise ValueError(f"Unsupported where operator: {key}")
+        else:
+            field_conditions(condition)
+
+
+def where_fields(where: Optional[Dict[str, Any]]) -> Set[str]:
+    """Metadata fields a where clause reads"""
+    fields: Set[str] = set()
+    for key, condition in (where or {}).items():
+        if key in LOGICAL_OPERATORS:
+            for clause in condition:
+                fields |= where_fields(clause)
+        else:
+            fields.add(key)
+    return fields
+
+
+def matches_where(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """
+    Evaluate a where clause against one record's metadata
+
+    Args:
+        metadata: Record metadata
+        where: Chroma-style filter with field conditions, $and and $or
+
+    Returns:
+        True if the record matches
+
+    Raises:
+        ValueError: The filter uses an unsupported operator, anywhere in
+            it, even if evaluation would not reach that clause
+    """
+    validate_where(where)
+    return _matches(metadata, where)
+
+
+def _matches(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(_matches(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches(metadata, clause) for clause in condition):
+                return False
+        elif not all(
+            compare(metadata.get(key), op, operand)
+            for op, operand in field_conditions(condition)
+        ):
+            return False
+    return True
@@ -7,7 +7,7 @@ from .disease import Disease, DiseaseCreate, DiseaseKnowledge
 from .treatment import Treatment, TreatmentPlan, Medication
 from .metric import HealthMetric, MetricType, BloodPressure, BloodGlucose
 from .query import QueryRequest, QueryResponse, KnowledgeResult
-from .knowledge import KnowledgeCreate
+from .knowledge import KnowledgeCreate, KnowledgeSearchBatchRequest
 
 __all__ = [
     "Patient", "PatientCreate", "PatientUpdate", "PatientProfile",
@@ -15,5 +15,5 @@ __all__ = [
     "Treatment", "TreatmentPlan", "Medication",
     "HealthMetric", "MetricType", "BloodPressure", "BloodGlucose",
     "QueryRequest", "QueryResponse", "KnowledgeResult",
-    "KnowledgeCreate"
+    "KnowledgeCreate", "KnowledgeSearchBatchRequest"
 ]
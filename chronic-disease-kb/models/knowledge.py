@@ -2,7 +2,7 @@
 Knowledge base request/response models
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -12,3 +12,12 @@ class KnowledgeCreate(BaseModel):
     disease: str = Field(..., min_length=1)
     category: str = Field(default="general", min_length=1)
     metadata: Optional[Dict[str, Any]] = None
+
+
+class KnowledgeSearchBatchRequest(BaseModel):
+    """Payload for running several knowledge searches in one request"""
+    queries: List[str] = Field(..., min_length=1, max_length=500)
+    disease: Optional[str] = None
+    category: Optional[str] = None
+    n_results: int = Field(default=5, ge=1, le=20)
+    search_ef: Optional[int] = Field(default=None, ge=1, le=1000)
@@ -2,11 +2,17 @@
 Query and response models for knowledge base interactions
 """
 
+import uuid
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 
 
+def new_query_id() -> str:
+    """Unique query id: request time plus a random suffix"""
+    return f"query_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
 class QueryRequest(BaseModel):
     """User query request"""
     query: str = Field(..., min_length=1, description="User's natural language query")
@@ -52,6 +58,9 @@ class QueryResponse(BaseModel):
     processing_time_ms: int
     timestamp: datetime
     patient_context_applied: bool = False
+    cached: bool = False
+    cache_similarity: Optional[float] = Field(None, ge=0.0, le=1.0, description="Similarity to the cached query")
+    cached_query: Optional[str] = Field(None, description="Earlier query whose answer was reused")
     
     class Config:
         json_schema_extra = {
@@ -0,0 +1,124 @@
+"""
+Script to benchmark HNSW recall@k and latency against exact search on a synthetic corpus
+"""
+
+import argparse
+import sys
+import time
+sys.path.insert(0, '.')
+
+import numpy as np
+
+from kb.evaluation import recall_at_k
+
+
+def synthetic_corpus(size: int, dimension: int, clusters: int, seed: int) -> np.ndarray:
+    """Unit vectors drawn around random cluster centres, like topical chunk embeddings"""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dimension))
+    vectors = centres[rng.integers(clusters, size=size)] + 0.5 * rng.normal(size=(size, dimension))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int):
+    """Ids of the exact cosine top-k for every query"""
+    scores = queries @ corpus.T
+    top = np.argsort(-scores, axis=1)[:, :k]
+    return [[str(i) for i in row] for row in top]
+
+
+def build_collection(client, corpus: np.ndarray, m: int, construction_ef: int, search_ef: int):
+    """Chroma collection over the corpus with the given HNSW parameters"""
+    name = f"ann_benchmark_m{m}_c{construction_ef}"
+    try:
+        client.delete_collection(name)
+    except Exception:
+        pass
+    collection = client.create_collection(
+        name=name,
+        metadata={
+            "hnsw:space": "cosine",
+            "hnsw:M": m,
+            "hnsw:construction_ef": construction_ef,
+            "hnsw:search_ef": search_ef,
+        }
+    )
+    ids = [str(i) for i in range(len(corpus))]
+    for start in range(0, len(corpus), 1000):
+        collection.add(
+            ids=ids[start:start + 1000],
+            embeddings=corpus[start:start + 1000].tolist()
+        )
+    return collection
+
+
+def measure(collection, queries: np.ndarray, k: int, search_ef: int):
+    """Result ids and per-query latencies (ms) for one search_ef"""
+    # hnswlib searches with max(ef, k), as VectorStore.search_many does per call
+    fetch = max(k, search_ef)
+    retrieved, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        result = collection.query(
+            query_embeddings=[query.tolist()],
+            n_results=fetch,
+            include=["distances"]
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        retrieved.append(result["ids"][0][:k])
+    return retrieved, latencies
+
+
+def benchmark_ann(args) -> bool:
+    """Print recall@k and p50/p99 latency for every HNSW setting in the sweep"""
+    print("⏱️  HNSW recall/latency benchmark")
+    try:
+        import chromadb
+    except ImportError:
+        print("  ✗ chromadb is not installed")
+        return False
+
+    corpus = synthetic_corpus(args.corpus_size, args.dimension, args.clusters, args.seed)
+    queries = synthetic_corpus(args.queries, args.dimension, args.clusters, args.seed + 1)
+    print(f"  Corpus: {args.corpus_size} vectors, dimension {args.dimension}, {args.queries} queries")
+
+    start = time.perf_counter()
+    expected = exact_top_k(corpus, queries, args.k)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    print(f"  Exact search: {exact_ms:.2f} ms/query (brute force)")
+
+    client = chromadb.Client()
+    print(f"\n  {'M':>4} {'build_ef':>8} {'search_ef':>9} {'recall@' + str(args.k):>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for m in args.m:
+        for construction_ef in args.construction_ef:
+            build_start = time.perf_counter()
+            collection = build_collection(client, corpus, m, construction_ef, min(args.search_ef))
+            build_seconds = time.perf_counter() - build_start
+            for search_ef in args.search_ef:
+                retrieved, latencies = measure(collection, queries, args.k, search_ef)
+                recall = recall_at_k(retrieved, expected, args.k)
+                p50, p99 = np.percentile(latencies, [50, 99])
+                print(
+                    f"  {m:>4} {construction_ef:>8} {search_ef:>9} "
+                    f"{recall:>10.4f} {p50:>8.2f} {p99:>8.2f}"
+                )
+            print(f"  (build M={m}, construction_ef={construction_ef}: {build_seconds:.1f}s)")
+            client.delete_collection(collection.name)
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--corpus-size", type=int, default=20000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[100, 200])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    success = benchmark_ann(args)
+    sys.exit(0 if success else 1)
@@ -19,18 +19,35 @@ def init_knowledge_base():
     
     print(f"Found {len(knowledge_objects)} disease knowledge documents")
     
-    # Add to knowledge base
-    added_count = 0
+    # Add to knowledge base through the chunk → embed → persist pipeline
+    documents = []
     for knowledge in knowledge_objects:
         try:
-            doc_id = knowledge_base.add_disease_knowledge(knowledge)
-            print(f"  ✓ Added: {knowledge.name} (ID: {doc_id})")
-            added_count += 1
+            documents.append(knowledge_base.disease_knowledge_document(knowledge))
         except Exception as e:
-            print(f"  ✗ Error adding {knowledge.name}: {e}")
-    
+            print(f"  ✗ Error preparing {knowledge.name}: {e}")
+
+    def report_progress(result):
+        name = documents[result['index']]['metadata']['disease_name']
+        if result['status'] == 'failed':
+            print(f"  ✗ Error adding {name}: {result['error']}")
+        else:
+            print(f"  ✓ Added: {name} (ID: {result['doc_id']})")
+
+    report = knowledge_base.ingestion_pipeline().run(documents, progress_callback=report_progress)
+    added_count = report['added'] + report['duplicate']
+
     print(f"\n✅ Successfully added {added_count} documents")
     print(f"📊 Total documents in knowledge base: {knowledge_base.count_documents()}")
+    print(f"⏱️  Ingested {report['docs_per_second']:.1f} docs/s")
+    for name, stage in report['stages'].items():
+        print(
+            f"    {name}: {stage['items']} items, {stage['utilization']:.0%} busy, "
+            f"max queue {stage['max_queue_depth']}/{stage['queue_capacity']}"
+        )
+    token_stats = knowledge_base.get_token_stats()
+    if token_stats['avg_utilization'] is not None:
+        print(f"    Chunks use {token_stats['avg_utilization']:.0%} of model input on average")
     
     # Test search
     print("\n🧪 Testing search functionality...")
@@ -0,0 +1,45 @@
+"""
+Script to report recall@k of quantized vector search against exact search
+"""
+
+import argparse
+import sys
+sys.path.insert(0, '.')
+
+from config import settings
+from kb.numpy_store import NumpyCollection
+from kb.vector_store import vector_store
+
+
+def quantization_report(k: int, sample_size: int):
+    """Print recall@k and memory footprint for the configured quantization"""
+    print("📏 Quantization recall report")
+
+    collection = vector_store.collection
+    if not isinstance(collection, NumpyCollection):
+        print(f"  ✗ Requires VECTOR_BACKEND=numpy (current: {settings.VECTOR_BACKEND})")
+        return False
+
+    report = collection.recall_report(k=k, sample_size=sample_size)
+    print(f"  Quantization: {report['quantization']} (rescore x{report['rescore_factor']})")
+    print(f"  Queries: {report['queries']}")
+    print(f"  Recall@{report['k']}: {report['recall_at_k']:.4f}")
+
+    resident_mb = report['resident_bytes'] / 1024 / 1024
+    used_mb = report['resident_used_bytes'] / 1024 / 1024
+    full_mb = report['full_precision_used_bytes'] / 1024 / 1024
+    print(
+        f"  Resident index: {resident_mb:.2f} MB allocated, {used_mb:.2f} MB used "
+        f"(full precision: {full_mb:.2f} MB used)"
+    )
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--sample-size", type=int, default=200)
+    args = parser.parse_args()
+
+    success = quantization_report(args.k, args.sample_size)
+    sys.exit(0 if success else 1)
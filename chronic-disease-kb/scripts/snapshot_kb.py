@@ -0,0 +1,49 @@
+"""
+Script to create and verify vector index snapshots for fast node startup
+"""
+
+import argparse
+import sys
+sys.path.insert(0, '.')
+
+from kb.snapshot import SnapshotError, verify_snapshot
+from kb.vector_store import vector_store
+
+
+def create(path: str) -> bool:
+    """Write the current collection to a snapshot directory"""
+    print(f"📸 Writing snapshot to {path}...")
+    try:
+        manifest = vector_store.write_snapshot(path)
+    except Exception as e:
+        print(f"  ✗ Error creating snapshot: {e}")
+        return False
+
+    print(f"  ✓ {manifest['count']} vectors, dimension {manifest['dimension']}")
+    print(f"  Embedding model: {manifest['embedding_model']}")
+    return True
+
+
+def verify(path: str) -> bool:
+    """Check a snapshot's version, checksums and record count"""
+    print(f"🔍 Verifying snapshot {path}...")
+    try:
+        manifest = verify_snapshot(path, checksums=True)
+    except SnapshotError as e:
+        print(f"  ✗ {e}")
+        return False
+
+    print(f"  ✓ Snapshot v{manifest['version']} created {manifest['created_at']}")
+    print(f"  {manifest['count']} vectors, dimension {manifest['dimension']}")
+    print(f"  Embedding model: {manifest['embedding_model']}")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("command", choices=["create", "verify"])
+    parser.add_argument("path", help="Snapshot directory")
+    args = parser.parse_args()
+
+    success = create(args.path) if args.command == "create" else verify(args.path)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,129 @@
+"""
+Tests for the semantic answer cache
+"""
+
+from datetime import datetime
+
+import pytest
+
+from agents.answer_cache import AnswerCache
+from agents.orchestrator import AgentOrchestrator
+from config import settings
+from models.query import QueryRequest, QueryResponse
+
+
+def embed(query):
+    """Bag-of-characters vector, so rephrasings with the same characters are close"""
+    vector = [0.0] * 64
+    for char in query:
+        if not char.isspace() and char not in "?？":
+            vector[ord(char) % 64] += 1.0
+    return vector
+
+
+def make_response(query, answer="早期症状包括口渴、多尿"):
+    return QueryResponse(
+        query_id="query_1",
+        query=query,
+        answer=answer,
+        confidence=0.9,
+        processing_time_ms=3000,
+        timestamp=datetime.now()
+    )
+
+
+class TestAnswerCache:
+    """Test similarity lookup, scoping and invalidation"""
+
+    def test_near_duplicate_query_returns_cached_answer(self):
+        """A rephrasing above the threshold should reuse the earlier answer"""
+        cache = AnswerCache(embed, threshold=0.9)
+        original = QueryRequest(query="2型糖尿病的早期症状是什么？")
+        cache.store(original, 0, make_response(original.query))
+
+        hit = cache.lookup(QueryRequest(query="2型糖尿病的早期症状是什么"), 0)
+
+        assert hit.cached is True
+        assert hit.answer == "早期症状包括口渴、多尿"
+        assert hit.query == "2型糖尿病的早期症状是什么"
+        assert hit.cached_query == original.query
+        assert hit.cache_similarity == pytest.approx(1.0)
+        assert hit.query_id != "query_1"
+        assert cache.lookup(QueryRequest(query=original.query), 0).query_id != hit.query_id
+        assert cache.stats()["hits"] == 2
+
+    def test_scope_generation_and_threshold_must_match(self):
+        """Different filters, a newer KB generation or a distant query should miss"""
+        cache = AnswerCache(embed, threshold=0.9)
+        request = QueryRequest(query="哮喘发作时应该怎么办？", disease_filter=["asthma"])
+        cache.store(request, 0, make_response(request.query))
+
+        assert cache.lookup(QueryRequest(query=request.query), 0) is None
+        assert cache.lookup(QueryRequest(query="高血压饮食", disease_filter=["asthma"]), 0) is None
+        assert cache.lookup(request, 1) is None
+        # The generation miss evicted the entry
+        assert cache.lookup(request, 0) is None
+        assert cache.stats()["entries"] == 0
+
+
+class TestOrchestratorAnswerCache:
+    """Test answer caching in the query pipeline"""
+
+    def make_orchestrator(self, monkeypatch, answered=True):
+        orchestrator = AgentOrchestrator()
+        orchestrator.answer_cache = AnswerCache(embed, threshold=0.9)
+        calls = []
+        monkeypatch.setattr(orchestrator.query_agent, "process", lambda query: {})
+
+        def retrieve(query, **kwargs):
+            calls.append(query)
+            return make_response(query), answered
+
+        monkeypatch.setattr(orchestrator.retrieval_agent, "retrieve", retrieve)
+        return orchestrator, calls
+
+    def test_repeated_question_skips_pipeline(self, monkeypatch):
+        """The second phrasing should be answered without running the agents"""
+        orchestrator, calls = self.make_orchestrator(monkeypatch)
+
+        orchestrator.process_query(QueryRequest(query="2型糖尿病的早期症状是什么？"))
+        response = orchestrator.process_query(QueryRequest(query="2型糖尿病 早期症状是什么"))
+
+        assert len(calls) == 1
+        assert response.cached is True
+
+    def test_patient_context_opts_out(self, monkeypatch):
+        """Requests carrying a patient should always run the full pipeline"""
+        orchestrator, calls = self.make_orchestrator(monkeypatch)
+        request = QueryRequest(query="2型糖尿病的早期症状是什么？", patient_id="patient_123")
+
+        orchestrator.process_query(request)
+        response = orchestrator.process_query(request)
+
+        assert len(calls) == 2
+        assert response.cached is False
+        assert orchestrator.get_answer_cache_stats()["entries"] == 0
+
+    def test_failed_answer_is_not_cached(self, monkeypatch):
+        """An answer whose LLM call failed should not be served to later queries"""
+        orchestrator, calls = self.make_orchestrator(monkeypatch, answered=False)
+        request = QueryRequest(query="2型糖尿病的早期症状是什么？")
+
+        orchestrator.process_query(request)
+        response = orchestrator.process_query(request)
+
+        assert len(calls) == 2
+        assert response.cached is False
+
+    def test_llm_failure_is_reported_explicitly(self, monkeypatch):
+        """A provider error comes back as text and a failure flag"""
+        agent = AgentOrchestrator().retrieval_agent
+        agent.llm_provider = "openai"
+        monkeypatch.setattr(settings, "OPENAI_API_KEY", None)
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+
+        text, ok = agent._complete("hello")
+
+        assert ok is False
+        assert text == "[Error: OpenAI API key not configured]"
+        assert agent._call_llm("hello") == text
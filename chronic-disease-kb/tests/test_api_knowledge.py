@@ -2,9 +2,20 @@
 API tests for knowledge governance validation.
 """
 
+import asyncio
+import json
+import threading
+
+import numpy as np
+import pytest
 from fastapi.testclient import TestClient
 
 from api.main import app
+from api.routes import knowledge as knowledge_routes
+from kb.embedders import Embedder
+from kb.knowledge_base import KnowledgeBase
+from kb.numpy_store import NumpyCollection
+from kb.vector_store import VectorStore
 
 
 client = TestClient(app)
@@ -64,3 +75,101 @@ def test_add_knowledge_invalid_evidence_level_returns_400():
 
     assert response.status_code == 400
     assert "Invalid evidence_level" in response.json().get("detail", "")
+
+
+def test_search_batch_requires_queries():
+    """Batch search with an empty query list should fail validation."""
+    response = client.post("/api/v1/knowledge/search/batch", json={"queries": []})
+
+    assert response.status_code == 422
+
+
+class FakeEmbedder(Embedder):
+    """Deterministic stand-in for the embedding backend"""
+
+    def __init__(self):
+        super().__init__("fake")
+
+    def encode(self, texts):
+        return np.array([[float(len(text)), 1.0] for text in texts])
+
+
+def test_bulk_add_streams_result_per_line(tmp_path, monkeypatch):
+    """Each NDJSON record should get its own result line, then a summary"""
+    kb = KnowledgeBase()
+    kb.vector_store = VectorStore()
+    kb.vector_store._collection = NumpyCollection(str(tmp_path))
+    kb.vector_store._embedder = FakeEmbedder()
+    kb.vector_store._state = {"store": VectorStore.READY, "model": VectorStore.READY}
+    monkeypatch.setattr(knowledge_routes, "knowledge_base", kb)
+
+    metadata = {
+        "source_id": "ada-2026-soc",
+        "document_version": "2026.1",
+        "evidence_level": "GRADE_LOW",
+    }
+    lines = [
+        json.dumps({"content": "Metformin is first-line therapy.", "disease": "diabetes_type2",
+                    "metadata": metadata}),
+        "",
+        json.dumps({"disease": "diabetes_type2", "metadata": metadata}),
+        "{not json",
+        json.dumps({"content": "Inhaled steroids control asthma.", "disease": "asthma",
+                    "category": "treatment", "metadata": {}}),
+    ]
+
+    response = client.post(
+        "/api/v1/knowledge/bulk",
+        content="\n".join(lines).encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.text.splitlines()]
+    results = {record["index"]: record for record in records[:-1]}
+    assert results[0]["status"] == "added"
+    assert kb.get_document(results[0]["doc_id"]) is not None
+    assert "content" in results[1]["error"]
+    assert results[2]["status"] == "failed"
+    assert "source_id" in results[3]["error"]
+    assert records[-1] == {"summary": {"added": 1, "duplicate": 0, "failed": 3}}
+
+
+def test_bulk_body_reader_returns_when_stopped():
+    """The feeder should stop waiting on the event loop once the response ends"""
+    loop = asyncio.new_event_loop()
+    loop_thread = threading.Thread(target=loop.run_forever, daemon=True)
+    loop_thread.start()
+
+    async def stalled_body():
+        await asyncio.Event().wait()
+        yield b""
+
+    stop = threading.Event()
+    records = knowledge_routes._knowledge_records(stalled_body(), loop, stop, poll_seconds=0.01)
+    feeder = threading.Thread(target=lambda: list(records), daemon=True)
+    feeder.start()
+    stop.set()
+    feeder.join(2)
+
+    loop.call_soon_threadsafe(loop.stop)
+    loop_thread.join(2)
+    assert not feeder.is_alive()
+
+
+async def test_streaming_response_closes_off_the_loop_on_disconnect():
+    """A failed send should still run on_close, in a worker thread"""
+    closed_on = []
+
+    def on_close():
+        closed_on.append(threading.current_thread())
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            raise OSError("client went away")
+
+    response = knowledge_routes.NDJSONStreamingResponse(iter(["{}\n"]), on_close=on_close)
+    with pytest.raises(OSError):
+        await response({"type": "http"}, None, send)
+
+    assert closed_on and closed_on[0] is not threading.current_thread()
@@ -0,0 +1,102 @@
+"""
+Tests for the embedding backends
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from kb import embedders
+from kb.embedders import ProcessPoolEmbedder, create_embedder
+
+
+class FakeModel:
+    """Stands in for SentenceTransformer: embeds 'text-<n>' as [n, len]"""
+
+    max_seq_length = 128
+
+    def encode(self, texts):
+        # Later shards finish first, so completion order differs from input order
+        time.sleep(0.02 / (1 + int(texts[0].split("-")[1])))
+        return np.array([[float(text.split("-")[1]), float(len(text))] for text in texts])
+
+
+class FakeLocalEmbedder(embedders.Embedder):
+    """In-process embedder over FakeModel"""
+
+    def __init__(self, model_name):
+        super().__init__(model_name)
+        self.model = FakeModel()
+
+    def encode(self, texts):
+        return self.model.encode(texts)
+
+
+class BrokenExecutor:
+    """Executor whose workers have died"""
+
+    def map(self, fn, *iterables):
+        raise BrokenProcessPool("worker exited")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def make_pool_embedder(executor, shard_size=2):
+    embedder = ProcessPoolEmbedder("fake-model", workers=2, shard_size=shard_size)
+    embedder._executor.shutdown()
+    embedder._executor = executor
+    return embedder
+
+
+class TestProcessPoolEmbedder:
+    """Test sharded encoding across the worker pool"""
+
+    def test_sharded_encode_keeps_input_order(self, monkeypatch):
+        """Rows should come back in input order whatever order shards finish in"""
+        monkeypatch.setattr(embedders, "_worker_model", FakeModel())
+        embedder = make_pool_embedder(ThreadPoolExecutor(max_workers=4), shard_size=2)
+        texts = [f"text-{i}" for i in range(9)]
+
+        vectors = embedder.encode(texts)
+
+        assert vectors.shape == (9, 2)
+        assert vectors[:, 0].tolist() == list(range(9))
+        embedder.close()
+
+    def test_broken_pool_falls_back_to_local_model(self, monkeypatch):
+        """A broken pool should switch encoding to the in-process model for good"""
+        monkeypatch.setattr(embedders, "LocalEmbedder", FakeLocalEmbedder)
+        embedder = make_pool_embedder(BrokenExecutor())
+
+        first = embedder.encode(["text-1", "text-2", "text-3"])
+        second = embedder.encode(["text-4"])
+
+        assert isinstance(embedder._fallback, FakeLocalEmbedder)
+        assert first[:, 0].tolist() == [1.0, 2.0, 3.0]
+        assert second[:, 0].tolist() == [4.0]
+
+    def test_empty_batch(self):
+        """Encoding nothing should not touch the pool"""
+        embedder = make_pool_embedder(BrokenExecutor())
+
+        assert embedder.encode([]).shape[0] == 0
+
+
+class TestCreateEmbedder:
+    """Test backend selection"""
+
+    def test_no_workers_uses_local_model(self, monkeypatch):
+        monkeypatch.setattr(embedders, "LocalEmbedder", FakeLocalEmbedder)
+
+        assert isinstance(create_embedder("fake-model", workers=0), FakeLocalEmbedder)
+
+    def test_workers_use_process_pool(self):
+        embedder = create_embedder("fake-model", workers=2, shard_size=16)
+
+        assert isinstance(embedder, ProcessPoolEmbedder)
+        assert embedder.workers == 2
+        assert embedder.shard_size == 16
+        embedder.close()
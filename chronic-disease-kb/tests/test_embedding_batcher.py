@@ -0,0 +1,57 @@
+"""
+Unit tests for the micro-batching embedding scheduler
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from kb.embedding_batcher import EmbeddingBatcher
+
+
+class RecordingEncoder:
+    """Fake encoder that embeds each text as its length and records batch sizes"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, texts):
+        self.batch_sizes.append(len(texts))
+        return np.array([[float(len(text))] for text in texts])
+
+
+class TestEmbeddingBatcher:
+    """Test request coalescing and fan-out"""
+
+    def test_concurrent_calls_are_coalesced(self):
+        """Concurrent single-text calls should share model invocations"""
+        encoder = RecordingEncoder()
+        batcher = EmbeddingBatcher(encoder, max_batch_size=64, max_wait_ms=50)
+        texts = ["x" * n for n in range(1, 33)]
+
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            vectors = list(pool.map(lambda text: batcher.encode([text]), texts))
+
+        assert [vector[0][0] for vector in vectors] == [float(len(text)) for text in texts]
+        assert len(encoder.batch_sizes) < len(texts)
+        assert batcher.stats()["items"] == len(texts)
+
+    def test_full_batch_bypasses_queue(self):
+        """Requests at or above max_batch_size should be encoded directly"""
+        encoder = RecordingEncoder()
+        batcher = EmbeddingBatcher(encoder, max_batch_size=4)
+
+        batcher.encode(["a", "b", "c", "d", "e"])
+
+        assert encoder.batch_sizes == [5]
+        assert batcher.stats()["histogram"] == {"4-7": 1}
+
+    def test_errors_propagate_to_callers(self):
+        """A failing encode should raise in every waiting caller"""
+        def failing_encoder(texts):
+            raise RuntimeError("model unavailable")
+
+        batcher = EmbeddingBatcher(failing_encoder, max_batch_size=8, max_wait_ms=1)
+        with pytest.raises(RuntimeError, match="model unavailable"):
+            batcher.encode(["text"])
@@ -0,0 +1,101 @@
+"""
+Unit tests for the embedding cache
+"""
+
+import time
+
+import numpy as np
+
+from kb.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+
+
+class CountingEncoder:
+    """Fake encoder that records how many texts it embedded"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, texts):
+        self.calls += len(texts)
+        return [np.full(4, float(len(text)), dtype=np.float32) for text in texts]
+
+
+class TestEmbeddingCache:
+    """Test embedding cache tiers and counters"""
+
+    def test_repeated_text_is_not_recomputed(self):
+        """Second lookup of the same content should hit the memory tier"""
+        cache = EmbeddingCache(model_name="test-model")
+        encoder = CountingEncoder()
+
+        first = cache.get_or_compute(["糖尿病", "高血压"], encoder)
+        second = cache.get_or_compute(["高血压", "糖尿病"], encoder)
+
+        assert encoder.calls == 2
+        assert np.allclose(first[0], second[1])
+        stats = cache.stats()
+        assert stats["memory_hits"] == 2
+        assert stats["misses"] == 2
+
+    def test_key_depends_on_model_name(self):
+        """Vectors from different embedding models must not collide"""
+        assert EmbeddingCache("model-a").key("text") != EmbeddingCache("model-b").key("text")
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        """A new cache instance should reuse vectors persisted on disk"""
+        encoder = CountingEncoder()
+        EmbeddingCache("test-model", cache_dir=str(tmp_path)).get_or_compute(["asthma"], encoder)
+
+        restarted = EmbeddingCache("test-model", cache_dir=str(tmp_path))
+        restarted.get_or_compute(["asthma"], encoder)
+
+        assert encoder.calls == 1
+        assert restarted.stats()["disk_hits"] == 1
+
+    def test_size_bounded_eviction(self, tmp_path):
+        """Both tiers should evict once they exceed their bounds"""
+        cache = EmbeddingCache(
+            "test-model",
+            cache_dir=str(tmp_path),
+            max_memory_entries=2,
+            max_disk_entries=3
+        )
+        cache.get_or_compute(["a", "bb", "ccc", "dddd", "eeeee"], CountingEncoder())
+
+        stats = cache.stats()
+        assert stats["memory_entries"] == 2
+        assert stats["disk_entries"] == 3
+
+
+class TestQueryEmbeddingCache:
+    """Test query embedding LRU with TTL"""
+
+    def test_normalized_queries_share_entry(self):
+        """Case, width and whitespace differences should hit the same entry"""
+        cache = QueryEmbeddingCache(max_entries=8)
+        cache.put("HbA1c  target", np.ones(4))
+
+        assert cache.get("  hba1c target ") is not None
+        assert cache.get("ＨｂＡ１ｃ target") is not None
+        assert cache.stats()["hit_ratio"] == 1.0
+
+    def test_entries_expire_after_ttl(self):
+        """Entries older than the TTL should be treated as misses"""
+        cache = QueryEmbeddingCache(max_entries=8, ttl_seconds=0.01)
+        cache.put("哮喘治疗", np.ones(4))
+        time.sleep(0.02)
+
+        assert cache.get("哮喘治疗") is None
+        assert cache.stats()["expired"] == 1
+
+    def test_capacity_is_bounded(self):
+        """Least recently used queries should be evicted first"""
+        cache = QueryEmbeddingCache(max_entries=2)
+        cache.put("a", np.ones(4))
+        cache.put("b", np.ones(4))
+        cache.get("a")
+        cache.put("c", np.ones(4))
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.stats()["entries"] == 2
@@ -2,11 +2,24 @@
 Integration tests for knowledge base
 """
 
+import io
 import pytest
+import random
 import sys
+import threading
+import time
 sys.path.insert(0, '.')
 
-from kb.knowledge_base import knowledge_base, DocumentChunker
+import numpy as np
+
+from kb.knowledge_base import knowledge_base, KnowledgeBase, DocumentChunker
+from kb.vector_store import VectorStore
+from kb.embedders import Embedder
+from kb.token_counter import TokenCounter
+from kb.numpy_store import NumpyCollection
+from kb.result_cache import SearchResultCache
+from kb.ingestion import IngestionPipeline
+from config import settings
 from data.sample_knowledge import DIABETES_TYPE2_KNOWLEDGE, create_disease_knowledge_objects
 
 
@@ -110,6 +123,745 @@ class TestKnowledgeBase:
             )
 
 
+class TestStreamingChunker:
+    """Test the single-pass streaming chunker"""
+
+    TEXT = "".join(
+        f"第{i}条：糖尿病患者应定期监测血糖。Check HbA1c every 3.5 months. " for i in range(200)
+    )
+
+    def test_stream_matches_string_chunking(self):
+        """File-like and iterator input should chunk exactly like a string, for any read size"""
+        rng = random.Random(2026)
+        alphabet = ["a", "b", " ", " ", ".", ".", "。", "！", "?", "」", ")", "\n", "3.5", "…"]
+        for _ in range(500):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 200)))
+            chunk_size = rng.randint(1, 40)
+            chunker = DocumentChunker(chunk_size=chunk_size, overlap=rng.randint(0, chunk_size - 1))
+            chunker.READ_SIZE = rng.randint(1, 16)
+            expected = chunker.chunk_text(text)
+
+            assert list(chunker.iter_chunks(io.StringIO(text))) == expected, (text, chunker.READ_SIZE)
+            cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 20))))
+            pieces = [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+            assert list(chunker.iter_chunks(pieces)) == expected, (text, pieces)
+
+    def test_stream_matches_string_chunking_for_large_documents(self):
+        """Realistic documents read in 4 KB pieces should chunk exactly like a string"""
+        chunker = DocumentChunker(chunk_size=512, overlap=50)
+        chunker.READ_SIZE = 4096
+        text = self.TEXT * 12
+
+        assert list(chunker.iter_chunks(io.StringIO(text))) == chunker.chunk_text(text)
+
+    def test_chunks_end_at_cjk_and_latin_sentence_boundaries(self):
+        """Chunks should break after 。 or a Latin full stop, not inside 3.5"""
+        chunks = DocumentChunker(chunk_size=120, overlap=20).chunk_text(self.TEXT)
+
+        assert all(len(chunk) <= 120 for chunk in chunks)
+        assert all(chunk.rstrip().endswith(("。", "months.")) for chunk in chunks[:-1])
+
+    def test_always_advances(self):
+        """An overlap of chunk_size - 1 should still terminate"""
+        chunks = DocumentChunker(chunk_size=10, overlap=9).chunk_text("x" * 100)
+
+        assert len(chunks) == 91
+
+    def test_overlap_must_be_smaller_than_chunk_size(self):
+        """An overlap that could stall the chunker should be rejected"""
+        with pytest.raises(ValueError):
+            DocumentChunker(chunk_size=100, overlap=100)
+
+
+class TestTokenAwareChunking:
+    """Test chunk sizing in embedding-model tokens"""
+
+    TEXT = "糖尿病患者应定期监测血糖。" * 40
+
+    def test_chunks_fit_model_token_limit(self):
+        """Chunks should fill but not exceed the model's input, overlapping by tokens"""
+        counter = TokenCounter(FakeTokenizer(), max_tokens=32)
+        chunker = DocumentChunker(chunk_size=512, overlap=4, token_counter=counter)
+
+        chunks = chunker.chunk_text(self.TEXT)
+        counts = [counter.count(chunk) for chunk in chunks]
+
+        assert chunker.token_budget == 30
+        assert all(count <= 32 for count in counts)
+        assert min(counts[:-1]) >= 16
+        assert chunks[1].startswith(chunks[0][-4:])
+        # Counts recorded while chunking are served from the cache
+        assert counter.stats()["misses"] == 0
+
+    def test_ingest_uses_tokens_and_reports_utilization(self, tmp_path, monkeypatch):
+        """Token-mode ingest should never truncate and should report utilization"""
+        monkeypatch.setattr(settings, "CHUNK_SIZE_UNIT", "tokens")
+        kb = make_offline_kb(tmp_path)
+        kb.vector_store._embedder = TokenizingEmbedder()
+
+        doc_id = kb.add_knowledge(self.TEXT, "diabetes_type2", "general", GOVERNANCE_METADATA)
+        stats = kb.get_token_stats()
+
+        assert stats["chunk_size_unit"] == "tokens"
+        assert stats["truncated_chunks"] == 0
+        assert stats["last_ingest"]["doc_id"] == doc_id
+        assert stats["avg_utilization"] > 0.5
+
+    def test_character_chunks_warn_on_truncation(self, tmp_path, monkeypatch, capsys):
+        """Character-sized chunks longer than the model input should be reported"""
+        monkeypatch.setattr(settings, "CHUNK_SIZE_UNIT", "chars")
+        monkeypatch.setattr(settings, "CHUNK_SIZE", 100)
+        kb = make_offline_kb(tmp_path)
+        kb.chunker = DocumentChunker(chunk_size=100, overlap=10)
+        kb.vector_store._embedder = TokenizingEmbedder()
+
+        kb.add_knowledge(self.TEXT, "diabetes_type2", "general", GOVERNANCE_METADATA)
+
+        assert kb.get_token_stats()["truncated_chunks"] > 0
+        assert "will be truncated" in capsys.readouterr().out
+
+
+class TestVectorStoreLifecycle:
+    """Test lazy initialization of the vector store"""
+
+    def test_construction_does_not_load(self):
+        """Creating a VectorStore should not load ChromaDB or the model"""
+        store = VectorStore()
+        readiness = store.readiness()
+
+        assert readiness["ready"] is False
+        assert readiness["store"] == VectorStore.COLD
+        assert readiness["model"] == VectorStore.COLD
+
+
+class FakeEmbedder(Embedder):
+    """Deterministic stand-in for the embedding backend"""
+
+    def __init__(self):
+        super().__init__("fake")
+
+    def encode(self, texts):
+        return np.array([[float(len(text)), 1.0] for text in texts])
+
+
+class FakeTokenizer:
+    """Fast-tokenizer stand-in: every non-space character is one token"""
+
+    is_fast = True
+
+    def num_special_tokens_to_add(self, pair=False):
+        return 2
+
+    def __call__(self, text, add_special_tokens=True, return_offsets_mapping=False, verbose=True):
+        if isinstance(text, list):
+            return {"input_ids": [self(t)["input_ids"] for t in text]}
+        offsets = [(i, i + 1) for i, char in enumerate(text) if not char.isspace()]
+        encoded = {"input_ids": [0] * len(offsets)}
+        if return_offsets_mapping:
+            encoded["offset_mapping"] = offsets
+        return encoded
+
+
+class TokenizingEmbedder(FakeEmbedder):
+    """Fake embedder exposing a tokenizer with a 32-token input limit"""
+
+    def tokenizer(self):
+        return FakeTokenizer()
+
+    def max_seq_length(self):
+        return 32
+
+
+class FakeCollection:
+    """Records writes, optionally failing on ids containing 'bad'"""
+
+    def __init__(self):
+        self.added = []
+
+    def add(self, embeddings, documents, metadatas, ids):
+        if any("bad" in doc_id for doc_id in ids):
+            raise RuntimeError("write rejected")
+        self.added.extend(ids)
+
+
+def make_offline_store(collection=None):
+    """VectorStore wired to in-memory fakes instead of ChromaDB and the model"""
+    store = VectorStore()
+    store._collection = collection or FakeCollection()
+    store._embedder = FakeEmbedder()
+    store._state = {"store": VectorStore.READY, "model": VectorStore.READY}
+    return store
+
+
+class TestBulkLoad:
+    """Test streaming bulk load"""
+
+    def test_loads_in_batches_with_progress(self):
+        """Records should be written in fixed-size batches with progress reports"""
+        store = make_offline_store()
+        progress = []
+        records = ((f"document {i}", {"disease": "asthma"}, f"id-{i}") for i in range(10))
+
+        report = store.bulk_load(records, batch_size=4, progress_callback=progress.append)
+
+        assert report["loaded"] == 10
+        assert report["batches"] == 3
+        assert [p["loaded"] for p in progress] == [4, 8, 10]
+        assert store.collection.added == [f"id-{i}" for i in range(10)]
+
+    def test_failed_batch_does_not_stop_load(self):
+        """A rejected batch should be reported while the rest still loads"""
+        store = make_offline_store()
+        records = [("a", None, "ok-1"), ("b", None, "bad-1"), ("c", None, "ok-2")]
+
+        report = store.bulk_load(records, batch_size=1)
+
+        assert report["loaded"] == 2
+        assert report["failed"] == 1
+        assert report["errors"][0]["ids"] == ["bad-1"]
+
+
+GOVERNANCE_METADATA = {
+    "source_id": "ada-2026-soc",
+    "document_version": "2026.1",
+    "evidence_level": "GRADE_LOW"
+}
+
+
+def make_offline_kb(tmp_path):
+    """KnowledgeBase over an offline NumPy-backed store"""
+    kb = KnowledgeBase()
+    kb.vector_store = make_offline_store(NumpyCollection(str(tmp_path)))
+    return kb
+
+
+class TestDeduplication:
+    """Test content-hash deduplication at ingest"""
+
+    def test_resubmitted_document_returns_existing_id(self, tmp_path):
+        """The same text for the same disease should be stored once"""
+        kb = make_offline_kb(tmp_path)
+        first = kb.add_knowledge(
+            "Metformin is first-line therapy.", "diabetes_type2", "treatment", GOVERNANCE_METADATA
+        )
+        second = kb.add_knowledge(
+            "Metformin  is first-line therapy.", "diabetes_type2", "treatment", GOVERNANCE_METADATA
+        )
+
+        assert first == second
+        assert kb.count_documents() == 1
+        assert kb.get_dedup_stats()["documents_deduplicated"] == 1
+
+    def test_same_text_for_other_disease_is_stored(self, tmp_path):
+        """Deduplication is scoped by disease so disease filters stay correct"""
+        kb = make_offline_kb(tmp_path)
+        kb.add_knowledge("Quit smoking.", "copd", "lifestyle", GOVERNANCE_METADATA)
+        kb.add_knowledge("Quit smoking.", "asthma", "lifestyle", GOVERNANCE_METADATA)
+
+        assert kb.count_documents() == 2
+
+    def test_delete_removes_all_chunks_and_hashes(self, tmp_path):
+        """Deleting a chunked document removes every chunk and allows re-adding"""
+        kb = make_offline_kb(tmp_path)
+        long_text = " ".join(f"Sentence number {i} about blood pressure." for i in range(60))
+        doc_id = kb.add_knowledge(long_text, "hypertension", "general", GOVERNANCE_METADATA)
+        assert kb.count_documents() > 1
+
+        assert kb.delete_document(doc_id) is True
+        assert kb.count_documents() == 0
+        assert kb.delete_document(doc_id) is False
+
+        readded = kb.add_knowledge(long_text, "hypertension", "general", GOVERNANCE_METADATA)
+        assert readded != doc_id
+
+    def test_new_document_version_is_stored(self, tmp_path):
+        """Identical text under a new guideline version keeps its own governance metadata"""
+        kb = make_offline_kb(tmp_path)
+        first = kb.add_knowledge("Quit smoking.", "copd", "lifestyle", GOVERNANCE_METADATA)
+        second = kb.add_knowledge(
+            "Quit smoking.", "copd", "lifestyle", {**GOVERNANCE_METADATA, "document_version": "2026.2"}
+        )
+
+        assert first != second
+        assert kb.get_document(second)["metadata"]["document_version"] == "2026.2"
+
+    def test_shared_chunks_are_stored_per_document(self, tmp_path):
+        """A document overlapping another keeps every chunk and survives the other's deletion"""
+        kb = make_offline_kb(tmp_path)
+        shared = " ".join(f"Sentence number {i} about blood pressure." for i in range(60))
+        first = kb.add_knowledge(shared, "hypertension", "general", GOVERNANCE_METADATA)
+        second = kb.add_knowledge(
+            shared + " One more sentence.", "hypertension", "general", GOVERNANCE_METADATA
+        )
+        kb.delete_document(first)
+
+        chunks = kb.vector_store.get_all_metadata({"doc_id": second})
+        assert chunks
+        assert len(chunks) == int(chunks[0]["metadata"]["total_chunks"])
+
+    def test_edited_document_frees_its_old_hash(self, tmp_path):
+        """After a content edit the old text is new again, and the new text deduplicates"""
+        kb = make_offline_kb(tmp_path)
+        doc_id = kb.add_knowledge("Quit smoking.", "copd", "lifestyle", GOVERNANCE_METADATA)
+
+        assert kb.update_document(doc_id, content="Stay active.") is True
+
+        assert kb.add_knowledge("Quit smoking.", "copd", "lifestyle", GOVERNANCE_METADATA) != doc_id
+        assert kb.add_knowledge("Stay active.", "copd", "lifestyle", GOVERNANCE_METADATA) == doc_id
+
+
+class TestSearchMany:
+    """Test batched multi-query search"""
+
+    def test_results_returned_per_query_in_order(self, tmp_path):
+        """Each query should get its own result list, in input order"""
+        store = make_offline_store(NumpyCollection(str(tmp_path)))
+        store.add_documents(
+            documents=["a", "a" * 8],
+            metadatas=[{"disease": "asthma"}, {"disease": "asthma"}],
+            ids=["short", "long"]
+        )
+
+        results = store.search_many(["b", "b" * 8, "b"], n_results=1)
+
+        assert [r[0]["id"] for r in results] == ["short", "long", "short"]
+        assert store.query_cache.stats()["entries"] == 2
+
+    def test_search_ef_widens_hnsw_query_and_trims(self, tmp_path, monkeypatch):
+        """search_ef should ask the HNSW backend for more candidates but return n_results"""
+        monkeypatch.setattr(settings, "VECTOR_BACKEND", "chroma")
+        backing = NumpyCollection(str(tmp_path))
+        requested = []
+
+        class RecordingCollection:
+            def add(self, **kwargs):
+                backing.add(**kwargs)
+
+            def query(self, **kwargs):
+                requested.append(kwargs["n_results"])
+                return backing.query(
+                    query_embeddings=kwargs["query_embeddings"],
+                    n_results=kwargs["n_results"],
+                    where=kwargs["where"]
+                )
+
+        store = make_offline_store(RecordingCollection())
+        store.add_documents(
+            documents=["a" * n for n in range(1, 6)],
+            metadatas=[{"disease": "asthma"}] * 5,
+            ids=[f"doc-{n}" for n in range(1, 6)]
+        )
+
+        results = store.search("b", n_results=2, search_ef=4)
+        store.search("b", n_results=2)
+
+        assert len(results) == 2
+        assert requested == [4, 2]
+        assert VectorStore.hnsw_metadata()["hnsw:search_ef"] == settings.HNSW_SEARCH_EF
+
+
+class TestListDocuments:
+    """Test paginated, projection-aware document listing"""
+
+    def make_store(self, tmp_path, n=5):
+        store = make_offline_store(NumpyCollection(str(tmp_path)))
+        store.add_documents(
+            documents=[f"text {i}" for i in range(n)],
+            metadatas=[{"disease": "asthma"} for _ in range(n)],
+            ids=[f"doc-{i}" for i in range(n)]
+        )
+        return store
+
+    def test_cursor_walks_all_pages(self, tmp_path):
+        """Following next_cursor should visit every document exactly once"""
+        store = self.make_store(tmp_path)
+        seen, cursor = [], None
+        while True:
+            page = store.list_documents(limit=2, cursor=cursor, include='ids')
+            seen.extend(doc["id"] for doc in page["documents"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        assert sorted(seen) == [f"doc-{i}" for i in range(5)]
+
+    def test_projection_omits_unrequested_fields(self, tmp_path):
+        """metadata and ids projections should not return document text"""
+        store = self.make_store(tmp_path, n=1)
+
+        metadata_only = store.list_documents(include='metadata')["documents"][0]
+        ids_only = store.list_documents(include='ids')["documents"][0]
+
+        assert "content" not in metadata_only and metadata_only["metadata"]["disease"] == "asthma"
+        assert ids_only == {"id": "doc-0"}
+
+    def test_invalid_cursor_and_projection_rejected(self, tmp_path):
+        """Bad cursors and projections should raise ValueError"""
+        store = self.make_store(tmp_path, n=1)
+
+        with pytest.raises(ValueError):
+            store.list_documents(cursor="not-a-cursor")
+        with pytest.raises(ValueError):
+            store.list_documents(include='embeddings')
+
+
+class TestMetadataAggregates:
+    """Test incrementally maintained metadata counts"""
+
+    def test_counts_follow_add_delete_and_clear(self, tmp_path):
+        """Counts should match the store after every write without rescanning"""
+        kb = make_offline_kb(tmp_path)
+        kb.load_indexes()
+        asthma_id = kb.add_knowledge("Use a spacer.", "asthma", "treatment", GOVERNANCE_METADATA)
+        kb.add_knowledge("Stop smoking.", "copd", "lifestyle", GOVERNANCE_METADATA)
+
+        summary = kb.get_metadata_summary()
+        assert summary["diseases"] == {"asthma": 1, "copd": 1}
+        assert summary["sources"] == {"ada-2026-soc": 2}
+        assert kb.get_all_diseases() == ["asthma", "copd"]
+
+        generation = kb.get_aggregate_stats()["disease"]["generation"]
+        kb.delete_document(asthma_id)
+        assert kb.get_all_diseases() == ["copd"]
+        assert kb.count_documents() == 1
+        assert kb.get_aggregate_stats()["disease"]["generation"] > generation
+
+        kb.clear()
+        assert kb.get_all_diseases() == []
+        assert kb.count_documents() == 0
+
+    def test_lazy_rebuild_matches_existing_store(self, tmp_path):
+        """A fresh knowledge base over existing data should count it on first use"""
+        kb = make_offline_kb(tmp_path)
+        kb.add_knowledge("Check feet daily.", "diabetes_type2", "prevention", GOVERNANCE_METADATA)
+
+        reopened = KnowledgeBase()
+        reopened.vector_store = kb.vector_store
+
+        assert reopened.get_metadata_summary()["categories"] == {"prevention": 1}
+        assert reopened.count_documents("diabetes_type2") == 1
+
+
+class TestHybridSearch:
+    """Test lexical fast path and hybrid fusion in KnowledgeBase.search"""
+
+    def make_kb(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "SEARCH_MODE", "hybrid")
+        kb = make_offline_kb(tmp_path)
+        kb.add_knowledge("二甲双胍是一线降糖药物。", "diabetes_type2", "treatment", GOVERNANCE_METADATA)
+        kb.add_knowledge("Check HbA1c every three months.", "diabetes_type2", "diagnosis", GOVERNANCE_METADATA)
+        return kb
+
+    def test_known_term_skips_embedding(self, tmp_path, monkeypatch):
+        """A single indexed term is answered without embedding the query"""
+        kb = self.make_kb(tmp_path, monkeypatch)
+
+        results = kb.search("二甲双胍", n_results=2)
+
+        assert "二甲双胍" in results[0]["content"]
+        assert 0.0 < results[0]["distance"] <= 1.0
+        assert kb.vector_store.query_cache.stats()["misses"] == 0
+
+    def test_scattered_term_is_embedded(self, tmp_path, monkeypatch):
+        """A term whose bigrams occur only apart still goes through dense search"""
+        kb = self.make_kb(tmp_path, monkeypatch)
+
+        kb.add_knowledge("监测血糖，降糖药物按时服用。", "diabetes_type2", "treatment", GOVERNANCE_METADATA)
+
+        results = kb.search("血糖药", n_results=2)
+
+        assert kb.lexical_index.is_known_term("血糖药")
+
+        assert all("fusion_score" in result for result in results)
+        assert kb.vector_store.query_cache.stats()["misses"] == 1
+
+    def test_free_text_query_is_fused(self, tmp_path, monkeypatch):
+        """Other queries combine vector and lexical rankings"""
+        kb = self.make_kb(tmp_path, monkeypatch)
+
+        results = kb.search("how often to check hba1c", n_results=2)
+
+        assert results[0]["content"].startswith("Check HbA1c")
+        assert all("fusion_score" in result for result in results)
+        assert kb.vector_store.query_cache.stats()["misses"] == 1
+
+
+class TestMetadataPrefilter:
+    """Test metadata pre-filtering and multi-disease filters"""
+
+    def test_first_searches_build_index_once(self, tmp_path, monkeypatch):
+        """Concurrent first uses should share one rebuild"""
+        kb = make_offline_kb(tmp_path)
+        kb.add_knowledge("Care plan for asthma.", "asthma", "treatment", GOVERNANCE_METADATA)
+        reads = []
+        get_all_metadata = kb.vector_store.get_all_metadata
+
+        def slow_read(*args, **kwargs):
+            reads.append(1)
+            time.sleep(0.05)
+            return get_all_metadata(*args, **kwargs)
+
+        monkeypatch.setattr(kb.vector_store, "get_all_metadata", slow_read)
+        threads = [threading.Thread(target=kb._ensure_metadata_index) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(reads) == 1
+        assert kb.metadata_index.candidates({"disease": "asthma"}) is not None
+
+    def test_write_during_index_build_is_indexed(self, tmp_path, monkeypatch):
+        """A document stored while an index is being built must end up in it"""
+        kb = make_offline_kb(tmp_path)
+        kb.add_knowledge("Care plan for asthma.", "asthma", "treatment", GOVERNANCE_METADATA)
+        reading, resume = threading.Event(), threading.Event()
+        get_all_metadata = kb.vector_store.get_all_metadata
+
+        def paused_read(*args, **kwargs):
+            records = get_all_metadata(*args, **kwargs)
+            reading.set()
+            resume.wait(5)
+            return records
+
+        monkeypatch.setattr(kb.vector_store, "get_all_metadata", paused_read)
+        build = threading.Thread(target=kb._ensure_metadata_index)
+        build.start()
+        reading.wait(5)
+        added = []
+        write = threading.Thread(target=lambda: added.append(kb.add_knowledge(
+            "Care plan for copd.", "copd", "treatment", GOVERNANCE_METADATA
+        )))
+        write.start()
+        write.join(0.2)
+        resume.set()
+        build.join(5)
+        write.join(5)
+
+        assert kb.metadata_index.candidates({"disease": "copd"}) == set(added)
+
+    def test_disease_list_is_or_filter(self, tmp_path):
+        """A list of diseases matches any of them and nothing else"""
+        kb = make_offline_kb(tmp_path)
+        for disease in ("asthma", "copd", "hypertension"):
+            kb.add_knowledge(f"Care plan for {disease}.", disease, "treatment", GOVERNANCE_METADATA)
+
+        results = kb.search("care plan", disease_filter=["asthma", "copd"], n_results=5)
+
+        assert {r["metadata"]["disease"] for r in results} == {"asthma", "copd"}
+        assert kb.get_prefilter_stats()["last_selectivity"] == pytest.approx(2 / 3)
+
+    def test_selective_filter_narrows_and_empty_skips_embedding(self, tmp_path):
+        """Selective filters are answered from the index; empty ones never embed"""
+        kb = make_offline_kb(tmp_path)
+        for disease in ("asthma", "copd", "hypertension"):
+            kb.add_knowledge(f"Care plan for {disease}.", disease, "treatment", GOVERNANCE_METADATA)
+
+        results = kb.search("care plan", disease_filter="copd", category_filter="treatment")
+        assert [r["metadata"]["disease"] for r in results] == ["copd"]
+        assert kb.get_prefilter_stats()["last_selectivity"] == pytest.approx(1 / 3)
+
+        assert kb.search("care plan", disease_filter="arthritis_osteo") == []
+        assert kb.vector_store.query_cache.stats()["misses"] == 1
+
+
+class TestSearchResultCache:
+    """Test the generation-tagged search result cache"""
+
+    def test_repeated_search_is_served_from_cache(self, tmp_path):
+        """Equivalent queries should hit the cache without touching the store"""
+        kb = make_offline_kb(tmp_path)
+        kb.add_knowledge("Use a peak flow meter.", "asthma", "diagnosis", GOVERNANCE_METADATA)
+
+        first = kb.search("Peak flow", disease_filter="asthma")
+        kb.vector_store.search_many = None  # any store access would now fail
+        second = kb.search("  peak   FLOW ", disease_filter="asthma")
+
+        assert second == first
+        assert kb.get_search_cache_stats()["hits"] == 1
+
+    def test_writes_invalidate_cached_results(self, tmp_path):
+        """Results cached before a write should not be served after it"""
+        kb = make_offline_kb(tmp_path)
+        kb.add_knowledge("Use a peak flow meter.", "asthma", "diagnosis", GOVERNANCE_METADATA)
+        assert len(kb.search("peak flow", disease_filter="asthma")) == 1
+
+        doc_id = kb.add_knowledge("Avoid smoke and cold air.", "asthma", "prevention", GOVERNANCE_METADATA)
+        assert len(kb.search("peak flow", disease_filter="asthma")) == 2
+
+        kb.delete_document(doc_id)
+        assert len(kb.search("peak flow", disease_filter="asthma")) == 1
+        assert kb.get_search_cache_stats()["stale"] == 2
+
+    def test_search_during_write_is_not_cached_as_current(self, tmp_path, monkeypatch):
+        """A search that sees the store updated but the indexes not yet must not outlive the write"""
+        kb = make_offline_kb(tmp_path)
+        for i in range(3):
+            kb.add_knowledge(f"Asthma note {i}.", "asthma", "diagnosis", GOVERNANCE_METADATA)
+        assert kb.search("exercise", disease_filter="copd") == []
+
+        index_add = kb.metadata_index.add
+        during_write = []
+
+        def add_after_search(vector_id, metadata):
+            # The vector is stored, but the metadata index does not list it yet
+            during_write.append(kb.search("exercise", disease_filter="copd"))
+            index_add(vector_id, metadata)
+
+        monkeypatch.setattr(kb.metadata_index, "add", add_after_search)
+        doc_id = kb.add_knowledge("Exercise helps COPD.", "copd", "lifestyle", GOVERNANCE_METADATA)
+
+        assert during_write == [[]]
+        assert [result["id"] for result in kb.search("exercise", disease_filter="copd")] == [doc_id]
+
+    def test_lru_eviction_bounds_entries(self):
+        """The least recently used entry should be evicted at capacity"""
+        cache = SearchResultCache(max_entries=2)
+        for query in ("a", "b", "c"):
+            cache.put(SearchResultCache.key(query), 0, [])
+
+        assert cache.get(SearchResultCache.key("a"), 0) is None
+        assert cache.get(SearchResultCache.key("c"), 0) == []
+        assert cache.stats()["entries"] == 2
+
+
+class TestIngestionPipeline:
+    """Test the chunk → embed → persist ingestion pipeline"""
+
+    def documents(self, count):
+        return [
+            {
+                "content": f"Document {i}. " + "Asthma control needs regular review. " * (i + 1),
+                "disease": "asthma",
+                "category": "treatment",
+                "metadata": GOVERNANCE_METADATA,
+            }
+            for i in range(count)
+        ]
+
+    def test_reports_result_per_document(self, tmp_path):
+        """Added, duplicate and failed documents should each be reported"""
+        kb = make_offline_kb(tmp_path)
+        documents = self.documents(4)
+        existing_id = kb.add_knowledge(**documents[0])
+        documents.append({**documents[1], "metadata": {}})
+
+        report = IngestionPipeline(kb, chunk_workers=2, queue_size=2).run(documents)
+        statuses = [result["status"] for result in report["results"]]
+
+        assert statuses == ["duplicate", "added", "added", "added", "failed"]
+        assert report["results"][0]["doc_id"] == existing_id
+        assert "governance" in report["results"][4]["error"]
+        assert report["stages"]["persist"]["items"] == 3
+        assert kb.get_document(report["results"][3]["doc_id"]) is not None
+
+    def test_slow_stage_applies_backpressure(self, tmp_path, monkeypatch):
+        """A slow persist stage should bound every queue instead of buffering input"""
+        kb = make_offline_kb(tmp_path)
+        persist = kb.persist_knowledge
+
+        def slow_persist(prepared, embeddings=None):
+            time.sleep(0.01)
+            return persist(prepared, embeddings)
+
+        monkeypatch.setattr(kb, "persist_knowledge", slow_persist)
+        report = IngestionPipeline(kb, queue_size=2, embed_batch_size=1).run(self.documents(12))
+
+        assert report["added"] == 12
+        assert all(stage["max_queue_depth"] <= 2 for stage in report["stages"].values())
+
+    def test_consumer_can_stop_early(self, tmp_path):
+        """Closing the result stream should stop the pipeline without hanging"""
+        kb = make_offline_kb(tmp_path)
+        results = IngestionPipeline(kb, queue_size=1).ingest(self.documents(20))
+
+        first = next(results)
+        results.close()
+
+        assert first["status"] == "added"
+
+    def test_close_while_input_is_blocked(self, tmp_path):
+        """Closing the result stream should not wait for a stalled input iterator"""
+        kb = make_offline_kb(tmp_path)
+        release = threading.Event()
+
+        def stalled_input():
+            yield self.documents(1)[0]
+            release.wait(10)
+            yield from self.documents(3)[1:]
+
+        results = IngestionPipeline(kb).ingest(stalled_input())
+        first = next(results)
+        started = time.perf_counter()
+        results.close()
+        elapsed = time.perf_counter() - started
+        release.set()
+
+        assert first["status"] == "added"
+        assert elapsed < 2
+
+    def test_in_flight_duplicates_are_stored_once(self, tmp_path):
+        """The same document twice in one run should be stored once"""
+        kb = make_offline_kb(tmp_path)
+        documents = self.documents(1) * 2
+
+        report = IngestionPipeline(kb, chunk_workers=2).run(documents)
+
+        assert sorted(result["status"] for result in report["results"]) == ["added", "duplicate"]
+        assert len({result["doc_id"] for result in report["results"]}) == 1
+        assert kb.count_documents() == 1
+
+    def test_failed_persist_releases_reservation(self, tmp_path, monkeypatch):
+        """A document whose write failed should be accepted when resubmitted"""
+        kb = make_offline_kb(tmp_path)
+        add_documents = kb.vector_store.add_documents
+        writer_threads = []
+
+        def failing_add(*args, **kwargs):
+            writer_threads.append(threading.current_thread().name)
+            raise RuntimeError("disk full")
+
+        monkeypatch.setattr(kb.vector_store, "add_documents", failing_add)
+        failed = IngestionPipeline(kb).run(self.documents(1))
+        monkeypatch.setattr(kb.vector_store, "add_documents", add_documents)
+        retried = IngestionPipeline(kb).run(self.documents(1))
+
+        assert failed["failed"] == 1
+        assert writer_threads[0].startswith("kb-write")
+        assert retried["added"] == 1
+        assert kb.get_dedup_stats()["reserved_documents"] == 0
+        kb.vector_store.close()
+
+
+class TestAsyncInterface:
+    """Test async wrappers running on the bounded read/write pools"""
+
+    async def test_async_methods_run_off_the_event_loop(self, tmp_path):
+        """Writes go to the write pool and reads to the read pool"""
+        kb = make_offline_kb(tmp_path)
+        threads = {}
+        original_add, original_search = kb.add_knowledge, kb.search
+
+        def add_knowledge(*args, **kwargs):
+            threads["write"] = threading.current_thread().name
+            return original_add(*args, **kwargs)
+
+        def search(*args, **kwargs):
+            threads["read"] = threading.current_thread().name
+            return original_search(*args, **kwargs)
+
+        kb.add_knowledge, kb.search = add_knowledge, search
+        doc_id = await kb.aadd_knowledge("Use a peak flow meter.", "asthma", "diagnosis", GOVERNANCE_METADATA)
+        results = await kb.asearch("peak flow", disease_filter="asthma")
+
+        assert results[0]["id"] == doc_id
+        assert (await kb.aget_document(doc_id))["content"] == "Use a peak flow meter."
+        assert threads["write"].startswith("kb-write")
+        assert threads["read"].startswith("kb-read")
+        assert await kb.adelete_document(doc_id) is True
+        kb.vector_store.close()
+
+
 class TestSampleData:
     """Test sample data loading"""
     
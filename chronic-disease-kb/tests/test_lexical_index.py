@@ -0,0 +1,100 @@
+"""
+Tests for the BM25 lexical index
+"""
+
+from kb.lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+
+
+class TestTokenize:
+    """Test CJK-aware tokenization"""
+
+    def test_chinese_bigrams_and_latin_words(self):
+        """Chinese runs become bigrams; Latin words are case-folded"""
+        assert tokenize("二甲双胍 HbA1c") == ["二甲", "甲双", "双胍", "hba1c"]
+
+    def test_mixed_script_runs_split(self):
+        """Latin words and digits directly followed by Chinese are separate terms"""
+        assert tokenize("SGLT2抑制剂") == ["sglt2", "抑制", "制剂"]
+        assert tokenize("2型糖尿病患者") == ["2", "型糖", "糖尿", "尿病", "病患", "患者"]
+        assert tokenize("HbA1c控制目标") == ["hba1c", "控制", "制目", "目标"]
+
+    def test_single_chinese_character_kept(self):
+        """A lone Chinese character is indexed as itself"""
+        assert tokenize("糖") == ["糖"]
+
+
+class TestLexicalIndex:
+    """Test BM25 indexing and search"""
+
+    def make_index(self):
+        index = LexicalIndex()
+        index.rebuild([
+            {"id": "a", "content": "二甲双胍是2型糖尿病的一线药物", "metadata": {"disease": "diabetes_type2"}},
+            {"id": "b", "content": "Monitor HbA1c every three months", "metadata": {"disease": "diabetes_type2"}},
+            {"id": "c", "content": "Inhaled corticosteroids control asthma", "metadata": {"disease": "asthma"}},
+        ])
+        return index
+
+    def test_exact_term_ranks_first(self):
+        """A chunk containing the query term should rank first"""
+        index = self.make_index()
+
+        assert index.search("二甲双胍")[0][0] == "a"
+        assert index.search("hba1c")[0][0] == "b"
+
+    def test_mixed_script_search(self):
+        """Chinese words written next to Latin abbreviations are searchable"""
+        index = LexicalIndex()
+        index.rebuild([
+            {"id": "a", "content": "SGLT2抑制剂可降低心衰住院风险", "metadata": {}},
+            {"id": "b", "content": "COPD患者应接种流感疫苗", "metadata": {}},
+        ])
+
+        assert index.search("抑制剂")[0][0] == "a"
+        assert index.search("sglt2")[0][0] == "a"
+        assert index.search("患者")[0][0] == "b"
+
+    def test_filter_and_remove(self):
+        """Filters restrict hits and removed chunks stop matching"""
+        index = self.make_index()
+
+        assert index.search("control asthma", filter_dict={"disease": "diabetes_type2"}) == []
+        index.remove("c")
+        assert index.search("asthma") == []
+        assert index.stats()["documents"] == 2
+
+    def test_known_term(self):
+        """Only single indexed terms qualify for the lexical fast path"""
+        index = self.make_index()
+
+        assert index.is_known_term("HbA1c")
+        assert not index.is_known_term("HbA1c target")
+        assert not index.is_known_term("胰岛素")
+
+    def test_known_term_needs_one_chunk_with_every_term(self):
+        """Bigrams scattered over several chunks do not make a known term"""
+        index = LexicalIndex()
+        index.rebuild([
+            {"id": "a", "content": "患者应该每天监测血压", "metadata": {}},
+            {"id": "b", "content": "饮食控制对血糖很重要", "metadata": {}},
+        ])
+
+        assert index.is_known_term("监测血压")
+        assert not index.is_known_term("饮食控制对血压")
+        assert not index.is_known_term("患者应该每天监测血压饮食")
+
+    def test_contains_term(self):
+        """Terms must appear as one run, after width and case folding"""
+        assert LexicalIndex.contains_term("Check ＨｂＡ１ｃ often", "hba1c")
+        assert not LexicalIndex.contains_term("监测血糖，控制血压", "监测血压")
+
+
+class TestReciprocalRankFusion:
+    """Test rank fusion"""
+
+    def test_items_in_both_rankings_win(self):
+        """An id ranked by both lists should beat ids ranked by one"""
+        fused = reciprocal_rank_fusion([["x", "y"], ["z", "y"]])
+
+        assert fused[0][0] == "y"
+        assert [doc_id for doc_id, _ in fused] == ["y", "x", "z"]
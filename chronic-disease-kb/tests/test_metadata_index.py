@@ -0,0 +1,47 @@
+"""
+Tests for the metadata posting-list index
+"""
+
+from kb.metadata_index import MetadataIndex
+
+
+def make_index():
+    index = MetadataIndex()
+    index.rebuild([
+        {"id": "a", "metadata": {"disease": "asthma", "category": "treatment"}},
+        {"id": "b", "metadata": {"disease": "asthma", "category": "symptoms"}},
+        {"id": "c", "metadata": {"disease": "copd", "category": "treatment"}},
+        {"id": "d", "metadata": {"disease": "hypertension", "category": "treatment"}},
+    ])
+    return index
+
+
+class TestMetadataIndex:
+    """Test candidate narrowing and selectivity reporting"""
+
+    def test_in_and_and_filters(self):
+        """$in is a union and $and an intersection of posting lists"""
+        index = make_index()
+
+        assert index.candidates({"disease": {"$in": ["asthma", "copd"]}}) == {"a", "b", "c"}
+        assert index.candidates({"$and": [
+            {"disease": {"$in": ["asthma", "copd"]}},
+            {"category": "treatment"}
+        ]}) == {"a", "c"}
+        assert index.stats()["last_selectivity"] == 0.5
+
+    def test_unindexed_filter_falls_back(self):
+        """Filters on other fields or operators are left to the store"""
+        index = make_index()
+
+        assert index.candidates({"doc_id": "a"}) is None
+        assert index.candidates({"disease": {"$ne": "asthma"}}) is None
+        assert index.stats()["filtered_lookups"] == 0
+
+    def test_remove_updates_postings(self):
+        """Removed vectors no longer match"""
+        index = make_index()
+        index.remove("a", {"disease": "asthma", "category": "treatment"})
+
+        assert index.candidates({"disease": "asthma"}) == {"b"}
+        assert len(index) == 3
@@ -0,0 +1,152 @@
+"""
+Unit tests for the NumPy exact-search collection
+"""
+
+import numpy as np
+import pytest
+
+from kb.numpy_store import NumpyCollection
+
+
+@pytest.fixture
+def collection(tmp_path):
+    """Collection with three documents on two diseases"""
+    collection = NumpyCollection(str(tmp_path))
+    collection.add(
+        embeddings=[[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.7, 0.7, 0.0]],
+        documents=["diabetes symptoms", "asthma triggers", "diabetes diet"],
+        metadatas=[
+            {"disease": "diabetes_type2", "category": "symptoms"},
+            {"disease": "asthma", "category": "lifestyle"},
+            {"disease": "diabetes_type2", "category": "lifestyle"},
+        ],
+        ids=["d1", "a1", "d2"]
+    )
+    return collection
+
+
+class TestNumpyCollection:
+    """Test NumPy backend behaves like the Chroma collection subset we use"""
+
+    def test_query_returns_nearest_first(self, collection):
+        """Top-k results should be ordered by cosine distance"""
+        results = collection.query(query_embeddings=[[1.0, 0.1, 0.0]], n_results=2)
+
+        assert results["ids"] == [["d1", "d2"]]
+        assert results["documents"][0][0] == "diabetes symptoms"
+        assert results["distances"][0][0] < results["distances"][0][1]
+
+    def test_where_filters(self, collection):
+        """Equality, $and and $in filters should narrow the candidates"""
+        by_disease = collection.query(
+            query_embeddings=[[1.0, 0.0, 0.0]],
+            n_results=5,
+            where={"disease": "asthma"}
+        )
+        assert by_disease["ids"] == [["a1"]]
+
+        combined = collection.get(where={"$and": [
+            {"disease": "diabetes_type2"},
+            {"category": {"$in": ["lifestyle", "treatment"]}},
+        ]})
+        assert combined["ids"] == ["d2"]
+        assert collection.count(where={"disease": "diabetes_type2"}) == 2
+
+    def test_update_and_delete(self, collection):
+        """Updates merge metadata; deletes remove records from results"""
+        collection.update(ids=["d1"], metadatas=[{"category": "diagnosis"}])
+        assert collection.get(ids=["d1"])["metadatas"][0] == {
+            "disease": "diabetes_type2",
+            "category": "diagnosis",
+        }
+
+        collection.delete(ids=["d1"])
+        results = collection.query(query_embeddings=[[1.0, 0.0, 0.0]], n_results=5)
+        assert "d1" not in results["ids"][0]
+        assert collection.count() == 2
+
+    def test_reopen_reads_persisted_state(self, collection, tmp_path):
+        """A new instance should see the same records via the memory-mapped matrix"""
+        collection.delete(ids=["a1"])
+        reopened = NumpyCollection(str(tmp_path))
+
+        assert reopened.count() == 2
+        assert sorted(reopened.get()["ids"]) == ["d1", "d2"]
+        results = reopened.query(query_embeddings=[[0.0, 1.0, 0.0]], n_results=1)
+        assert results["ids"] == [["d2"]]
+
+    def test_deferred_maintenance_and_compaction(self, tmp_path):
+        """Compaction should run once the deferred block exits"""
+        collection = NumpyCollection(str(tmp_path))
+        with collection.deferred_index_maintenance():
+            collection.add(
+                embeddings=np.eye(4).tolist(),
+                documents=["a", "b", "c", "d"],
+                metadatas=[{}, {}, {}, {}],
+                ids=["1", "2", "3", "4"]
+            )
+            collection.delete(ids=["1", "2"])
+            assert collection._count == 4
+
+        assert collection._count == 2
+        assert sorted(collection.get()["ids"]) == ["3", "4"]
+        assert collection.get(ids=["4"], include=["embeddings"])["embeddings"][0][3] == 1.0
+
+
+class TestQuantizedCollection:
+    """Test int8/float16 first-pass scoring with full-precision rescoring"""
+
+    @pytest.mark.parametrize("quantization", ["int8", "float16"])
+    def test_quantized_search_matches_exact(self, tmp_path, quantization):
+        """Rescored results should match exact search on a random corpus"""
+        rng = np.random.default_rng(7)
+        vectors = rng.normal(size=(500, 32))
+        ids = [f"doc-{i}" for i in range(500)]
+
+        exact = NumpyCollection(str(tmp_path / "exact"))
+        quantized = NumpyCollection(str(tmp_path / "quantized"), quantization=quantization)
+        for collection in (exact, quantized):
+            collection.add(embeddings=vectors.tolist(), documents=ids, metadatas=[{}] * 500, ids=ids)
+
+        query = rng.normal(size=(1, 32)).tolist()
+        assert (
+            quantized.query(query_embeddings=query, n_results=10)["ids"]
+            == exact.query(query_embeddings=query, n_results=10)["ids"]
+        )
+
+        report = quantized.recall_report(k=10, sample_size=50)
+        assert report["queries"] == 50
+        assert report["recall_at_k"] >= 0.95
+
+    def test_int8_is_four_times_smaller(self, tmp_path):
+        """Resident int8 scoring data should be about a quarter of float32"""
+        collection = NumpyCollection(str(tmp_path), quantization="int8")
+        collection.add(
+            embeddings=np.random.default_rng(0).normal(size=(100, 384)).tolist(),
+            metadatas=[{}] * 100,
+            ids=[str(i) for i in range(100)]
+        )
+
+        footprint = collection.memory_footprint()
+        assert footprint["full_precision_bytes"] / footprint["resident_bytes"] > 3.9
+        assert footprint["full_precision_used_bytes"] / footprint["resident_used_bytes"] > 3.9
+
+    def test_footprint_counts_allocated_capacity(self, tmp_path):
+        """Resident bytes should include preallocated rows, used bytes only written ones"""
+        collection = NumpyCollection(str(tmp_path), quantization="int8")
+        collection.add(
+            embeddings=np.random.default_rng(0).normal(size=(10, 8)).tolist(),
+            metadatas=[{}] * 10,
+            ids=[str(i) for i in range(10)]
+        )
+
+        footprint = collection.memory_footprint()
+        capacity = NumpyCollection.INITIAL_CAPACITY
+        assert footprint["resident_bytes"] == capacity * 8 + capacity * 4
+        assert footprint["resident_used_bytes"] == 10 * 8 + 10 * 4
+        assert footprint["full_precision_bytes"] == capacity * 8 * 4
+
+    def test_unknown_quantization_rejected(self, tmp_path):
+        """Unsupported modes should fail fast"""
+        with pytest.raises(ValueError, match="Unknown quantization"):
+            NumpyCollection(str(tmp_path), quantization="int4")
@@ -0,0 +1,167 @@
+"""
+Tests for the sharded collection
+"""
+
+import os
+import shutil
+import threading
+
+import numpy as np
+import pytest
+
+from kb.numpy_store import NumpyCollection
+from kb.sharding import ShardedCollection
+
+
+def make_sharded(tmp_path, mode="disease", rename=None):
+    def rename_shard(collection, name, new_name):
+        os.replace(tmp_path / name, tmp_path / new_name)
+        return NumpyCollection(str(tmp_path), name=new_name)
+
+    return ShardedCollection(
+        base_name="kb",
+        mode=mode,
+        open_shard=lambda name: NumpyCollection(str(tmp_path), name=name),
+        drop_shard=lambda name: shutil.rmtree(tmp_path / name, ignore_errors=True),
+        existing_shards=os.listdir(tmp_path) if tmp_path.exists() else (),
+        shard_count=4,
+        rename_shard=rename or rename_shard
+    )
+
+
+def add_records(collection):
+    collection.add(
+        embeddings=[[1.0, 0.0], [0.9, 0.1], [0.0, 1.0], [0.7, 0.7]],
+        documents=["a1", "a2", "c1", "h1"],
+        metadatas=[
+            {"disease": "asthma"}, {"disease": "asthma"},
+            {"disease": "copd"}, {"disease": "高血压"}
+        ],
+        ids=["a1", "a2", "c1", "h1"]
+    )
+
+
+class TestShardedCollection:
+    """Test routing, scatter-gather search and shard maintenance"""
+
+    def test_disease_shards_and_filtered_search(self, tmp_path):
+        """Each disease gets a shard; filtered search only returns that disease"""
+        collection = make_sharded(tmp_path)
+        add_records(collection)
+
+        assert len(collection.shard_names()) == 3
+        results = collection.query([[0.0, 1.0]], n_results=2, where={"disease": "asthma"})
+        assert results["ids"][0] == ["a2", "a1"]
+
+    def test_unfiltered_search_merges_shards(self, tmp_path):
+        """Top-k across shards should equal top-k over all records"""
+        for mode in ("disease", "hash"):
+            collection = make_sharded(tmp_path / mode, mode=mode)
+            add_records(collection)
+
+            results = collection.query([[1.0, 0.0]], n_results=3)
+
+            assert results["ids"][0] == ["a1", "a2", "h1"]
+            assert results["distances"][0] == sorted(results["distances"][0])
+
+    def test_get_pages_across_shards(self, tmp_path):
+        """Offset and limit apply across shard boundaries"""
+        collection = make_sharded(tmp_path)
+        add_records(collection)
+
+        pages = [collection.get(limit=3, offset=offset)["ids"] for offset in (0, 3)]
+
+        assert len(pages[0]) == 3 and len(pages[1]) == 1
+        assert sorted(pages[0] + pages[1]) == ["a1", "a2", "c1", "h1"]
+
+    def test_update_moves_vector_to_new_disease_shard(self, tmp_path):
+        """Changing a vector's disease reroutes it to that disease's shard"""
+        collection = make_sharded(tmp_path)
+        add_records(collection)
+
+        collection.update(ids=["c1"], metadatas=[{"disease": "asthma"}])
+
+        assert collection.count() == 4
+        results = collection.query([[0.0, 1.0]], n_results=1, where={"disease": "asthma"})
+        assert results["ids"][0] == ["c1"]
+
+    def test_rebuild_and_delete_touch_one_shard(self, tmp_path):
+        """Rebuilding a shard keeps its records; deletes find the right shard"""
+        collection = make_sharded(tmp_path)
+        add_records(collection)
+        asthma = collection.shard_name_for_disease("asthma")
+
+        assert collection.rebuild_shard(asthma) == 2
+        collection.delete(ids=["a1", "h1"])
+
+        assert collection.shard_stats()[asthma] == 1
+        assert collection.count() == 2
+        np.testing.assert_allclose(
+            collection.get(ids=["a2"], include=["embeddings"])["embeddings"][0],
+            [0.9, 0.1] / np.linalg.norm([0.9, 0.1]),
+            rtol=1e-5
+        )
+
+    def test_rebuild_blocks_writes_to_the_shard(self, tmp_path):
+        """A write routed to a shard mid-rebuild should wait and land in the rebuilt shard"""
+        collection = make_sharded(tmp_path)
+        add_records(collection)
+        asthma = collection.shard_name_for_disease("asthma")
+        shard = collection._shard(asthma)
+        copying, resume = threading.Event(), threading.Event()
+        get = shard.get
+
+        def slow_get(**kwargs):
+            copying.set()
+            resume.wait(5)
+            return get(**kwargs)
+
+        shard.get = slow_get
+        rebuild = threading.Thread(target=collection.rebuild_shard, args=(asthma,))
+        rebuild.start()
+        copying.wait(5)
+        write = threading.Thread(target=collection.add, kwargs=dict(
+            embeddings=[[0.5, 0.5]], documents=["a3"], metadatas=[{"disease": "asthma"}], ids=["a3"]
+        ))
+        write.start()
+        write.join(0.2)
+        assert write.is_alive()
+
+        resume.set()
+        rebuild.join(5)
+        write.join(5)
+
+        assert sorted(collection.get(where={"disease": "asthma"})["ids"]) == ["a1", "a2", "a3"]
+
+    def test_interrupted_rebuild_is_recovered(self, tmp_path):
+        """A crash between the name swaps should restore the original shard on reopen"""
+        calls = []
+
+        def crash_on_second_rename(collection, name, new_name):
+            calls.append(new_name)
+            if len(calls) == 2:
+                raise RuntimeError("crash")
+            os.replace(tmp_path / name, tmp_path / new_name)
+            return NumpyCollection(str(tmp_path), name=new_name)
+
+        collection = make_sharded(tmp_path, rename=crash_on_second_rename)
+        add_records(collection)
+        asthma = collection.shard_name_for_disease("asthma")
+        with pytest.raises(RuntimeError):
+            collection.rebuild_shard(asthma)
+
+        reopened = make_sharded(tmp_path)
+
+        assert sorted(reopened.shard_names()) == sorted(collection.shard_names())
+        assert sorted(reopened.get(where={"disease": "asthma"})["ids"]) == ["a1", "a2"]
+        assert not any(name.endswith(("-rebuild", "-retired")) for name in os.listdir(tmp_path))
+
+    def test_query_scores_only_candidate_ids(self, tmp_path):
+        """Prefiltered candidate ids should restrict every shard's search"""
+        for mode in ("disease", "hash"):
+            collection = make_sharded(tmp_path / mode, mode=mode)
+            add_records(collection)
+
+            results = collection.query([[1.0, 0.0]], n_results=3, ids=["a2", "c1"])
+
+            assert results["ids"][0] == ["a2", "c1"]
@@ -0,0 +1,61 @@
+"""
+Tests for vector index snapshots
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from kb.numpy_store import NumpyCollection
+from kb.snapshot import SnapshotError, create_snapshot, restore_snapshot, verify_snapshot
+
+
+def make_source(tmp_path):
+    collection = NumpyCollection(str(tmp_path / "source"))
+    collection.add(
+        embeddings=[[1.0, 0.0], [0.0, 1.0], [0.6, 0.8]],
+        documents=["a", "b", "c"],
+        metadatas=[{"disease": "asthma"}, {"disease": "copd"}, {"disease": "asthma"}],
+        ids=["a", "b", "c"]
+    )
+    collection.delete(ids=["b"])
+    return collection
+
+
+class TestSnapshot:
+    """Test snapshot creation, verification and restore"""
+
+    def test_round_trip(self, tmp_path):
+        """A restored snapshot answers queries like the source collection"""
+        source = make_source(tmp_path)
+        snapshot_path = str(tmp_path / "snapshot")
+
+        manifest = create_snapshot(source, snapshot_path, embedding_model="test-model", page_size=1)
+        assert manifest["count"] == 2 and manifest["dimension"] == 2
+        assert verify_snapshot(snapshot_path)["version"] == manifest["version"]
+
+        restore_snapshot(snapshot_path, str(tmp_path / "restored" / "kb"), embedding_model="test-model")
+        restored = NumpyCollection(str(tmp_path / "restored"), name="kb")
+
+        assert restored.count() == 2
+        result = restored.query([[0.6, 0.8]], n_results=1, where={"disease": "asthma"})
+        assert result["ids"][0] == ["c"]
+        np.testing.assert_allclose(result["distances"][0], [0.0], atol=1e-6)
+
+    def test_corruption_and_model_mismatch_detected(self, tmp_path):
+        """Checksum mismatches and a different embedding model are rejected"""
+        snapshot_path = str(tmp_path / "snapshot")
+        manifest = create_snapshot(make_source(tmp_path), snapshot_path, embedding_model="test-model")
+
+        with pytest.raises(SnapshotError, match="built with"):
+            restore_snapshot(snapshot_path, str(tmp_path / "restored"), embedding_model="other-model")
+
+        vectors = os.path.join(snapshot_path, NumpyCollection.MATRIX_FILENAME)
+        with open(vectors, "r+b") as f:
+            f.seek(-4, os.SEEK_END)
+            f.write(b"\x00\x00\x80\x7f")
+        assert os.path.getsize(vectors) == manifest["files"][NumpyCollection.MATRIX_FILENAME]["bytes"]
+
+        with pytest.raises(SnapshotError, match="checksum"):
+            verify_snapshot(snapshot_path)
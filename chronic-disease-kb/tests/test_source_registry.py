@@ -0,0 +1,127 @@
+"""
+Tests for the source registry index and hot reload
+"""
+
+import os
+from datetime import date, datetime
+
+import pytest
+
+from config import settings
+from kb.knowledge_base import KnowledgeBase
+from kb.source_registry import SourceRegistry
+from models.disease import DiseaseCategory, DiseaseKnowledge
+
+REGISTRY = """
+version: "1.0.0"
+sources:
+  - source_id: "ada-2026-soc"
+    evidence_level: "GRADE_HIGH"
+    disease_scopes:
+      - "diabetes_type1"
+      - "diabetes_type2"
+    review_due_date: "2026-12-31"
+  - source_id: "guideline-consensus-global"
+    evidence_level: "GUIDELINE_CONSENSUS"
+disease_source_priority:
+  diabetes_type2:
+    - "ada-2026-soc"
+"""
+
+
+def write_registry(path, text, mtime_ns):
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+class TestSourceRegistry:
+    """Test parsing, lookups and reload"""
+
+    def test_index_lookups(self, tmp_path):
+        """The index should answer scope, evidence and default-source lookups"""
+        path = tmp_path / "source_registry.yaml"
+        write_registry(path, REGISTRY, 1_000_000_000)
+        index = SourceRegistry(path).index()
+
+        assert "ada-2026-soc" in index
+        assert index.covers("ada-2026-soc", "diabetes_type1")
+        assert not index.covers("ada-2026-soc", "asthma")
+        # Sources without disease_scopes apply to any disease
+        assert index.covers("guideline-consensus-global", "asthma")
+        assert index.default_evidence_level("ada-2026-soc") == "GRADE_HIGH"
+        assert index.default_source("diabetes_type1") == "ada-2026-soc"
+        assert index.default_source("asthma") is None
+        assert index.overdue("ada-2026-soc", today=date(2027, 1, 1))
+
+    def test_reloads_when_mtime_changes(self, tmp_path):
+        """An edited registry should be picked up; a broken edit should keep the last good one"""
+        path = tmp_path / "source_registry.yaml"
+        write_registry(path, REGISTRY, 1_000_000_000)
+        registry = SourceRegistry(path)
+        first = registry.index()
+        assert registry.index() is first
+
+        write_registry(path, REGISTRY.replace("ada-2026-soc", "ada-2027-soc"), 2_000_000_000)
+        second = registry.index()
+        assert "ada-2027-soc" in second
+        assert "ada-2026-soc" not in second
+
+        write_registry(path, "sources: [unclosed", 3_000_000_000)
+        assert registry.index() is second
+        assert registry.stats()["reloads"] == 2
+
+    @pytest.mark.parametrize("text", [
+        'sources: ["a-1"]',
+        'sources: {a: 1}',
+        'sources:\n  - source_id: "a-1"\n    disease_scopes: 5',
+        'sources:\n  - source_id: "a-1"\ndisease_source_priority: ["a-1"]',
+        '- "a-1"',
+    ])
+    def test_wrongly_shaped_edit_keeps_previous_index(self, tmp_path, text):
+        """Valid YAML with the wrong structure should be rejected like a parse error"""
+        path = tmp_path / "source_registry.yaml"
+        write_registry(path, REGISTRY, 1_000_000_000)
+        registry = SourceRegistry(path)
+        first = registry.index()
+
+        write_registry(path, text, 2_000_000_000)
+
+        assert registry.index() is first
+        with pytest.raises(ValueError, match="Invalid source registry"):
+            SourceRegistry(path).index()
+
+
+class TestRegistryGovernance:
+    """Test governance validation and defaults from the registry"""
+
+    def test_scope_enforced_only_when_enabled(self, monkeypatch):
+        """A source registered for other diseases should be rejected only when scope is enforced"""
+        kb = KnowledgeBase()
+        metadata = {
+            "source_id": "ada-2026-soc",
+            "document_version": "2026.1",
+            "evidence_level": "GRADE_LOW",
+        }
+
+        kb._validate_governance_metadata(dict(metadata), "diabetes_test")
+
+        monkeypatch.setattr(settings, "ENFORCE_SOURCE_SCOPE", True)
+        kb._validate_governance_metadata(dict(metadata), "diabetes_type2")
+        with pytest.raises(ValueError, match="not registered for disease"):
+            kb._validate_governance_metadata(dict(metadata), "diabetes_test")
+
+    def test_disease_knowledge_uses_registry_evidence_level(self):
+        """Built-in disease knowledge should carry its source's registered evidence level"""
+        knowledge = DiseaseKnowledge(
+            disease_id="diabetes_type2",
+            name="2型糖尿病",
+            category=DiseaseCategory.ENDOCRINE,
+            overview="慢性代谢性疾病",
+            sources=["ADA Standards of Care 2026"],
+            last_updated=datetime(2026, 1, 1)
+        )
+
+        metadata = KnowledgeBase().disease_knowledge_document(knowledge)["metadata"]
+
+        assert metadata["source_id"] == "ada-2026-soc"
+        assert metadata["evidence_level"] == "GRADE_HIGH"
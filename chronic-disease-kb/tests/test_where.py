@@ -0,0 +1,88 @@
+"""
+Tests for where-clause evaluation across the store and the indexes
+"""
+
+import numpy as np
+import pytest
+
+from kb.lexical_index import LexicalIndex
+from kb.metadata_index import MetadataIndex
+from kb.numpy_store import NumpyCollection
+from kb.where import matches_where
+
+RECORDS = [
+    {"id": "a", "content": "asthma inhaler", "metadata": {"disease": "asthma", "category": "treatment", "year": 2020}},
+    {"id": "b", "content": "asthma inhaler", "metadata": {"disease": "asthma", "category": "symptoms", "year": 2024}},
+    {"id": "c", "content": "copd inhaler", "metadata": {"disease": "copd", "category": "treatment", "year": 2022}},
+    {"id": "d", "content": "hypertension inhaler", "metadata": {"disease": "hypertension", "category": "treatment"}},
+]
+
+FILTERS = [
+    {"disease": "asthma"},
+    {"disease": {"$ne": "asthma"}},
+    {"disease": {"$in": ["asthma", "copd"]}},
+    {"disease": {"$nin": ["asthma", "copd"]}},
+    {"year": {"$gte": 2022}},
+    {"year": {"$lt": 2024}},
+    {"$and": [{"category": "treatment"}, {"year": {"$gt": 2020}}]},
+    {"$or": [{"disease": "copd"}, {"category": "symptoms"}]},
+]
+
+UNSUPPORTED = [
+    {"disease": {"$regex": "^a"}},
+    {"$or": [{"disease": "asthma"}, {"year": {"$between": [1, 2]}}]},
+    {"$not": {"disease": "asthma"}},
+]
+
+
+def expected(where):
+    return sorted(record["id"] for record in RECORDS if matches_where(record["metadata"], where))
+
+
+@pytest.fixture
+def stores(tmp_path):
+    collection = NumpyCollection(str(tmp_path))
+    collection.add(
+        embeddings=np.ones((len(RECORDS), 2)).tolist(),
+        documents=[record["content"] for record in RECORDS],
+        metadatas=[record["metadata"] for record in RECORDS],
+        ids=[record["id"] for record in RECORDS]
+    )
+    lexical = LexicalIndex()
+    lexical.rebuild(RECORDS)
+    metadata = MetadataIndex()
+    metadata.rebuild(RECORDS)
+    return collection, lexical, metadata
+
+
+class TestWhere:
+    """Test that every where evaluator agrees"""
+
+    @pytest.mark.parametrize("where", FILTERS)
+    def test_evaluators_agree(self, stores, where):
+        collection, lexical, metadata = stores
+
+        assert sorted(collection.get(where=where)["ids"]) == expected(where)
+        if lexical.can_filter(where):
+            hits = lexical.search("inhaler", 10, where)
+        else:
+            with pytest.raises(ValueError, match="candidate_ids"):
+                lexical.search("inhaler", 10, where)
+            hits = lexical.search("inhaler", 10, where, set(collection.get(where=where)["ids"]))
+        assert sorted(doc_id for doc_id, _ in hits) == expected(where)
+        candidates = metadata.candidates(where)
+        assert candidates is None or sorted(candidates) == expected(where)
+
+    @pytest.mark.parametrize("where", UNSUPPORTED)
+    def test_unsupported_operator_raises_everywhere(self, stores, where):
+        """An unknown operator should fail rather than match everything"""
+        collection, lexical, metadata = stores
+
+        with pytest.raises(ValueError, match="Unsupported where operator"):
+            matches_where(RECORDS[0]["metadata"], where)
+        with pytest.raises(ValueError, match="Unsupported where operator"):
+            collection.get(where=where)
+        with pytest.raises(ValueError, match="Unsupported where operator"):
+            lexical.search("inhaler", 10, where)
+        with pytest.raises(ValueError, match="Unsupported where operator"):
+            metadata.candidates(where)